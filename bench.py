@@ -0,0 +1,664 @@
+"""
+Event Monitor Pro - Headless Benchmark Harness
+
+Runs the hot paths of event.py without Windows, without a real OpenAI key and
+without opening the GUI:
+
+* `win32evtlog` / `win32evtlogutil` / `win32con` / `pywintypes` are replaced by
+  an in-memory synthetic event log (configurable size, sources, IDs, message
+  templates, timestamps and out-of-order rate).
+* The OpenAI client is pointed (via OPENAI_BASE_URL) at a local fake
+  chat-completions server with configurable latency.
+
+Usage:
+    python bench.py                                  # default corpus, all benchmarks
+    python bench.py --events 200000 --only read_events
+    python bench.py --llm-latency-ms 0 --output bench_output.json
+    python bench.py --baseline old.json --max-regression 0.2
+
+Results are printed as a table and written as JSON (one entry per benchmark
+with throughput, p50/p99 latency and peak memory) so they can be diffed
+between runs.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+from collections import deque
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#
+# ==============================================================================
+# ⬇️ SYNTHETIC EVENT CORPUS ⬇️
+# ==============================================================================
+#
+EVENTLOG_ERROR_TYPE = 0x0001
+EVENTLOG_WARNING_TYPE = 0x0002
+EVENTLOG_INFORMATION_TYPE = 0x0004
+EVENTLOG_AUDIT_SUCCESS = 0x0008
+EVENTLOG_AUDIT_FAILURE = 0x0010
+
+# (source, event_id, event_type, message template, insert choices, weight)
+DEFAULT_TEMPLATES = {
+    'System': [
+        ('Service Control Manager', 7036, EVENTLOG_INFORMATION_TYPE, "The {0} service entered the {1} state.", [['Windows Update', 'Background Intelligent Transfer Service', 'Print Spooler', 'Windows Search'], ['running', 'stopped']], 30),
+        ('Service Control Manager', 7040, EVENTLOG_INFORMATION_TYPE, "The start type of the {0} service was changed from {1} to {2}.", [['Background Intelligent Transfer Service', 'Windows Update'], ['demand start', 'auto start'], ['auto start', 'demand start']], 5),
+        ('EventLog', 6005, EVENTLOG_INFORMATION_TYPE, "The Event log service was started.", [], 2),
+        ('EventLog', 6006, EVENTLOG_INFORMATION_TYPE, "The Event log service was stopped.", [], 2),
+        ('EventLog', 6008, EVENTLOG_ERROR_TYPE, "The previous system shutdown at {0} on {1} was unexpected.", [['2:14:03 AM', '11:52:40 PM'], ['11/5/2025', '11/6/2025']], 1),
+        ('USER32', 1074, EVENTLOG_INFORMATION_TYPE, "The process {0} has initiated the restart of computer DESKTOP-BENCH on behalf of user BENCH\\user for the following reason: {1}", [['C:\\Windows\\system32\\winlogon.exe', 'C:\\Windows\\System32\\RuntimeBroker.exe'], ['No title for this reason could be found', 'Operating System: Upgrade (Planned)']], 1),
+        ('Microsoft-Windows-Kernel-Power', 41, EVENTLOG_ERROR_TYPE, "The system has rebooted without cleanly shutting down first.", [], 1),
+        ('Microsoft-Windows-WindowsUpdateClient', 19, EVENTLOG_INFORMATION_TYPE, "Installation Successful: Windows successfully installed the following update: {0}", [['KB5031356', 'KB5032189', 'Security Intelligence Update for Microsoft Defender Antivirus']], 3),
+        ('Microsoft-Windows-WindowsUpdateClient', 20, EVENTLOG_ERROR_TYPE, "Installation Failure: Windows failed to install the following update with error 0x80070643: {0}", [['KB5034441', 'KB5031356']], 1),
+        ('DCOM', 10016, EVENTLOG_WARNING_TYPE, "The application-specific permission settings do not grant Local Activation permission for the COM Server application with CLSID {0}.", [['{2593F8B9-4EAF-457C-B68A-50F6B8EA6B54}', '{D63B10C5-BB46-4990-A94F-E40B9D520160}']], 10),
+        ('Microsoft-Windows-Time-Service', 37, EVENTLOG_INFORMATION_TYPE, "The time provider NtpClient is currently receiving valid time data from {0}.", [['time.windows.com,0x8']], 4),
+        ('disk', 153, EVENTLOG_WARNING_TYPE, "The IO operation at logical block address {0} for Disk 0 was retried.", [['0x1a2b3c', '0x77e1f0', '0x9f00c8']], 2),
+    ],
+    'Application': [
+        ('Application Error', 1000, EVENTLOG_ERROR_TYPE, "Faulting application name: {0}, version: 10.0.1.0, faulting module name: {1}, exception code: 0xc0000005", [['chrome.exe', 'Code.exe', 'explorer.exe', 'devenv.exe', 'python.exe'], ['ntdll.dll', 'KERNELBASE.dll', 'ucrtbase.dll']], 4),
+        ('Application Hang', 1002, EVENTLOG_ERROR_TYPE, "The program {0} version 120.0.0.0 stopped interacting with Windows and was closed.", [['chrome.exe', 'Code.exe', 'EXCEL.EXE', 'devenv.exe']], 2),
+        ('Windows Error Reporting', 1001, EVENTLOG_INFORMATION_TYPE, "Fault bucket {0}, type 5 Event Name: APPCRASH Response: Not available", [['1234567890', '2233445566']], 4),
+        ('MsiInstaller', 11707, EVENTLOG_INFORMATION_TYPE, "Product: {0} -- Installation completed successfully.", [['Python 3.11.7', 'Node.js', 'Microsoft Visual C++ 2022 Redistributable']], 2),
+        ('VSS', 8224, EVENTLOG_INFORMATION_TYPE, "The VSS service is shutting down due to idle timeout.", [], 8),
+        ('Software Protection Platform Service', 16384, EVENTLOG_INFORMATION_TYPE, "Successfully scheduled Software Protection service for re-start at {0}.", [['2025-11-07T10:00:00Z']], 10),
+        ('ESENT', 916, EVENTLOG_INFORMATION_TYPE, "{0} ({1},G,0) The beta feature EseDiskFlushConsistency is enabled in ESENT due to the beta site mode settings.", [['svchost', 'SearchIndexer'], ['4812', '9120']], 6),
+        ('SecurityCenter', 15, EVENTLOG_INFORMATION_TYPE, "Updated Windows Defender status successfully to SECURITY_PRODUCT_STATE_ON.", [], 3),
+        ('.NET Runtime', 1026, EVENTLOG_ERROR_TYPE, "Application: {0} Framework Version: v4.0.30319 Description: The process was terminated due to an unhandled exception.", [['Teams.exe', 'devenv.exe']], 1),
+    ],
+    'Security': [
+        ('Microsoft-Windows-Security-Auditing', 4624, EVENTLOG_AUDIT_SUCCESS, "An account was successfully logged on. Account Name: {0} Logon Type: {1}", [['user', 'SYSTEM', 'DWM-1'], ['2', '5', '11']], 30),
+        ('Microsoft-Windows-Security-Auditing', 4625, EVENTLOG_AUDIT_FAILURE, "An account failed to log on. Account Name: {0} Failure Reason: Unknown user name or bad password.", [['admin', 'user']], 2),
+        ('Microsoft-Windows-Security-Auditing', 4688, EVENTLOG_AUDIT_SUCCESS, "A new process has been created. New Process Name: {0}", [['C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe', 'C:\\Windows\\explorer.exe']], 5),
+        ('Microsoft-Windows-Security-Auditing', 4689, EVENTLOG_AUDIT_SUCCESS, "A process has exited. Process Name: {0}", [['C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe', 'C:\\Windows\\explorer.exe']], 5),
+        ('Microsoft-Windows-Security-Auditing', 4672, EVENTLOG_AUDIT_SUCCESS, "Special privileges assigned to new logon. Account Name: {0}", [['SYSTEM', 'user']], 10),
+    ],
+}
+
+
+class PyTime(datetime.datetime):
+    """Stand-in for pywintypes.TimeType (a datetime subclass with Format())."""
+
+    def Format(self, fmt='%c'):
+        # pywin32's default Format() is locale %c; the app expects '%m/%d/%y %H:%M:%S'.
+        return self.strftime('%m/%d/%y %H:%M:%S')
+
+
+class SyntheticRecord:
+    """Mimics the attributes of win32evtlog.PyEventLogRecord that the app uses."""
+    __slots__ = ('RecordNumber', 'TimeGenerated', 'TimeWritten', 'EventID', 'EventType', 'EventCategory',
+                 'SourceName', 'ComputerName', 'StringInserts', 'Data', 'Sid', '_template')
+
+    def __init__(self, record_number, time_generated, event_id, event_type, source, computer, inserts, template):
+        self.RecordNumber = record_number
+        self.TimeGenerated = time_generated
+        self.TimeWritten = time_generated
+        self.EventID = event_id
+        self.EventType = event_type
+        self.EventCategory = 0
+        self.SourceName = source
+        self.ComputerName = computer
+        self.StringInserts = inserts
+        self.Data = b''
+        self.Sid = None
+        self._template = template
+
+
+def generate_corpus(log_type, num_events, span_hours=72.0, out_of_order_rate=0.01, seed=0, templates=None, computer='DESKTOP-BENCH', end_time=None):
+    """
+    Builds a synthetic log (oldest record first, like the on-disk order).
+    `out_of_order_rate` is the fraction of records whose timestamp is pushed
+    back by up to two minutes, like buffered writers do on real machines.
+    """
+    rng = random.Random(f"{seed}-{log_type}")
+    templates = templates if templates is not None else DEFAULT_TEMPLATES[log_type]
+    weights = [t[5] for t in templates]
+    end_time = end_time or datetime.datetime.now().replace(microsecond=0)
+    start_time = end_time - datetime.timedelta(hours=span_hours)
+    step = (span_hours * 3600.0) / max(num_events, 1)
+
+    records = []
+    for i, (source, event_id, event_type, template, choices, _) in enumerate(rng.choices(templates, weights=weights, k=num_events)):
+        ts = start_time + datetime.timedelta(seconds=i * step)
+        if out_of_order_rate and rng.random() < out_of_order_rate:
+            ts -= datetime.timedelta(seconds=rng.uniform(1, 120))
+        inserts = [rng.choice(c) for c in choices]
+        records.append(SyntheticRecord(i + 1, PyTime(ts.year, ts.month, ts.day, ts.hour, ts.minute, ts.second),
+                                       event_id, event_type, source, computer, inserts, template))
+    return records
+
+
+def load_templates(path):
+    """Loads a custom template distribution: {"System": [[source, id, type, template, choices, weight], ...]}"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {log_type: [tuple(t) for t in items] for log_type, items in data.items()}
+
+
+#
+# ==============================================================================
+# ⬇️ WIN32 STUBS (installed into sys.modules before event.py is imported) ⬇️
+# ==============================================================================
+#
+class SyntheticEventLogs:
+    def __init__(self, corpora, batch_size=64, read_delay=0.0):
+        self.corpora = corpora
+        self.batch_size = batch_size
+        self.read_delay = read_delay
+
+    def install(self):
+        win32con = types.ModuleType('win32con')
+        win32con.EVENTLOG_ERROR_TYPE = EVENTLOG_ERROR_TYPE
+        win32con.EVENTLOG_WARNING_TYPE = EVENTLOG_WARNING_TYPE
+        win32con.EVENTLOG_INFORMATION_TYPE = EVENTLOG_INFORMATION_TYPE
+        win32con.EVENTLOG_AUDIT_SUCCESS = EVENTLOG_AUDIT_SUCCESS
+        win32con.EVENTLOG_AUDIT_FAILURE = EVENTLOG_AUDIT_FAILURE
+
+        win32evtlog = types.ModuleType('win32evtlog')
+        win32evtlog.EVENTLOG_SEQUENTIAL_READ = 0x0001
+        win32evtlog.EVENTLOG_SEEK_READ = 0x0002
+        win32evtlog.EVENTLOG_FORWARDS_READ = 0x0004
+        win32evtlog.EVENTLOG_BACKWARDS_READ = 0x0008
+        win32evtlog.OpenEventLog = self.open_event_log
+        win32evtlog.ReadEventLog = self.read_event_log
+        win32evtlog.CloseEventLog = lambda handle: None
+        win32evtlog.GetNumberOfEventLogRecords = lambda handle: len(handle['records'])
+
+        win32evtlogutil = types.ModuleType('win32evtlogutil')
+        win32evtlogutil.SafeFormatMessage = lambda record, log_type=None: record._template.format(*record.StringInserts)
+
+        pywintypes = types.ModuleType('pywintypes')
+        pywintypes.TimeType = PyTime
+        pywintypes.Time = lambda value: PyTime.fromtimestamp(value) if isinstance(value, (int, float)) else value
+        pywintypes.error = OSError
+
+        sys.modules.update({'win32con': win32con, 'win32evtlog': win32evtlog,
+                            'win32evtlogutil': win32evtlogutil, 'pywintypes': pywintypes})
+
+    def open_event_log(self, server, log_type):
+        if log_type not in self.corpora:
+            raise OSError(f"The specified log '{log_type}' does not exist on {server}.")
+        return {'records': self.corpora[log_type], 'pos': len(self.corpora[log_type])}
+
+    def read_event_log(self, handle, flags, offset):
+        if self.read_delay:
+            time.sleep(self.read_delay)
+        records = handle['records']
+        if flags & 0x0008:  # EVENTLOG_BACKWARDS_READ
+            end = handle['pos']
+            start = max(0, end - self.batch_size)
+            handle['pos'] = start
+            return records[start:end][::-1]
+        start = len(records) - handle['pos'] if handle['pos'] <= len(records) else 0
+        batch = records[start:start + self.batch_size]
+        handle['pos'] -= len(batch)
+        return batch
+
+
+#
+# ==============================================================================
+# ⬇️ FAKE OPENAI SERVER ⬇️
+# ==============================================================================
+#
+FAKE_EXPLANATION = {
+    "title": "🔄 Service State Changed", "simple": "A Windows service changed state.",
+    "detail": "Synthetic benchmark explanation.", "severity": "info",
+    "action": "✅ No action needed.", "technical": "Service Control Manager reported a state change.",
+    "impact": "None.", "prevention": "None required.", "icon": "🔄",
+}
+FAKE_PLAN = {
+    "action": "search_logs",
+    "params": {"log_type": "System", "search_keywords": ["6008"], "find_most_recent": True,
+               "analysis_request": "User is checking for the last unexpected shutdown."},
+}
+
+
+class FakeLLMServer:
+    """
+    Minimal OpenAI-compatible /v1/chat/completions endpoint.
+    Answers JSON-mode calls with a plan, explanation prompts with an
+    explanation object and everything else with a fixed markdown answer.
+    """
+
+    def __init__(self, latency_ms=150.0, jitter_ms=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.prompt_chars = 0
+        self.recent_prompts = deque(maxlen=64)
+        self._lock = threading.Lock()
+        self.httpd = None
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                payload = server.respond(body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+
+    def respond(self, body):
+        messages = body.get('messages', [])
+        prompt = "\n".join(str(m.get('content', '')) for m in messages)
+        with self._lock:
+            self.requests += 1
+            self.prompt_chars += len(prompt)
+            delay = self.latency_ms + (self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        if (body.get('response_format') or {}).get('type') == 'json_object':
+            content = json.dumps(FAKE_PLAN)
+        elif 'EXACT JSON format' in prompt:
+            content = json.dumps(FAKE_EXPLANATION)
+        elif body.get('max_tokens', 0) <= 5:
+            content = "chrome"
+        else:
+            content = "**Executive Summary:** Synthetic benchmark analysis."
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        # Provider-style prompt caching: the longest prefix shared with a recent
+        # request counts as cached, in 128-token steps, once it reaches 1024 tokens.
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, old])) for old in self.recent_prompts), default=0)
+            self.recent_prompts.append(prompt)
+        cached_tokens = (shared // 4) // 128 * 128
+        if cached_tokens < 1024:
+            cached_tokens = 0
+        return {
+            "id": f"chatcmpl-bench-{self.requests}", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get('model', 'gpt-4o-mini'),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": cached_tokens}},
+        }
+
+
+#
+# ==============================================================================
+# ⬇️ MEASUREMENT ⬇️
+# ==============================================================================
+#
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def measure(name, fn, iterations=5, warmup=1, setup=None):
+    """
+    Times `fn` (which returns the number of items it processed) and then runs it
+    once more under tracemalloc for peak memory, so tracing does not distort the
+    latency numbers. `setup`, if given, runs before every call and is not timed.
+    """
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    latencies, items = [], 0
+    try:
+        with redirect_stdout(devnull):
+            for _ in range(warmup):
+                if setup: setup()
+                fn()
+            for _ in range(iterations):
+                if setup: setup()
+                t0 = time.perf_counter()
+                n = fn()
+                latencies.append(time.perf_counter() - t0)
+                items += n or 0
+
+            if setup: setup()
+            tracemalloc.start()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        devnull.close()
+
+    total = sum(latencies)
+    return {
+        'name': name,
+        'iterations': iterations,
+        'items': items,
+        'throughput_per_s': (items / total) if total and items else None,
+        'calls_per_s': (iterations / total) if total else None,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'peak_mem_kb': peak / 1024,
+    }
+
+
+#
+# ==============================================================================
+# ⬇️ BENCHMARKS ⬇️
+# ==============================================================================
+#
+def build_benchmarks(event, args, corpora, archive_path):
+    reader = event.EventLogReader()
+    explainer = event.AIExplainer("bench-key")
+    assistant = event.AIAssistant("bench-key")
+    now = max(r.TimeGenerated for r in corpora['System'])
+
+    def full_scan():
+        reader.read_events('System', max_records=10**9)
+        return reader.last_scan_stats.get('total_read', 0)
+
+    def keyword_scan():
+        reader.read_events('Application', max_records=10**9, keywords=['1000', '1002', 'chrome'])
+        return reader.last_scan_stats.get('total_read', 0)
+
+    def hide_common_scan():
+        reader.read_events('System', max_records=10**9, hide_common=True)
+        return reader.last_scan_stats.get('total_read', 0)
+
+    def window_scan():
+        reader.read_events('System', max_records=500, start_datetime=now - datetime.timedelta(hours=1), end_datetime=now)
+        return reader.last_scan_stats.get('total_read', 0)
+
+    def multi_scan():
+        reader.read_events_multi(('System', 'Application', 'Security'), max_records=500,
+                                 start_datetime=now - datetime.timedelta(hours=6))
+        return reader.last_scan_stats.get('total_read', 0)
+
+    # Stand-in fleet: every "host" reads the same synthetic logs through OpenEventLog(host, ...).
+    fleet = event.FleetQuery([event.WindowsHostSource(f"bench-host-{i}") for i in range(args.fleet_hosts)],
+                             max_workers=args.fleet_workers, timeout=60)
+
+    def fleet_scan():
+        fleet.read_events(max_records=500, log_type='System', keywords=['6008'],
+                          start_datetime=now - datetime.timedelta(hours=12))
+        return len(fleet.sources)
+
+    def archive_write():
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+        return event.EventArchive(archive_path).sync_from_log(reader, 'System')
+
+    def archive_scan():
+        archive = event.EventArchive(archive_path)
+        found = list(archive.scan(start_datetime=now - datetime.timedelta(hours=2), event_ids=[6008, 41]))
+        archive.close()
+        return len(found) or 1
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        reader_events = reader.read_events('System', max_records=args.explain_events)
+        sample_events = reader.read_events('Application', max_records=500)
+        similarity_corpus = reader.read_events('System', max_records=10**9) if event.EventSimilarityIndex.available() else []
+        matcher_events = [(evt['event_id'], evt['source'], evt['message'])
+                          for log_type in ('System', 'Application', 'Security')
+                          for evt in reader.read_events(log_type, max_records=10**9)]
+
+    similarity = event.EventSimilarityIndex()
+
+    def similarity_build():
+        similarity.__init__()
+        similarity.add(similarity_corpus)
+        similarity.similar(similarity_corpus[0])
+        return len(similarity_corpus)
+
+    def similarity_query():
+        for evt in sample_events[:20]:
+            similarity.similar(evt)
+        return 20
+
+    def explain_cold():
+        for evt in reader_events:
+            explainer.explain_event(evt['event_id'], evt['event_type'], evt['source'], evt['message'])
+        return len(reader_events)
+
+    def explain_warm():
+        for evt in reader_events:
+            explainer.explain_event(evt['event_id'], evt['event_type'], evt['source'], evt['message'])
+        return len(reader_events)
+
+    # Matcher microbenchmarks: the pre-v48 inline substring checks against the
+    # shared matchers, over every event of the three logs (items/s = events/s).
+    common_sources = ['BITS', 'gpsvc', 'Microsoft-Windows-GroupPolicy', 'Microsoft-Windows-Bits-Client',
+                      'DCOM', 'DistributedCOM', 'USER32', 'DeviceSetupManager', 'WinMgmt',
+                      'Microsoft-Windows-Time-Service', 'Service Control Manager',
+                      'Kernel-Power', 'Kernel-General']
+    keywords = ['1000', '1002', 'chrome']
+    process_stems = ['svchost', 'chrome', 'msedgewebview2', 'explorer', 'docker desktop', 'code', 'runtimebroker',
+                     'python', 'searchhost', 'javaw', 'conhost', 'teams', 'dllhost', 'node', 'lsass', 'wmiprvse']
+    process_stems = (process_stems * (len(matcher_events) // len(process_stems) + 1))[:len(matcher_events)]
+
+    def common_naive():
+        for _, source, _ in matcher_events:
+            any(common.lower() in source.lower() for common in common_sources)
+        return len(matcher_events)
+
+    def common_compiled():
+        for _, source, _ in matcher_events:
+            event.COMMON_SOURCES.find_cached(source)
+        return len(matcher_events)
+
+    def keywords_naive():
+        for event_id, source, message in matcher_events:
+            message_lower = message.lower()
+            event_id_str = str(event_id)
+            any(k.lower() in message_lower or k.lower() in source.lower() or k == event_id_str for k in keywords)
+        return len(matcher_events)
+
+    def keywords_compiled():
+        keyword_filter = event.KeywordFilter(keywords)
+        for event_id, source, message in matcher_events:
+            keyword_filter.matches(event_id, source, message)
+        return len(matcher_events)
+
+    def watchlist_naive():
+        for stem in process_stems:
+            stem if stem in event.WATCHLIST else next((key for key in event.WATCHLIST if key in stem), None)
+        return len(process_stems)
+
+    def watchlist_compiled():
+        for stem in process_stems:
+            stem if stem in event.WATCHLIST else event.WATCHLIST_MATCHER.find_cached(stem)
+        return len(process_stems)
+
+    history = [
+        {"role": "user", "content": "what happened last night?"},
+        {"role": "assistant", "content": "**Executive Summary:** Synthetic benchmark analysis. " * 40},
+        {"role": "user", "content": "when did my pc last crash?"},
+    ]
+
+    def plan():
+        assistant.get_ai_plan([dict(m) for m in history])
+        return 1
+
+    def analyze():
+        assistant.analyze_results("User is checking what happened last night.", sample_events)
+        return len(sample_events)
+
+    def analyze_hybrid():
+        assistant.analyze_hybrid_results("User is checking for real-time performance issues.", "CPU 12%", sample_events)
+        return len(sample_events)
+
+    def top_processes():
+        return len(event.get_top_processes())
+
+    def realtime_stats():
+        event.get_realtime_system_stats()
+        return 1
+
+    def process_stats():
+        event.get_specific_process_stats("python")
+        return 1
+
+    def major_apps():
+        event.get_major_apps_overview()
+        return 1
+
+    def port_map():
+        return len(event.get_port_process_mapping())
+
+    it = args.iterations
+    llm_it = args.llm_iterations
+    return [
+        ('read_events.full_scan', full_scan, it, None),
+        ('read_events.keywords', keyword_scan, it, None),
+        ('read_events.hide_common', hide_common_scan, it, None),
+        ('read_events.time_window_1h', window_scan, it, None),
+        ('read_events_multi.3_logs_6h', multi_scan, it, None),
+        ('fleet_query.read_events', fleet_scan, it, None),
+        ('archive.sync_full_log', archive_write, it, None),
+        ('archive.scan_2h_by_id', archive_scan, it, None),
+        ('matcher.common_sources.naive', common_naive, it, None),
+        ('matcher.common_sources.compiled', common_compiled, it, None),
+        ('matcher.keywords.naive', keywords_naive, it, None),
+        ('matcher.keywords.compiled', keywords_compiled, it, None),
+        ('matcher.watchlist.naive', watchlist_naive, it, None),
+        ('matcher.watchlist.compiled', watchlist_compiled, it, None),
+    ] + ([
+        ('similar_events.build', similarity_build, it, None),
+        ('similar_events.query_x20', similarity_query, it, None),
+    ] if similarity_corpus else []) + [
+        ('explain_event.cold', explain_cold, llm_it, explainer.cache.clear),
+        ('explain_event.cached', explain_warm, it, None),
+        ('get_ai_plan', plan, llm_it, None),
+        ('analyze_results.500', analyze, llm_it, None),
+        ('analyze_hybrid_results.500', analyze_hybrid, llm_it, None),
+        ('get_top_processes', top_processes, args.psutil_iterations, None),
+        ('get_realtime_system_stats', realtime_stats, args.psutil_iterations, None),
+        ('get_specific_process_stats', process_stats, args.psutil_iterations, None),
+        ('get_major_apps_overview', major_apps, args.psutil_iterations, None),
+        ('get_port_process_mapping', port_map, args.psutil_iterations, None),
+    ]
+
+
+def compare_with_baseline(results, baseline_path, max_regression):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r['name']: r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\n{'benchmark':40} {'base p50':>10} {'new p50':>10} {'change':>8}")
+    for r in results:
+        base = baseline.get(r['name'])
+        if not base or not base['p50_ms']:
+            continue
+        change = (r['p50_ms'] - base['p50_ms']) / base['p50_ms']
+        flag = " ⚠️" if change > max_regression else ""
+        print(f"{r['name']:40} {base['p50_ms']:10.2f} {r['p50_ms']:10.2f} {change:+7.1%}{flag}")
+        if change > max_regression:
+            regressions.append(r['name'])
+    return regressions
+
+
+def print_table(results):
+    print(f"\n{'benchmark':40} {'p50 ms':>10} {'p99 ms':>10} {'items/s':>12} {'peak KB':>10}")
+    print("-" * 86)
+    for r in results:
+        tput = f"{r['throughput_per_s']:12.0f}" if r['throughput_per_s'] else f"{'-':>12}"
+        print(f"{r['name']:40} {r['p50_ms']:10.2f} {r['p99_ms']:10.2f} {tput} {r['peak_mem_kb']:10.0f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmarks for Event Monitor Pro")
+    parser.add_argument('--events', type=int, default=50000, help="records per synthetic log (default: 50000)")
+    parser.add_argument('--span-hours', type=float, default=72.0, help="time span covered by each log")
+    parser.add_argument('--out-of-order-rate', type=float, default=0.01, help="fraction of records with shuffled timestamps")
+    parser.add_argument('--batch-size', type=int, default=64, help="records returned per ReadEventLog call")
+    parser.add_argument('--templates', help="JSON file with a custom source/ID/message distribution")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--llm-latency-ms', type=float, default=150.0, help="fake LLM server latency per call")
+    parser.add_argument('--llm-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--llm-iterations', type=int, default=3)
+    parser.add_argument('--psutil-iterations', type=int, default=1)
+    parser.add_argument('--fleet-hosts', type=int, default=8, help="stand-in hosts for the fleet query benchmark")
+    parser.add_argument('--fleet-workers', type=int, default=4)
+    parser.add_argument('--explain-events', type=int, default=20, help="events per explain_event benchmark")
+    parser.add_argument('--only', action='append', help="run only benchmarks whose name starts with this prefix (repeatable)")
+    parser.add_argument('--output', default='bench_output.json', help="where to write machine-readable results")
+    parser.add_argument('--baseline', help="previous --output file to compare p50 latencies against")
+    parser.add_argument('--max-regression', type=float, default=0.15, help="allowed p50 slowdown vs baseline (0.15 = 15%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    templates = load_templates(args.templates) if args.templates else DEFAULT_TEMPLATES
+
+    print(f"🧪 Generating synthetic logs ({args.events} records each)...")
+    end_time = datetime.datetime.now().replace(microsecond=0)
+    corpora = {log_type: generate_corpus(log_type, args.events, args.span_hours, args.out_of_order_rate,
+                                         args.seed, templates.get(log_type, DEFAULT_TEMPLATES[log_type]), end_time=end_time)
+               for log_type in ('System', 'Application', 'Security')}
+    SyntheticEventLogs(corpora, batch_size=args.batch_size).install()
+
+    llm = FakeLLMServer(args.llm_latency_ms, args.llm_jitter_ms, args.seed)
+    os.environ['OPENAI_BASE_URL'] = llm.start()
+    print(f"🤖 Fake LLM server at {os.environ['OPENAI_BASE_URL']} ({args.llm_latency_ms:.0f} ms latency)")
+
+    import event
+
+    archive_path = os.path.join(tempfile.gettempdir(), f"bench-{os.getpid()}.evarc")
+    results = []
+    try:
+        for name, fn, iterations, setup in build_benchmarks(event, args, corpora, archive_path):
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            print(f"⏱️  {name} x{iterations}...")
+            results.append(measure(name, fn, iterations=iterations, setup=setup))
+    finally:
+        llm.stop()
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+
+    print_table(results)
+
+    report = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+        'llm_requests': llm.requests,
+        'results': results,
+        'telemetry': event.TELEMETRY.snapshot(),
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.max_regression)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.max_regression:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
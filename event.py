@@ -3,19 +3,532 @@ Windows Event Monitor - AI Edition
 FINAL PERFECT VERSION - v25 (Major Apps & History Specialist)
 """
 
-import flet as ft
-from flet import *
+import time
+_IMPORT_STARTED = time.perf_counter()  # v43: zero of the startup report
+
 import win32evtlog
 import win32evtlogutil
 import win32con
 import pywintypes
+try:
+    import win32event  # v33 live tail: log change notifications
+except ImportError:
+    win32event = None
 import psutil
 import datetime
 import json
-import time
 import threading
-from collections import Counter
-from openai import OpenAI
+import heapq
+import itertools
+import operator
+import bisect
+import cProfile
+import pstats
+import io
+import os
+import re
+import math
+import ipaddress
+import sys
+import struct
+import zlib
+import array
+import csv
+import gzip
+import importlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+import urllib.request
+from contextlib import contextmanager
+from collections import Counter, deque
+from queue import Queue, Empty
+# v43: flet (GUI only), openai (first LLM call) and numpy/scipy ("Similar events", optional)
+# are imported on first use - together they were most of the cold start.
+ft = None
+np = sparse = None
+
+#
+# ==============================================================================
+# ⬇️ START OF "DIAGNOSTICS" INSTRUMENTATION (v27) ⬇️
+# ==============================================================================
+#
+class Telemetry:
+    """
+    v27 "Diagnostics":
+    Span timing for the hot path (log read, format, filter, plan, LLM call,
+    psutil sampling, UI flush). Each stage keeps a count, a running total and a
+    fixed-bucket latency histogram, so recording a span costs a few additions.
+    The last N queries (chat answers, event loads) keep their own per-stage
+    breakdown for the Diagnostics tab.
+    """
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float('inf'))
+
+    def __init__(self, max_queries=20):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stages = {}
+        self.counters = Counter()
+        self.queries = deque(maxlen=max_queries)
+        self.prompts = {}
+        self.profiling = os.environ.get('EVENT_MONITOR_PROFILE') == '1'
+        self._profile_stats = None
+        self._profiler_busy = False
+
+    # --- Recording ---
+    def record(self, stage, elapsed_ms):
+        query = getattr(self._local, 'query', None)
+        with self._lock:
+            st = self.stages.get(stage)
+            if st is None:
+                st = self.stages[stage] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * len(self.BUCKETS_MS)}
+            st['count'] += 1
+            st['total_ms'] += elapsed_ms
+            if elapsed_ms > st['max_ms']:
+                st['max_ms'] = elapsed_ms
+            st['buckets'][bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+            if query is not None:
+                query['stages'][stage] = query['stages'].get(stage, 0.0) + elapsed_ms
+
+    def incr(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] += n
+
+    @contextmanager
+    def span(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - t0) * 1000)
+
+    def timed(self, stage):
+        """Decorator form of `span`."""
+        def decorator(fn):
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            return wrapper
+        return decorator
+
+    # --- Per-query breakdowns ---
+    def begin_query(self, label):
+        query = {'label': label, 'started': datetime.datetime.now(), 'stages': {}, 'total_ms': 0.0,
+                 '_t0': time.perf_counter(), '_parent': getattr(self._local, 'query', None), '_profiler': None}
+        if self.profiling:
+            query['_profiler'] = self._start_profiler(label)
+        self._local.query = query
+        return query
+
+    def _start_profiler(self, label):
+        # Only one profiler can be active at a time (Python 3.12+ raises ValueError
+        # for a second one), so a query that overlaps a profiled one is not profiled.
+        with self._lock:
+            if self._profiler_busy:
+                print(f"🧪 Profiler busy with another query; not profiling '{label}'")
+                return None
+            self._profiler_busy = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:  # another tool (a debugger, an outside profiler) holds it
+            print(f"🧪 Cannot profile '{label}': {e}")
+            with self._lock:
+                self._profiler_busy = False
+            return None
+        return profiler
+
+    def end_query(self, query):
+        query['total_ms'] = (time.perf_counter() - query.pop('_t0')) * 1000
+        self._local.query = query.pop('_parent')
+        profiler = query.pop('_profiler')
+        with self._lock:
+            if profiler is not None:
+                profiler.disable()
+                self._profiler_busy = False
+                if self._profile_stats is None:
+                    self._profile_stats = pstats.Stats(profiler)
+                else:
+                    self._profile_stats.add(profiler)
+            self.queries.appendleft(query)
+
+    @contextmanager
+    def query(self, label):
+        query = self.begin_query(label)
+        try:
+            yield query
+        finally:
+            self.end_query(query)
+
+    def current_query(self):
+        return getattr(self._local, 'query', None)
+
+    @contextmanager
+    def attach(self, query):
+        """Lets a worker thread add its spans to a query started on another thread."""
+        previous = getattr(self._local, 'query', None)
+        self._local.query = query
+        try:
+            yield
+        finally:
+            self._local.query = previous
+
+    # --- Reporting ---
+    def _bucket_percentile(self, st, pct):
+        target = st['count'] * pct / 100.0
+        running = 0
+        for upper, n in zip(self.BUCKETS_MS, st['buckets']):
+            running += n
+            if running >= target:
+                return min(upper, st['max_ms'])
+        return st['max_ms']
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: dict(st, buckets=list(st['buckets'])) for name, st in self.stages.items()}
+            counters = dict(self.counters)
+            prompts = [dict(row, template=name) for name, row in sorted(self.prompts.items())]
+        rows = []
+        for name, st in stages.items():
+            rows.append({
+                'stage': name, 'count': st['count'], 'total_ms': st['total_ms'],
+                'mean_ms': st['total_ms'] / st['count'] if st['count'] else 0.0,
+                'p50_ms': self._bucket_percentile(st, 50), 'p99_ms': self._bucket_percentile(st, 99),
+                'max_ms': st['max_ms'],
+            })
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return {'stages': rows, 'counters': counters, 'prompts': prompts}
+
+    def record_usage(self, template, prompt_tokens, cached_tokens, completion_tokens):
+        """Token usage of one LLM call, per prompt template (v36)."""
+        with self._lock:
+            row = self.prompts.setdefault(template, {'calls': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0})
+            row['calls'] += 1
+            row['prompt_tokens'] += prompt_tokens
+            row['cached_tokens'] += cached_tokens
+            row['completion_tokens'] += completion_tokens
+            self.counters['llm_prompt_tokens'] += prompt_tokens
+            self.counters['llm_cached_tokens'] += cached_tokens
+            self.counters['llm_completion_tokens'] += completion_tokens
+
+    def recent_queries(self):
+        with self._lock:
+            return [dict(q, stages=dict(q['stages'])) for q in self.queries]
+
+    # --- Profiler ---
+    def set_profiling(self, enabled):
+        self.profiling = enabled
+
+    def profile_report(self, limit=25):
+        with self._lock:
+            if self._profile_stats is None:
+                return "No profiled queries yet. Enable the profiler and run a query."
+            stream = io.StringIO()
+            self._profile_stats.stream = stream
+            self._profile_stats.sort_stats('cumulative').print_stats(limit)
+            return stream.getvalue()
+
+    def reset_profile(self):
+        with self._lock:
+            self._profile_stats = None
+
+
+TELEMETRY = Telemetry()
+
+
+class StartupReport:
+    """
+    v43 Startup:
+    Wall-clock phases from the first line of this module to "interactive"
+    (module import, lazy imports, engine init, UI build), plus the warm-up
+    that runs in the background afterwards. Served at GET /startup and shown
+    in the Diagnostics tab.
+    """
+    def __init__(self, started):
+        self.started = started
+        self.phases = []
+        self.interactive_ms = None
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end, background=False):
+        with self._lock:
+            self.phases.append({'phase': name, 'start_ms': (start - self.started) * 1000,
+                                'ms': (end - start) * 1000, 'background': background})
+
+    @contextmanager
+    def phase(self, name, background=False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), background)
+
+    def mark_interactive(self):
+        if self.interactive_ms is None:
+            self.interactive_ms = (time.perf_counter() - self.started) * 1000
+            print(f"🚀 Interactive {self.interactive_ms:.0f} ms after start")
+
+    def snapshot(self):
+        with self._lock:
+            return {'interactive_ms': self.interactive_ms, 'phases': list(self.phases)}
+
+    def report(self):
+        snap = self.snapshot()
+        lines = [f"Time to interactive: {snap['interactive_ms']:.0f} ms" if snap['interactive_ms'] is not None else "Not interactive yet"]
+        for row in snap['phases']:
+            lines.append(f"{row['start_ms']:8.0f} ms  +{row['ms']:7.1f} ms  {'(bg) ' if row['background'] else ''}{row['phase']}")
+        return "\n".join(lines)
+
+
+STARTUP = StartupReport(_IMPORT_STARTED)
+_LAZY_MODULES = {}
+
+
+def _lazy_import(name):
+    """v43: imports a heavy module on first use (timed in the startup report); None if it is not installed."""
+    if name not in _LAZY_MODULES:
+        with STARTUP.phase(f"import {name}", background=threading.current_thread() is not threading.main_thread()):
+            try:
+                _LAZY_MODULES[name] = importlib.import_module(name)
+            except ImportError:
+                _LAZY_MODULES[name] = None
+    return _LAZY_MODULES[name]
+
+
+_OPENAI_CLIENTS = {}
+
+
+def _openai_client(api_key):
+    """v43: one OpenAI client per key, built (and openai imported) on the first LLM call."""
+    client = _OPENAI_CLIENTS.get(api_key)
+    if client is None:
+        openai = _lazy_import('openai')
+        if openai is None:
+            raise Exception("The openai package is not installed.")
+        client = _OPENAI_CLIENTS.setdefault(api_key, openai.OpenAI(api_key=api_key))
+    return client
+
+
+def _timed_completion(client, template=None, **kwargs):
+    """
+    All LLM calls go through here so they show up as the 'llm' stage. The
+    reported token usage (including prompt-cache hits) is booked against
+    `template` (a PromptTemplate, v36).
+    """
+    check_cancelled()
+    TELEMETRY.incr('llm_calls')
+    with TELEMETRY.span('llm'):
+        response = client.chat.completions.create(**kwargs)
+    check_cancelled()  # v46: a superseded query drops the answer it was waiting for
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        details = getattr(usage, 'prompt_tokens_details', None)
+        TELEMETRY.record_usage(template.key if template else 'untemplated', usage.prompt_tokens or 0,
+                               getattr(details, 'cached_tokens', 0) or 0, usage.completion_tokens or 0)
+    return response
+# ==============================================================================
+# ⬆️ END OF "DIAGNOSTICS" INSTRUMENTATION (v27) ⬆️
+# ==============================================================================
+
+#
+# ==============================================================================
+# ⬇️ START OF CANCELLATION & SINGLE-FLIGHT (v46) ⬇️
+# ==============================================================================
+#
+class QueryCancelled(Exception):
+    """Raised at a checkpoint once the running query was cancelled or superseded."""
+
+
+class CancelToken:
+    """
+    v46 Cancellation:
+    Cooperative cancellation for one query. Long-running work calls
+    `check_cancelled()` at checkpoints - every read batch of a log scan, every
+    process in the psutil tools, before and after each LLM call. The token in
+    effect is thread-local and installed with `cancellable()`, the way
+    TELEMETRY.attach carries a query into worker threads. A token linked to
+    other tokens (a shared single-flight execution) is cancelled only once
+    all of them are.
+    """
+    def __init__(self, linked=None):
+        self._event = threading.Event()
+        self._linked = linked
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        linked = self._linked
+        return bool(linked) and all(token.cancelled for token in list(linked))
+
+    def check(self):
+        if self.cancelled:
+            raise QueryCancelled("Cancelled: superseded by a newer request.")
+
+
+_CANCEL_LOCAL = threading.local()
+
+
+def current_cancel_token():
+    return getattr(_CANCEL_LOCAL, 'token', None)
+
+
+def check_cancelled():
+    token = getattr(_CANCEL_LOCAL, 'token', None)
+    if token is not None:
+        token.check()
+
+
+@contextmanager
+def cancellable(token):
+    """Makes `token` the one `check_cancelled()` sees on this thread."""
+    previous = getattr(_CANCEL_LOCAL, 'token', None)
+    _CANCEL_LOCAL.token = token
+    try:
+        yield token
+    finally:
+        _CANCEL_LOCAL.token = previous
+
+
+class SingleFlight:
+    """
+    v46 Single-flight:
+    Identical concurrent calls (same key) share one execution. The first
+    caller runs it; later callers wait for its result or exception instead of
+    repeating the work. The execution runs under a token linked to every
+    caller's token, so it stops only when all callers have cancelled, and a
+    cancelled caller stops waiting on its own.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn):
+        caller = current_cancel_token() or CancelToken()  # callers without a token never cancel
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {'done': threading.Event(), 'callers': [caller], 'result': None, 'error': None}
+            else:
+                flight['callers'].append(caller)
+        if leader:
+            try:
+                with cancellable(CancelToken(flight['callers'])):
+                    flight['result'] = fn()
+            except BaseException as e:
+                flight['error'] = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight['done'].set()
+        else:
+            TELEMETRY.incr(f'{self.name}_deduplicated')
+            while not flight['done'].wait(0.05):
+                caller.check()
+        caller.check()
+        if flight['error'] is not None:
+            raise flight['error']
+        return flight['result']
+
+    def wrap(self, fn):
+        """Decorator form of `do`, keyed by the call's arguments."""
+        def wrapper(*args, **kwargs):
+            return self.do((fn.__name__, args, tuple(sorted(kwargs.items()))), lambda: fn(*args, **kwargs))
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+
+
+TOOL_FLIGHTS = SingleFlight('tool')
+#
+# ==============================================================================
+# ⬆️ END OF CANCELLATION & SINGLE-FLIGHT (v46) ⬆️
+# ==============================================================================
+
+#
+# ==============================================================================
+# ⬇️ START OF PATTERN MATCHER (v48) ⬇️
+# ==============================================================================
+#
+class PatternMatcher:
+    """
+    v48 Pattern Matcher:
+    Case-insensitive "does this text contain any of these?" for a fixed set of
+    patterns (common sources, search keywords, the apps watchlist). Patterns
+    are lowered once; `find` lowers the text once and returns the first
+    pattern it contains, in the order given, or None; `find_all` returns every
+    pattern it contains.
+
+    Sources and process names repeat endlessly, so `find_cached` memoizes the
+    answer per text and the per-event cost becomes a dict lookup. (A single
+    compiled alternation regex measured slower than this scan in CPython for
+    every pattern set we use; see `python bench.py --only matcher`.)
+    """
+    MEMO_SIZE = 4096
+    _MISS = object()
+
+    def __init__(self, patterns):
+        self.patterns = tuple(dict.fromkeys(str(p).lower() for p in patterns))
+        self._memo = {}
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def find(self, text):
+        text = text.lower()
+        for pattern in self.patterns:
+            if pattern in text:
+                return pattern
+        return None
+
+    def find_cached(self, text):
+        found = self._memo.get(text, self._MISS)
+        if found is self._MISS:
+            found = self.find(text)
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            self._memo[text] = found
+        return found
+
+    def find_all(self, text):
+        text = text.lower()
+        return [pattern for pattern in self.patterns if pattern in text]
+
+
+# Sources hidden by "Hide common events" (routine, high-volume noise).
+COMMON_SOURCES = PatternMatcher([
+    'BITS', 'gpsvc', 'Microsoft-Windows-GroupPolicy', 'Microsoft-Windows-Bits-Client',
+    'DCOM', 'DistributedCOM', 'USER32', 'DeviceSetupManager', 'WinMgmt',
+    'Microsoft-Windows-Time-Service', 'Service Control Manager',
+    'Kernel-Power', 'Kernel-General'])
+
+
+class KeywordFilter:
+    """
+    v48: the `keywords` filter of a query. An event matches when a keyword
+    equals its event ID or occurs (case-insensitively) in its source or message.
+    """
+    def __init__(self, keywords):
+        self.ids = {str(k) for k in keywords}
+        self.matcher = PatternMatcher(keywords)
+
+    def __bool__(self):
+        return bool(self.matcher)
+
+    def matches(self, event_id, source, message):
+        return (str(event_id) in self.ids or self.matcher.find_cached(source) is not None
+                or self.matcher.find(message) is not None)
+#
+# ==============================================================================
+# ⬆️ END OF PATTERN MATCHER (v48) ⬆️
+# ==============================================================================
 
 #
 # ==============================================================================
@@ -29,6 +542,7 @@ def get_top_processes(sort_by='cpu', num_processes=10):
     processes = []
     try:
         for proc in psutil.process_iter(['pid', 'name', 'username', 'cpu_percent', 'memory_percent']):
+            check_cancelled()
             try:
                 proc.info['cpu_percent'] = proc.cpu_percent(interval=0.1)
                 processes.append(proc.info)
@@ -59,17 +573,24 @@ def get_top_processes(sort_by='cpu', num_processes=10):
                 )
         return formatted_list
 
+    except QueryCancelled:
+        raise
     except Exception as e:
         print(f"Error getting top processes: {e}")
         return [f"Error getting processes: {e}"]
 
+@TELEMETRY.timed('psutil')
+@TOOL_FLIGHTS.wrap
 def get_realtime_system_stats():
     """
     The "Task Manager" tool. Returns a string of current system stats.
     """
     print("🤖 (AI Tool): Running get_realtime_system_stats()...")
     try:
+        IO_METER.prime()  # v42: the CPU window below doubles as the I/O rate window
         cpu_overall = psutil.cpu_percent(interval=0.5)
+        check_cancelled()
+        io_rates = IO_METER.sample()
         ram = psutil.virtual_memory()
         top_cpu = get_top_processes(sort_by='cpu', num_processes=10)
         
@@ -77,6 +598,7 @@ def get_realtime_system_stats():
 **Real-time System Stats (Task Manager View):**
 * **Overall CPU Load:** {cpu_overall:.1f}%
 * **Overall RAM Usage:** {ram.percent}% ({ram.used / (1024**3):.1f} GB / {ram.total / (1024**3):.1f} GB)
+{IORateMeter.report(io_rates)}
 
 **Top 10 CPU Processes:**
 """
@@ -88,10 +610,13 @@ def get_realtime_system_stats():
         print("🤖 (AI Tool): Stats report generated.")
         return report
 
+    except QueryCancelled:
+        raise
     except Exception as e:
         print(f"Error in get_realtime_system_stats: {e}")
         return f"Error: Could not retrieve system stats. {e}"
 
+@TELEMETRY.timed('psutil')
 def get_system_boot_time():
     """
     v20 "Uptime" Tool:
@@ -119,6 +644,8 @@ def get_system_boot_time():
         return f"Error: Could not retrieve boot time. {e}"
 
 
+@TELEMETRY.timed('psutil')
+@TOOL_FLIGHTS.wrap
 def get_port_process_mapping():
     """
     Returns a dictionary:
@@ -183,72 +710,49 @@ def find_ports_for_process(process_name):
 # ⬆️ END OF "PORT ANALYSIS" TOOL (v26) ⬆️
 # ==============================================================================
 
+@TELEMETRY.timed('psutil')
+@TOOL_FLIGHTS.wrap
 def get_specific_process_stats(process_name_query):
     """
     v23 "Specific Process" Tool:
     Gets the CPU and RAM usage for a specific process name query.
+    v41: counts whole process trees (the matching processes and all their
+    children, whatever they are called) from the cached PROCESS_TREE.
     """
     print(f"🤖 (AI Tool): Running get_specific_process_stats(process_name='{process_name_query}')...")
-    
-    query_lower = process_name_query.lower()
-    found_processes = {} # To aggregate stats by full process name
-    total_cpu = 0.0
-    total_ram_percent = 0.0
-    total_ram_mb = 0.0
-    count = 0
-    
-    # Ensure a baseline CPU measurement is available for interval=None
-    psutil.cpu_percent(interval=0.1) 
-    time.sleep(0.1) # Give psutil a moment to collect data
 
     try:
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'memory_info']):
-            try:
-                proc_name = proc.info['name']
-                
-                # Check if the query is part of the process name
-                if query_lower in proc_name.lower():
-                    # Get stats (interval=None is non-blocking)
-                    cpu = proc.cpu_percent(interval=None) 
-                    ram_percent = proc.info['memory_percent']
-                    ram_mb = proc.info['memory_info'].rss / (1024 * 1024) # RSS in MB
-
-                    # Aggregate totals
-                    total_cpu += cpu
-                    total_ram_percent += ram_percent
-                    total_ram_mb += ram_mb
-                    count += 1
-                    
-                    # Store individual process info
-                    if proc_name not in found_processes:
-                        found_processes[proc_name] = {'count': 0, 'cpu': 0.0, 'ram_mb': 0.0}
-                    
-                    found_processes[proc_name]['count'] += 1
-                    found_processes[proc_name]['cpu'] += cpu
-                    found_processes[proc_name]['ram_mb'] += ram_mb
-
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
+        trees = PROCESS_TREE.app_trees(process_name_query)
+        check_cancelled()
+        if not trees:
+            return f"**No processes found matching '{process_name_query}'.**\n\nIt might not be running, or the name is incorrect. (I searched for `*{process_name_query.lower()}*`)"
 
-        if count == 0:
-            return f"**No processes found matching '{process_name_query}'.**\n\nIt might not be running, or the name is incorrect. (I searched for `*{query_lower}*`)"
+        total_ram = psutil.virtual_memory().total
+        count = sum(t['count'] for t in trees.values())
+        total_cpu = sum(t['cpu'] for t in trees.values())
+        total_rss = sum(t['rss'] for t in trees.values())
+        total_handles = sum(t['handles'] for t in trees.values())
+        total_io = sum(t['io_read'] + t['io_write'] for t in trees.values())
 
         # Format the report
-        report = f"**Stats for processes matching '{process_name_query}' ({count} total instances):**\n\n"
+        report = f"**Stats for '{process_name_query}' ({count} processes in {len(trees)} application tree(s), child processes included):**\n\n"
         report += f"📊 **Total CPU Load:** {total_cpu:.1f}%\n"
-        report += f"🧠 **Total RAM Usage:** {total_ram_mb:.1f} MB ({total_ram_percent:.1f}% of system total)\n"
-
-        # Show breakdown only if there are multiple *different* process names found
-        if len(found_processes) > 1:
-            report += "\n**Breakdown by process name:**\n"
-            # Sort by RAM usage, descending
-            sorted_processes = sorted(found_processes.items(), key=lambda item: item[1]['ram_mb'], reverse=True)
-            for name, data in sorted_processes:
-                report += f"- **{name}** ({data['count']} instances): {data['cpu']:.1f}% CPU, {data['ram_mb']:.1f} MB RAM\n"
-        
+        report += f"🧠 **Total RAM Usage:** {total_rss / (1024 * 1024):.1f} MB ({total_rss / total_ram * 100:.1f}% of system total)\n"
+        report += f"🔗 **Handles:** {total_handles:,}\n"
+        report += f"💽 **Disk I/O since start:** {total_io / (1024 * 1024):,.0f} MB\n"
+
+        # Show a breakdown when the trees contain more than one kind of process
+        if len(trees) > 1 or len(next(iter(trees.values()))['names']) > 1:
+            report += "\n**Breakdown by application tree:**\n"
+            for pid, data in sorted(trees.items(), key=lambda item: item[1]['rss'], reverse=True):
+                members = ", ".join(f"{name} ×{n}" for name, n in data['names'].most_common(4))
+                report += f"- **{data['name']}** (PID {pid}, {data['count']} processes: {members}): {data['cpu']:.1f}% CPU, {data['rss'] / (1024 * 1024):.1f} MB RAM\n"
+
         print("🤖 (AI Tool): Specific process report generated.")
         return report
 
+    except QueryCancelled:
+        raise
     except Exception as e:
         print(f"Error in get_specific_process_stats: {e}")
         return f"Error: Could not retrieve stats for '{process_name_query}'. {e}"
@@ -262,44 +766,49 @@ def get_specific_process_stats(process_name_query):
 # ==============================================================================
 # ⬇️ START OF "MAJOR APPS" TOOL (v25) ⬇️
 # ==============================================================================
+# The "Watchlist" - Add more here if you want!
+WATCHLIST = {
+    # Browsers
+    'chrome': 'Google Chrome', 'msedge': 'Microsoft Edge', 'firefox': 'Firefox', 'brave': 'Brave Browser',
+    # Dev Tools
+    'code': 'VS Code', 'devenv': 'Visual Studio (IDE)', 'idea64': 'IntelliJ IDEA', 'pycharm64': 'PyCharm',
+    'java': 'Java Runtime', 'javaw': 'Java Runtime (Windowed)', 'node': 'Node.js', 'python': 'Python',
+    'postgres': 'PostgreSQL', 'mysqld': 'MySQL', 'docker': 'Docker Desktop', 'wsl': 'WSL (Linux)',
+    # Communication & Media
+    'teams': 'Microsoft Teams', 'discord': 'Discord', 'slack': 'Slack', 'spotify': 'Spotify',
+    # Productivity
+    'excel': 'Microsoft Excel', 'winword': 'Microsoft Word', 'powerpnt': 'PowerPoint'
+}
+WATCHLIST_MATCHER = PatternMatcher(WATCHLIST)
+
+
+@TELEMETRY.timed('psutil')
+@TOOL_FLIGHTS.wrap
 def get_major_apps_overview():
     """
     v25 "Major Apps" Tool:
     Scans for a predefined list of popular/heavy applications.
+    v41: one rollup pass over the application trees; each tree root is
+    looked up in the watchlist instead of testing every process against it.
+    v48: the substring fallback goes through a memoized `PatternMatcher`.
     """
     print("🤖 (AI Tool): Running get_major_apps_overview()...")
-    
-    # The "Watchlist" - Add more here if you want!
-    WATCHLIST = {
-        # Browsers
-        'chrome': 'Google Chrome', 'msedge': 'Microsoft Edge', 'firefox': 'Firefox', 'brave': 'Brave Browser',
-        # Dev Tools
-        'code': 'VS Code', 'devenv': 'Visual Studio (IDE)', 'idea64': 'IntelliJ IDEA', 'pycharm64': 'PyCharm',
-        'java': 'Java Runtime', 'javaw': 'Java Runtime (Windowed)', 'node': 'Node.js', 'python': 'Python',
-        'postgres': 'PostgreSQL', 'mysqld': 'MySQL', 'docker': 'Docker Desktop', 'wsl': 'WSL (Linux)',
-        # Communication & Media
-        'teams': 'Microsoft Teams', 'discord': 'Discord', 'slack': 'Slack', 'spotify': 'Spotify',
-        # Productivity
-        'excel': 'Microsoft Excel', 'winword': 'Microsoft Word', 'powerpnt': 'PowerPoint'
-    }
 
     found_apps = {}
 
     try:
-        for proc in psutil.process_iter(['name', 'memory_info']):
-            try:
-                p_name = proc.info['name'].lower()
-                # Check if process name key is a substring of the full process name
-                for key in WATCHLIST.keys():
-                    if key in p_name:
-                        readable_name = WATCHLIST[key]
-                        if readable_name not in found_apps:
-                            found_apps[readable_name] = {'count': 0, 'ram_mb': 0.0}
-                        found_apps[readable_name]['count'] += 1
-                        found_apps[readable_name]['ram_mb'] += proc.info['memory_info'].rss / (1024 * 1024)
-                        break # Found a match for this process, move to next process
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
+        rollup = PROCESS_TREE.rollup()
+        check_cancelled()
+        for root, tree in rollup.items():
+            stem = _process_stem(tree['name'])
+            # Exact name first; substring only for the (few) tree roots, e.g. "Docker Desktop"
+            key = stem if stem in WATCHLIST else WATCHLIST_MATCHER.find_cached(stem)
+            if key is None:
+                continue
+            app = found_apps.setdefault(WATCHLIST[key], {'count': 0, 'ram_mb': 0.0, 'cpu': 0.0})
+            app['count'] += tree['count']
+            app['ram_mb'] += tree['rss'] / (1024 * 1024)
+            app['cpu'] += tree['cpu']
 
         if not found_apps:
             return "**No major applications from my watchlist are currently running.**\n\n(My watchlist includes common browsers, dev tools, and office apps.)"
@@ -309,200 +818,720 @@ def get_major_apps_overview():
 
         report = "**Major Applications Currently Running (from Watchlist):**\n\n"
         for app_name, data in sorted_apps:
-            report += f"🔹 **{app_name}**: {data['count']} processes, using **{data['ram_mb']:.0f} MB** RAM\n"
+            report += f"🔹 **{app_name}**: {data['count']} processes, using **{data['ram_mb']:.0f} MB** RAM, {data['cpu']:.1f}% CPU\n"
         
         print("🤖 (AI Tool): Major apps report generated.")
         return report
 
+    except QueryCancelled:
+        raise
     except Exception as e:
         print(f"Error in get_major_apps_overview: {e}")
         return f"Error scanning for major apps: {e}"
 # ==============================================================================
 # ⬆️ END OF "MAJOR APPS" TOOL (v25) ⬆️
 # ==============================================================================
-        
-class AIExplainer:
-    def __init__(self, api_key):
-        self.client = OpenAI(api_key=api_key)
-        self.model = "gpt-4o-mini"
-        self.cache = {}
-    
-    def explain_event(self, event_id, event_type, source, message):
-        cache_key = f"{event_id}_{event_type}_{source}_{message[:50]}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-        
-        try:
-            message_snippet = message[:800]
-            
-            prompt = f"""Generate a comprehensive, detailed explanation for this Windows event:
-Event ID: {event_id}, Type: {event_type}, Source: {source}, Message: {message_snippet}
-Provide response in this EXACT JSON format:
-{{
-    "title": "Brief title with emoji (e.g., 🔄 System Uptime Recorded)",
-    "simple": "One clear sentence explaining what happened in plain English",
-    "detail": "4-5 sentences providing comprehensive technical details, root cause analysis, potential impacts, and context. Be thorough and educational.",
-    "severity": "info/warning/error",
-    "action": "2-3 sentences with specific actionable steps the user should take, with emojis",
-    "technical": "Detailed technical breakdown including: what triggered this event, system components involved, and any relevant configuration details",
-    "impact": "What this event means for system performance, security, and stability",
-    "prevention": "How to prevent similar events or warnings in the future",
-    "icon": "Single emoji that represents this event"
-}}"""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a Windows system expert who provides detailed, comprehensive technical analysis in simple language. Always respond with valid JSON only. Be thorough and educational."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=800
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            self.cache[cache_key] = result
-            return result
-            
-        except Exception as e:
-            icon_map = {'Error': '❌', 'Warning': '⚠️', 'Information': 'ℹ️'}
-            icon = icon_map.get(event_type, 'ℹ️')
-            
-            return {
-                'title': f'{icon} {source} Event',
-                'simple': f'{source} generated a {event_type.lower()} event',
-                'detail': message[:300] if message else 'A system event occurred.',
-                'severity': event_type.lower(),
-                'action': '✅ Review the event details and monitor for recurring patterns.',
-                'technical': f'Event triggered by {source} component.',
-                'impact': 'Minimal impact on system performance.',
-                'prevention': 'Keep your system updated and monitor regularly.',
-                'icon': icon
-            }
 
 #
 # ==============================================================================
-# ⬇️ START OF AI ASSISTANT (v25 "Major Apps & History" SPECIALIST BRAIN) ⬇️
+# ⬇️ START OF PROCESS LIFECYCLE TRACKER (v40) ⬇️
 # ==============================================================================
 #
-class AIAssistant:
-    def __init__(self, api_key):
-        self.client = OpenAI(api_key=api_key)
-        self.model = "gpt-4o-mini"
-    def extract_process_name(self, user_msg):
-        """
-    Uses GPT to extract the actual application or process name from a user's query.
-    """
-        prompt = f"""
-Extract the REAL application or process name from this message:
+class ProcessRun:
+    """v40: One run of a process, keyed on (pid, create_time) so a reused PID is a new run."""
+    __slots__ = ('pid', 'create_time', 'exit_time', 'name', 'exe', 'ppid', 'parent', 'peak_rss')
 
-"{user_msg}"
+    def __init__(self, pid, create_time, name, exe=None, ppid=None, parent=None, peak_rss=0, exit_time=None):
+        self.pid = pid
+        self.create_time = create_time
+        self.exit_time = exit_time
+        self.name = sys.intern(name or '?')
+        self.exe = sys.intern(exe) if exe else None
+        self.ppid = ppid
+        self.parent = sys.intern(parent) if parent else None
+        self.peak_rss = peak_rss
 
-Reply with only the process name in lowercase (NO sentences).
-Examples:
-- "visual studio code" -> code
-- "vs code" -> code
-- "visual studio" -> devenv
-- "google chrome" -> chrome
-- "microsoft edge" -> msedge
-- "mysql server" -> mysqld
-- "postgres database" -> postgres
-- "steam client" -> steam
-- "docker desktop" -> docker
-- "which app uses port 8080" -> none
+    @property
+    def key(self):
+        return self.pid, self.create_time
 
-If unsure, reply "none".
-"""
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
 
-        try:
-            res = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            max_tokens=5
-            )
-            return res.choices[0].message.content.strip().lower()
-        except:
-            return "none"
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['pid'], data['create_time'], data['name'], data.get('exe'), data.get('ppid'),
+                   data.get('parent'), data.get('peak_rss', 0), data.get('exit_time'))
 
 
-    
-    def get_ai_plan(self, chat_history): 
-        """
-        UPDATED: v25 - Added "Major Apps" tool (v25) and
-        process history NLU (v24).
-        """
-        
-        current_time_str = datetime.datetime.now().strftime('%Y-%m-%d %A, %I:%M %p')
-        today_date_str = datetime.date.today().strftime('%Y-%m-%d')
-        yesterday_date_str = (datetime.date.today() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        history_string = ""
-        for msg in chat_history:
-            role = "user" if msg['role'] == "user" else "assistant"
-            history_string += f"{role}: {msg['content']}\n"
-        
-        system_prompt = f"""
-You are an "Event Log Agent", a conversational AI expert with real-time "Task Manager", "Uptime", and "Specific Process" tools.
-Your job is to analyze the user's *intent* (in any language) in the context of the chat history and decide on a plan.
-Today's date and time is: **{current_time_str}**.
+def _process_stem(name):
+    name = (name or '').lower()
+    return name[:-4] if name.endswith('.exe') else name
 
-You MUST respond in one of six valid JSON formats:
 
----
-**FORMAT 1: CHAT (Follow-up question)**
-If the user's latest message is a question *about the events you just presented* (e.g., "are these serious?", "what is 'volsnap'?", "do u think these can be issue or others", "yeh kya hai?").
-**Your Plan:** Answer conversationally.
-{{
-    "action": "chat",
-    "response": "Your conversational answer here. Be helpful, concise, and use markdown. Use the user's language."
-}}
+class ProcessTracker:
+    """
+    v40 Process Lifecycle:
+    Answers "when was chrome last opened / closed" without Security-log
+    auditing (4688/4689). Each poll diffs `psutil.pids()` against the known
+    runs: new PIDs are looked up once (create time, name, exe, parent, RSS),
+    vanished ones are closed with the poll time as their exit time. RSS (and
+    PID reuse) is re-checked only every `RSS_EVERY` polls. Finished runs go
+    to a bounded in-memory history and, if `history_path` is set, to a JSON
+    lines file that is reloaded on the next start.
 
----
-**FORMAT 2: GET BOOT TIME (Uptime query)**
-If the user asks "pc kab se on hai?", "when did my pc last boot?", "system uptime".
-**Your Plan:** Use the specialist "Uptime" tool.
-{{
-    "action": "get_boot_time"
-}}
+    The CPU the tracker itself spends is measured per poll; when it goes over
+    `CPU_BUDGET` of one core the poll interval backs off (up to `MAX_INTERVAL`).
+    """
+    INTERVAL = 2.0
+    MAX_INTERVAL = 30.0
+    RSS_EVERY = 10
+    CPU_BUDGET = 0.01
+    HISTORY = 20000
 
----
-**FORMAT 3: SEARCH LOGS (Past-tense / "Last Event" query)**
-If the user asks about a *past* event (e.g., "what happened *yesterday*?", "pc *crashed last night*") OR a specific "last" event ("*last* restart", "*last* shutdown", "*last* update", "*last crash for chrome*").
-**Your Plan:** Search *only* the Event Logs.
-{{
-    "action": "search_logs",
-    "params": {{ (search parameters) }}
-}}
+    def __init__(self, history_path=None, interval=None):
+        self.history_path = history_path
+        self.interval = interval or self.INTERVAL
+        self.live = {}
+        self.history = deque(maxlen=self.HISTORY)
+        self.tracking_since = None
+        self._lock = threading.Lock()
+        self._polls = 0
+        self._cpu_spent = 0.0
+        self._measured_since = None
+        self._history_lines = 0
+        self._stop = threading.Event()
+        self._thread = None
+        if history_path and os.path.exists(history_path):
+            try:
+                self._load()
+            except Exception as e:
+                print(f"⚠️ Could not load process history from {history_path}: {e}")
 
----
-**FORMAT 4: HYBRID ANALYSIS (Present-tense issue)**
-If the user asks about a *current* problem (e.g., "why *is* my PC slow?", "my pc *is* hanging", "what *is* using my CPU?", "PC abhi slow kyu hai?", "achaanak se ye ram usage kyu badh gai meri").
-**Your Plan:** Check *both* "Task Manager" stats and *recent* Event Logs.
-{{
+    # --- polling ---
+    def _open(self, pid):
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                create_time = proc.create_time()
+                name = proc.name()
+                ppid = proc.ppid()
+                try:
+                    rss = proc.memory_info().rss
+                except (psutil.AccessDenied, psutil.ZombieProcess):
+                    rss = 0
+                try:
+                    exe = proc.exe()
+                except (psutil.AccessDenied, psutil.ZombieProcess, OSError):
+                    exe = None
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, ValueError):
+            return None
+        parent = self.live.get(ppid)
+        return ProcessRun(pid, create_time, name, exe, ppid, parent.name if parent else None, rss)
+
+    def _close(self, run, now):
+        run.exit_time = now
+        self.history.append(run)
+        return run
+
+    def poll(self):
+        """One diff of the PID set; returns (started, exited) runs."""
+        cpu_start = time.process_time()
+        now = time.time()
+        pids = set(psutil.pids())
+        started, exited = [], []
+        with self._lock:
+            for pid in [pid for pid in self.live if pid not in pids]:
+                exited.append(self._close(self.live.pop(pid), now))
+            for pid in pids.difference(self.live):
+                run = self._open(pid)
+                if run is not None:
+                    self.live[pid] = run
+                    started.append(run)
+            self._polls += 1
+            if self._polls % self.RSS_EVERY == 0:
+                self._refresh_rss(now, started, exited)
+            first = self.tracking_since is None
+            if first:
+                self.tracking_since = now
+                started = []  # the first poll only finds what was already running
+        if exited and self.history_path:
+            self._append(exited)
+        TELEMETRY.incr('processes_started', len(started))
+        TELEMETRY.incr('processes_exited', len(exited))
+        if first:
+            self._measured_since = time.time()  # the one-off baseline scan is not part of the steady-state overhead
+        else:
+            self._cpu_spent += time.process_time() - cpu_start
+        return started, exited
+
+    def _refresh_rss(self, now, started, exited):
+        for pid, run in list(self.live.items()):
+            try:
+                proc = psutil.Process(pid)
+                with proc.oneshot():
+                    if proc.create_time() != run.create_time:
+                        raise psutil.NoSuchProcess(pid)
+                    info = proc.memory_info()
+                run.peak_rss = max(run.peak_rss, getattr(info, 'peak_wset', 0) or info.rss)
+            except psutil.NoSuchProcess:
+                exited.append(self._close(self.live.pop(pid), now))
+                fresh = self._open(pid)
+                if fresh is not None:
+                    self.live[pid] = fresh
+                    started.append(fresh)
+            except (psutil.AccessDenied, psutil.ZombieProcess):
+                pass
+
+    @property
+    def cpu_overhead(self):
+        """Fraction of one core spent polling since the baseline scan."""
+        elapsed = time.time() - self._measured_since if self._measured_since else 0
+        return self._cpu_spent / elapsed if elapsed > 0 else 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return self
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    with TELEMETRY.span('process_tracker.poll'):
+                        self.poll()
+                except Exception as e:
+                    print(f"⚠️ Process tracker poll failed: {e}")
+                if self._polls > 5 and self.cpu_overhead > self.CPU_BUDGET and self.interval < self.MAX_INTERVAL:
+                    self.interval = min(self.interval * 1.5, self.MAX_INTERVAL)
+                    print(f"🐢 Process tracker over its CPU budget ({self.cpu_overhead:.2%}), polling every {self.interval:g}s")
+                self._stop.wait(self.interval)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # --- history store ---
+    def _append(self, runs):
+        with open(self.history_path, 'a', encoding='utf-8') as f:
+            for run in runs:
+                f.write(json.dumps(run.to_dict()) + "\n")
+        self._history_lines += len(runs)
+        if self._history_lines > 2 * self.HISTORY:
+            with self._lock:
+                keep = list(self.history)
+            with open(self.history_path, 'w', encoding='utf-8') as f:
+                for run in keep:
+                    f.write(json.dumps(run.to_dict()) + "\n")
+            self._history_lines = len(keep)
+
+    def _load(self):
+        with open(self.history_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    self.history.append(ProcessRun.from_dict(json.loads(line)))
+                    self._history_lines += 1
+
+    # --- queries ---
+    def runs(self, name):
+        """(running, finished) runs whose process name matches `name` ("chrome", "chrome.exe"), newest first."""
+        stem = _process_stem(name)
+        with self._lock:
+            candidates = list(self.live.values()), list(self.history)
+        matched = []
+        for runs in candidates:
+            exact = [run for run in runs if _process_stem(run.name) == stem]
+            matched.append(exact or [run for run in runs if stem and stem in _process_stem(run.name)])
+        running, finished = matched
+        running.sort(key=lambda run: run.create_time, reverse=True)
+        finished.sort(key=lambda run: run.exit_time, reverse=True)
+        return running, finished
+
+    def describe(self, name):
+        """Markdown answer for "when was <name> last opened / closed"."""
+        running, finished = self.runs(name)
+        fmt = lambda ts: datetime.datetime.fromtimestamp(ts).strftime('%b %d, %I:%M:%S %p')
+        since = fmt(min([self.tracking_since or time.time()] + [run.create_time for run in self.history]))
+        if not running and not finished:
+            return f"**No process matching '{name}' has run since tracking started ({since}).**"
+        label = (running or finished)[0].name
+        lines = [f"**Process history for {label}:**", ""]
+        if running:
+            newest = running[0]
+            lines.append(f"🟢 **Running now:** {len(running)} instance(s); newest started **{fmt(newest.create_time)}** "
+                         f"(PID {newest.pid}{', parent ' + newest.parent if newest.parent else ''}), oldest started {fmt(running[-1].create_time)}.")
+        else:
+            lines.append("⚪ **Not running now.**")
+        if finished:
+            last = finished[0]
+            lines.append(f"🔴 **Last closed:** {fmt(last.exit_time)} (PID {last.pid}, ran {datetime.timedelta(seconds=round(last.exit_time - last.create_time))}, peak {last.peak_rss / (1024 * 1024):.0f} MB).")
+            starts = sorted(running + finished, key=lambda run: run.create_time, reverse=True)
+            lines.append(f"🚀 **Last started:** {fmt(starts[0].create_time)}.")
+            lines.append("")
+            lines.append("**Recent runs:**")
+            for run in finished[:5]:
+                lines.append(f"- {fmt(run.create_time)} → {fmt(run.exit_time)} | PID {run.pid} | peak {run.peak_rss / (1024 * 1024):.0f} MB | {run.exe or run.name}")
+        lines.append("")
+        lines.append(f"_Tracked by polling the process list every {self.interval:g}s since {since}; exit times are accurate to one poll._")
+        return "\n".join(lines)
+# ==============================================================================
+# ⬆️ END OF PROCESS LIFECYCLE TRACKER (v40) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF PROCESS TREE (v41) ⬇️
+# ==============================================================================
+#
+class ProcessTree:
+    """
+    v41 Process Tree:
+    A cached parent/child view of the running processes. `refresh` only
+    opens PIDs it has not seen before (and drops vanished ones), so the
+    psutil.Process objects - and their CPU baselines - survive between calls.
+    `rollup` measures every process once and sums CPU, RSS, handles and I/O
+    over application trees: a process belongs to its topmost ancestor below
+    a launcher (explorer, services, shells, ...), so Chrome's GPU/renderer
+    helpers and VS Code's node helpers are counted with their app.
+    """
+    LAUNCHERS = frozenset({'system idle process', 'system', 'smss', 'csrss', 'wininit', 'winlogon', 'services', 'svchost',
+                           'explorer', 'userinit', 'sihost', 'runtimebroker', 'dllhost', 'taskhostw',
+                           'cmd', 'powershell', 'pwsh', 'conhost', 'windowsterminal', 'openconsole',
+                           'init', 'systemd', 'launchd', 'kthreadd', 'sshd', 'login', 'bash', 'zsh', 'sh', 'fish'})
+    CPU_WINDOW = 0.25
+    CPU_STALE = 5.0
+    MAX_DEPTH = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procs = {}      # pid -> [psutil.Process, ppid, stem, name]
+        self._children = {}   # ppid -> set of pids
+        self._measured_at = 0.0
+
+    def _forget(self, pid):
+        entry = self._procs.pop(pid, None)
+        if entry is not None:
+            siblings = self._children.get(entry[1])
+            if siblings:
+                siblings.discard(pid)
+
+    def refresh(self):
+        """Incremental update: new PIDs are opened (and CPU-primed) once, gone PIDs are dropped."""
+        pids = set(psutil.pids())
+        with self._lock:
+            for pid in [pid for pid in self._procs if pid not in pids]:
+                self._forget(pid)
+            for pid in pids.difference(self._procs):
+                try:
+                    proc = psutil.Process(pid)
+                    with proc.oneshot():
+                        name, ppid = proc.name(), proc.ppid()
+                        proc.cpu_percent(None)
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    continue
+                self._procs[pid] = [proc, ppid, _process_stem(name), name]
+                self._children.setdefault(ppid, set()).add(pid)
+        TELEMETRY.incr('process_tree_pids', len(pids))
+
+    def _parent(self, pid):
+        entry = self._procs.get(pid)
+        if entry is None or entry[1] == pid:
+            return None
+        parent = self._procs.get(entry[1])
+        if parent is None:
+            return None
+        try:
+            # A PID can be reused: a "parent" younger than its child is somebody else.
+            if parent[0].create_time() > entry[0].create_time():
+                return None
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+        return entry[1]
+
+    def root_of(self, pid, _cache=None):
+        """The application root of `pid` (the topmost ancestor below a launcher)."""
+        cache = _cache if _cache is not None else {}
+        chain = []
+        while pid not in cache and len(chain) < self.MAX_DEPTH:
+            chain.append(pid)
+            parent = self._parent(pid)
+            if parent is None or parent in chain or self._procs[parent][2] in self.LAUNCHERS:
+                break
+            pid = parent
+        root = cache.get(pid, pid)
+        for p in chain:
+            cache[p] = root
+        return root
+
+    def processes(self):
+        """(pid, psutil.Process, name) for every cached process (call `refresh` first)."""
+        with self._lock:
+            return [(pid, entry[0], entry[3]) for pid, entry in self._procs.items()]
+
+    def ancestors(self, pid):
+        seen = {pid}
+        parent = self._parent(pid)
+        while parent is not None and parent not in seen and len(seen) < self.MAX_DEPTH:
+            yield parent
+            seen.add(parent)
+            parent = self._parent(parent)
+
+    def subtree(self, pid):
+        seen, stack = {pid}, [pid]
+        while stack:
+            for child in self._children.get(stack.pop(), ()):
+                if child not in seen and self._parent(child) is not None:
+                    seen.add(child)
+                    stack.append(child)
+        return seen
+
+    def _measure(self, pid):
+        proc = self._procs[pid][0]
+        try:
+            with proc.oneshot():
+                if not proc.is_running():
+                    raise psutil.NoSuchProcess(pid)
+                row = {'cpu': proc.cpu_percent(None), 'rss': proc.memory_info().rss, 'handles': 0, 'io_read': 0, 'io_write': 0}
+                try:
+                    row['handles'] = proc.num_handles() if hasattr(proc, 'num_handles') else proc.num_fds()
+                except (psutil.AccessDenied, psutil.ZombieProcess):
+                    pass
+                try:
+                    io = proc.io_counters()
+                    row['io_read'], row['io_write'] = io.read_bytes, io.write_bytes
+                except (psutil.AccessDenied, psutil.ZombieProcess, AttributeError):
+                    pass
+            return row
+        except psutil.NoSuchProcess:
+            self._forget(pid)
+        except (psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+        return None
+
+    def rollup(self, pids=None, group=None):
+        """
+        One pass over the processes: {group_pid: {'name', 'count', 'cpu', 'rss',
+        'handles', 'io_read', 'io_write', 'names'}}. `group(pid)` picks the
+        bucket of a process (default: its application root).
+        """
+        self.refresh()
+        with self._lock:
+            if time.time() - self._measured_at > self.CPU_STALE:
+                # CPU baselines are too old to mean "now": take a short fresh window.
+                for entry in self._procs.values():
+                    try:
+                        entry[0].cpu_percent(None)
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        pass
+                time.sleep(self.CPU_WINDOW)
+            self._measured_at = time.time()
+            cache = {}
+            group = group or (lambda pid: self.root_of(pid, cache))
+            totals = {}
+            for pid in list(pids if pids is not None else self._procs):
+                if pid not in self._procs:
+                    continue
+                row = self._measure(pid)
+                if row is None:
+                    continue
+                key = group(pid)
+                if key not in self._procs:
+                    key = pid
+                agg = totals.get(key)
+                if agg is None:
+                    agg = totals[key] = {'name': self._procs[key][3], 'count': 0, 'cpu': 0.0, 'rss': 0, 'handles': 0,
+                                         'io_read': 0, 'io_write': 0, 'names': Counter()}
+                agg['count'] += 1
+                for field in ('cpu', 'rss', 'handles', 'io_read', 'io_write'):
+                    agg[field] += row[field]
+                agg['names'][self._procs[pid][3]] += 1
+            return totals
+
+    def app_trees(self, query):
+        """
+        Rollups for the processes named like `query` plus all their descendants:
+        one entry per topmost matching process. Exact name matches win over
+        substring matches, so "python" no longer pulls in unrelated tools.
+        """
+        self.refresh()
+        stem = _process_stem(query)
+        with self._lock:
+            exact = {pid for pid, entry in self._procs.items() if entry[2] == stem}
+            matched = exact or {pid for pid, entry in self._procs.items() if stem and stem in entry[2]}
+            owner = {}
+            for top in matched:
+                if not any(parent in matched for parent in self.ancestors(top)):
+                    for pid in self.subtree(top):
+                        owner[pid] = top
+        return self.rollup(pids=owner, group=owner.get)
+
+
+PROCESS_TREE = ProcessTree()
+# ==============================================================================
+# ⬆️ END OF PROCESS TREE (v41) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF I/O RATES (v42) ⬇️
+# ==============================================================================
+#
+class IORateMeter:
+    """
+    v42 I/O Rates:
+    Disk, network and per-process I/O *activity* from the deltas of psutil's
+    cumulative counters between two samples (capacity alone - disk_usage -
+    says nothing about a saturated disk). `disk_queue` is the average number
+    of outstanding disk requests over the interval (busy milliseconds per
+    millisecond, Little's law); above ~1-2 the disk is the bottleneck.
+    Per-process rates reuse PROCESS_TREE's cached Process objects.
+    """
+    TOP_PROCESSES = 5
+    NIC_STATS_TTL = 60.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = None
+        self._nic_speeds = {}
+        self._nic_speeds_at = 0.0
+
+    def _snapshot(self):
+        now, wall = time.monotonic(), time.time()
+        disk = psutil.disk_io_counters()
+        nics = {nic: counters for nic, counters in (psutil.net_io_counters(pernic=True) or {}).items()
+                if not nic.lower().startswith(('lo', 'loopback'))}
+        procs = {}
+        for pid, proc, name in PROCESS_TREE.processes():
+            try:
+                io = proc.io_counters()
+                procs[(pid, proc.create_time())] = (name, io.read_bytes + io.write_bytes)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, AttributeError):
+                pass
+        return now, disk, nics, procs, wall
+
+    def _speeds(self):
+        if time.monotonic() - self._nic_speeds_at > self.NIC_STATS_TTL:
+            try:
+                self._nic_speeds = {nic: stats.speed for nic, stats in psutil.net_if_stats().items() if stats.isup}
+            except Exception:
+                self._nic_speeds = {}
+            self._nic_speeds_at = time.monotonic()
+        return self._nic_speeds
+
+    def prime(self):
+        """Takes a baseline without reporting (the next `sample` measures from here)."""
+        PROCESS_TREE.refresh()
+        with self._lock:
+            self._last = self._snapshot()
+
+    def sample(self):
+        """Rates since the previous sample (MB/s), or None on the very first call."""
+        PROCESS_TREE.refresh()
+        with self._lock:
+            current = self._snapshot()
+            last, self._last = self._last, current
+        if last is None:
+            return None
+        elapsed = max(current[0] - last[0], 1e-6)
+        mb = 1024 * 1024
+        rates = {}
+        disk, prev_disk = current[1], last[1]
+        if disk is not None and prev_disk is not None:
+            rates['disk_read'] = max(disk.read_bytes - prev_disk.read_bytes, 0) / elapsed / mb
+            rates['disk_write'] = max(disk.write_bytes - prev_disk.write_bytes, 0) / elapsed / mb
+            rates['disk_iops'] = max(disk.read_count + disk.write_count - prev_disk.read_count - prev_disk.write_count, 0) / elapsed
+            busy_ms = (disk.read_time + disk.write_time) - (prev_disk.read_time + prev_disk.write_time)
+            rates['disk_queue'] = max(busy_ms, 0) / (elapsed * 1000)
+        speeds = self._speeds()
+        nics = {}
+        for nic, counters in current[2].items():
+            prev = last[2].get(nic)
+            if prev is None:
+                continue
+            recv = max(counters.bytes_recv - prev.bytes_recv, 0) / elapsed / mb
+            sent = max(counters.bytes_sent - prev.bytes_sent, 0) / elapsed / mb
+            if recv or sent:
+                speed = speeds.get(nic) or 0  # Mbit/s, 0 if unknown
+                nics[nic] = {'recv': recv, 'sent': sent, 'util': (recv + sent) * 8 * 1.048576 / speed * 100 if speed else None}
+        rates['net_recv'] = sum(n['recv'] for n in nics.values())
+        rates['net_sent'] = sum(n['sent'] for n in nics.values())
+        utils = [n['util'] for n in nics.values() if n['util'] is not None]
+        rates['net_util'] = max(utils) if utils else None
+        rates['nics'] = nics
+        top = []
+        for key, (name, total) in current[3].items():
+            prev = last[3].get(key)
+            # A process started since the last sample did all of its I/O inside the interval
+            # (1 s of slack: create times are only that precise on some platforms).
+            before = prev[1] if prev is not None else (0 if key[1] >= last[4] - 1.0 else None)
+            if before is not None and total > before:
+                top.append({'pid': key[0], 'name': name, 'mb_s': (total - before) / elapsed / mb})
+        rates['top_io'] = heapq.nlargest(self.TOP_PROCESSES, top, key=lambda row: row['mb_s'])
+        return rates
+
+    @staticmethod
+    def report(rates):
+        """Markdown lines for the "Task Manager" report."""
+        if not rates:
+            return "* **Disk / Network activity:** not measured yet."
+        lines = [f"* **Disk Activity:** read {rates.get('disk_read', 0):.1f} MB/s, write {rates.get('disk_write', 0):.1f} MB/s, "
+                 f"{rates.get('disk_iops', 0):.0f} IOPS, queue {rates.get('disk_queue', 0):.2f}"
+                 + (" ⚠️ (disk saturated)" if rates.get('disk_queue', 0) >= 2 else ""),
+                 f"* **Network:** ↓ {rates['net_recv']:.2f} MB/s, ↑ {rates['net_sent']:.2f} MB/s"
+                 + (f" ({rates['net_util']:.0f}% of link)" if rates.get('net_util') is not None else "")]
+        if rates['top_io']:
+            lines.append("\n**Top I/O Processes:**")
+            lines.extend(f"- {row['name']} (PID: {row['pid']}): {row['mb_s']:.2f} MB/s" for row in rates['top_io'])
+        return "\n".join(lines)
+
+
+IO_METER = IORateMeter()
+# ==============================================================================
+# ⬆️ END OF I/O RATES (v42) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF PROMPT TEMPLATES (v36) ⬇️
+# ==============================================================================
+#
+class PromptTemplate:
+    """
+    v36 Prompt Templates:
+    A prompt split into a `static` part (instructions and examples, sent
+    first and byte-identical on every call, so the provider can serve it from
+    its prompt cache) and a `volatile` str.format template for everything that
+    changes per call (dates, chat history, event data), which always goes last.
+    Bump `version` when the static text changes; token usage is reported per
+    `name@vN` in Diagnostics.
+    """
+    def __init__(self, name, version, static, volatile):
+        self.name = name
+        self.version = version
+        self.static = static
+        self.volatile = volatile
+
+    @property
+    def key(self):
+        return f"{self.name}@v{self.version}"
+
+    def messages(self, **fields):
+        return [
+            {"role": "system", "content": self.static},
+            {"role": "user", "content": self.volatile.format(**fields)},
+        ]
+
+
+PROMPTS = {}
+
+
+def register_prompt(name, version, static, volatile):
+    PROMPTS[name] = PromptTemplate(name, version, static, volatile)
+    return PROMPTS[name]
+
+
+EXPLAIN_PROMPT = register_prompt('explain_event', 1, """You are a Windows system expert who provides detailed, comprehensive technical analysis in simple language. Always respond with valid JSON only. Be thorough and educational.
+
+Generate a comprehensive, detailed explanation for the Windows event in the user message.
+Provide response in this EXACT JSON format:
+{
+    "title": "Brief title with emoji (e.g., 🔄 System Uptime Recorded)",
+    "simple": "One clear sentence explaining what happened in plain English",
+    "detail": "4-5 sentences providing comprehensive technical details, root cause analysis, potential impacts, and context. Be thorough and educational.",
+    "severity": "info/warning/error",
+    "action": "2-3 sentences with specific actionable steps the user should take, with emojis",
+    "technical": "Detailed technical breakdown including: what triggered this event, system components involved, and any relevant configuration details",
+    "impact": "What this event means for system performance, security, and stability",
+    "prevention": "How to prevent similar events or warnings in the future",
+    "icon": "Single emoji that represents this event"
+}""",
+    "Event ID: {event_id}, Type: {event_type}, Source: {source}, Message: {message}")
+
+EXTRACT_PROCESS_PROMPT = register_prompt('extract_process_name', 1, """
+Extract the REAL application or process name from the user's message.
+
+Reply with only the process name in lowercase (NO sentences).
+Examples:
+- "visual studio code" -> code
+- "vs code" -> code
+- "visual studio" -> devenv
+- "google chrome" -> chrome
+- "microsoft edge" -> msedge
+- "mysql server" -> mysqld
+- "postgres database" -> postgres
+- "steam client" -> steam
+- "docker desktop" -> docker
+- "which app uses port 8080" -> none
+
+If unsure, reply "none".
+""",
+    '"{user_msg}"')
+
+PLANNER_PROMPT = register_prompt('planner', 2, """
+You are an "Event Log Agent", a conversational AI expert with real-time "Task Manager", "Uptime", and "Specific Process" tools.
+Your job is to analyze the user's *intent* (in any language) in the context of the chat history and decide on a plan.
+
+You MUST respond in one of six valid JSON formats:
+
+---
+**FORMAT 1: CHAT (Follow-up question)**
+If the user's latest message is a question *about the events you just presented* (e.g., "are these serious?", "what is 'volsnap'?", "do u think these can be issue or others", "yeh kya hai?").
+**Your Plan:** Answer conversationally.
+{
+    "action": "chat",
+    "response": "Your conversational answer here. Be helpful, concise, and use markdown. Use the user's language."
+}
+
+---
+**FORMAT 2: GET BOOT TIME (Uptime query)**
+If the user asks "pc kab se on hai?", "when did my pc last boot?", "system uptime".
+**Your Plan:** Use the specialist "Uptime" tool.
+{
+    "action": "get_boot_time"
+}
+
+---
+**FORMAT 3: SEARCH LOGS (Past-tense / "Last Event" query)**
+If the user asks about a *past* event (e.g., "what happened *yesterday*?", "pc *crashed last night*") OR a specific "last" event ("*last* restart", "*last* shutdown", "*last* update", "*last crash for chrome*").
+**Your Plan:** Search *only* the Event Logs.
+{
+    "action": "search_logs",
+    "params": { (search parameters) }
+}
+
+---
+**FORMAT 4: HYBRID ANALYSIS (Present-tense issue)**
+If the user asks about a *current* problem (e.g., "why *is* my PC slow?", "my pc *is* hanging", "what *is* using my CPU?", "PC abhi slow kyu hai?", "achaanak se ye ram usage kyu badh gai meri").
+**Your Plan:** Check *both* "Task Manager" stats and *recent* Event Logs.
+{
     "action": "hybrid_analysis",
-    "params": {{ (search parameters for the logs) }},
+    "params": { (search parameters for the logs) },
     "analysis_request": "A 1-sentence summary of the user's goal (e.g., 'User is checking for real-time performance issues.')"
-}}
+}
 
 ---
 **FORMAT 5: GET PROCESS STATS (Specific Process query)**
 If the user asks about the CPU or RAM of a *specific* running program (e.g., "chrome ram", "visual studio cpu", "code.exe usage", "visual studio code ki ram usage kitni hai").
 **Your Plan:** Use the specialist "Specific Process" tool.
-{{
+{
     "action": "get_process_stats",
-    "params": {{
+    "params": {
         "process_name": "The name of the process (e.g., 'chrome', 'visual studio', 'code.exe')"
-    }}
-}}
+    }
+}
 
 ---
 **FORMAT 6: CHECK MAJOR APPS (General Overview query)**
 If the user asks "what major apps are running?", "what heavy processes are on?", "kaunse bade apps chal rahe hain?", "overview of my apps".
 **Your Plan:** Use the specialist "Major Apps" tool.
-{{
+{
     "action": "check_major_apps"
-}}
+}
 
 ---
 FORMAT 7: PORT ANALYSIS (Port or Application Network Query)
@@ -512,13 +1541,24 @@ If user asks:
 - "on which port is mysql running?"
 - "show ports being used"
 Your Plan:
-{{
+{
     "action": "port_analysis",
-    "params": {{
+    "params": {
         "port": "...",          (optional)
         "process_name": "..."   (optional)
-    }}
-}}
+    }
+}
+
+---
+**FORMAT 8: PROCESS HISTORY (When was an app opened / closed)**
+If the user asks when a program was last started, opened, closed or restarted (e.g., "when was chrome last opened?", "when did devenv.exe restart?", "teams kab band hua?").
+**Your Plan:** Use the specialist "Process History" tool (it tracks process starts/exits itself; no Security auditing needed).
+{
+    "action": "process_history",
+    "params": {
+        "process_name": "The executable name (e.g., 'chrome.exe', 'devenv.exe')"
+    }
+}
 ---
 
 **How to Create Search `params` (Use your NLU)**
@@ -539,11 +1579,11 @@ Your Plan:
     * **Your Plan:** Use `action: "get_process_stats"`.
     * **NLU Rule:** Extract the *executable name* if you know it, or the common name if you don't.
     * **Examples:**
-        * "chrome" -> `params: {{"process_name": "chrome"}}` (matches chrome.exe)
-        * "visual studio" -> `params: {{"process_name": "devenv"}}` (matches devenv.exe)
-        * "visual studio code" OR "vs code" -> `params: {{"process_name": "code"}}` (matches Code.exe)
-        * "explorer" -> `params: {{"process_name": "explorer"}}` (matches explorer.exe)
-        * "word" -> `params: {{"process_name": "winword"}}` (matches WINWORD.EXE)
+        * "chrome" -> `params: {"process_name": "chrome"}` (matches chrome.exe)
+        * "visual studio" -> `params: {"process_name": "devenv"}` (matches devenv.exe)
+        * "visual studio code" OR "vs code" -> `params: {"process_name": "code"}` (matches Code.exe)
+        * "explorer" -> `params: {"process_name": "explorer"}` (matches explorer.exe)
+        * "word" -> `params: {"process_name": "winword"}` (matches WINWORD.EXE)
 
 * **Concept: Application Crash/Hang (NEW v24 - Reliable)**
     * **User says:** "when did chrome last crash?", "show me the last time visual studio hung", "explorer.exe last error"
@@ -554,14 +1594,11 @@ Your Plan:
     * **Set:** `find_most_recent: true`.
     * **Set:** `analysis_request: "User is checking for the last Application Crash (1000) or Hang (1002) for 'process_name_here'."`
 
-* **Concept: Application Start/Stop (NEW v24 - Advanced)**
+* **Concept: Application Start/Stop (v40 - Process History)**
     * **User says:** "when was 'chrome.exe' last *opened*?", "when did 'devenv.exe' *restart*?", "last *shutdown* for 'explorer.exe'"
-    * **Your Plan:** Use `action: "search_logs"`.
+    * **Your Plan:** Use `action: "process_history"`.
     * **NLU Rule:** Get the *exact* executable name (e.g., "chrome.exe", "devenv.exe").
-    * **Set:** `log_type: "Security"`.
-    * **Set:** `search_keywords: ["4688", "4689", "executable_name_here"]` (e.g., ["4688", "4689", "chrome.exe"])
-    * **Set:** `find_most_recent: true`.
-    * **Set:** `analysis_request: "User is checking for the last Process Start (4688) or Stop (4689) event for 'executable_name_here'. Note: This requires process auditing to be enabled."`
+    * **Set:** `params: {"process_name": "executable_name_here"}`.
 
 * **Concept: Performance Issues (e.g., "slow", "hang", "lag")**
     * **If Present Tense ("is slow"):** Use `action: "hybrid_analysis"`. Set `log_type: "Application"`, `event_type_filter: ["Error", "Warning"]`, and dates to *today*.
@@ -573,98 +1610,43 @@ Your Plan:
     * **Keywords:** `["6008"]` (crash), `["1074"]` (restart/shutdown), `["6005", "6006"]` (start/stop).
     * **If "last restart" or "last shutdown":** Set `find_most_recent: true`.
 
+* **Concept: Broad Investigation (NEW v27 - Multi-Log)**
+    * **User says:** "what happened last night?", "anything wrong today?", "kal raat kya hua?"
+    * **Your Plan:** Use `action: "search_logs"`.
+    * **Set:** `log_type: ["System", "Application"]` (a list searches several logs in parallel and merges them by time). Add `"Security"` only if the user asks about logons or auditing.
+
+* **Concept: Fleet / Multiple Machines (NEW v29)**
+    * **User says:** "which machines had 6008 last night?", "did any server crash today?", "sab machines pe errors check karo".
+    * **Your Plan:** Use `action: "search_logs"` with the normal search params, plus `hosts: "all"`.
+    * **Set:** `analysis_request` should ask to group the findings by host.
+
 * **Concept: Time (CRITICAL - v21 Precision Rules)**
     * **"Last" Event:** Use `action: "search_logs"`, set `find_most_recent: true`, and **do not** set any dates.
     * **Present Tense ("is slow", "achaanak se"):**
         * Use `action: "hybrid_analysis"`.
-        * The search `params` for the *logs* should be for **today**: `start_date: "{today_date_str}", end_date: "{today_date_str}"`.
+        * The search `params` for the *logs* should be for **today**: `start_date: "TODAY", end_date: "TODAY"`.
     * **Past Tense / Specific Date:**
         * Use `action: "search_logs"`.
         * **"between 3 am and 4 am of 6th november":** `start_date: "2025-11-06"`, `start_time: "03:00"`, `end_date: "2025-11-06"`, `end_time: "04:00"`.
-        * **"last night":** `start_date: "{yesterday_date_str}", start_time: "20:00", end_date: "{today_date_str}", end_time: "06:00"`.
-        * **"yesterday":** `start_date: "{yesterday_date_str}", end_date: "{yesterday_date_str}"`.
-        * **"this morning":** `start_date: "{today_date_str}", end_date: "{today_date_str}", start_time: "06:00", end_time: "11:00"`.
-    * **Default (No time mentioned):** Default to **today**: `start_date: "{today_date_str}", end_date: "{today_date_str}"`.
+        * **"last night":** `start_date: "YESTERDAY", start_time: "20:00", end_date: "TODAY", end_time: "06:00"`.
+        * **"yesterday":** `start_date: "YESTERDAY", end_date: "YESTERDAY"`.
+        * **"this morning":** `start_date: "TODAY", end_date: "TODAY", start_time: "06:00", end_time: "11:00"`.
+    * **Default (No time mentioned):** Default to **today**: `start_date: "TODAY", end_date: "TODAY"`.
+    * `TODAY` and `YESTERDAY` stand for the real dates (YYYY-MM-DD) given at the top of the user message; always write the real dates in `params`.
+""", """Today's date and time is: **{current_time}** (TODAY = {today}, YESTERDAY = {yesterday}).
 
 ---
 **CHAT HISTORY (Analyze This):**
-{history_string}
+{history}
 
 ---
 **Your Decision:**
 Based on the *latest* user message in the context of the history, what is your plan?
-Respond with *only* the valid JSON for "chat", "get_boot_time", "search_logs", "hybrid_analysis", "get_process_stats", or "check_major_apps".
-"""
-        msg = chat_history[-1]['content'].lower()
-
-        import re
-
-        # Case 1: direct port query like "port 8080" / "which app uses port 5000"
-        port_match = re.findall(r"\bport\s*(\d+)\b", msg)
-        if port_match:
-            return {
-                "action": "port_analysis",
-                "params": {"port": port_match[0]}
-            }
-
-        # Case 2: which port a process is using
-        # "mysql port", "on which port is postgres running"
-        if "port" in msg:
-            process_guess = self.extract_process_name(msg)
-            if process_guess != "none":
-                return {
-                    "action": "port_analysis",
-                    "params": {"process_name": process_guess}
-                }
-
-
-        # Case 3: list all ports
-        if any(k in msg for k in ["ports", "all ports", "show ports", "list ports"]):
-            return {"action": "port_analysis", "params": {}}
-
-        try:
-            user_query = chat_history[-1]['content']
-            
-            # Simple check to add context
-            if "today" not in user_query.lower() and "yesterday" not in user_query.lower() and "last" not in user_query.lower() and "november" not in user_query.lower():
-                if "am" in user_query.lower() or "pm" in user_query.lower():
-                    chat_history[-1]['content'] = f"{user_query} (assume this is for today, {today_date_str})"
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt}
-                ],
-                temperature=0.0,
-                max_tokens=1000,
-                response_format={"type": "json_object"}
-            )
-            plan = json.loads(response.choices[0].message.content)
-            
-            # Post-processing safety net
-            if plan.get("action") == "search_logs" or plan.get("action") == "hybrid_analysis":
-                query = chat_history[-1]['content']
-                hang_terms = ['hang', 'freeze', 'lag', 'stuck', 'unresponsive', 'not responding', 'slow', 'feels slow']
-                if any(k in query.lower() for k in hang_terms):
-                    if 'params' not in plan: plan['params'] = {}
-                    plan['params']['log_type'] = 'Application'
-            
-            return plan
-        except Exception as e:
-            print(f"Error getting AI plan: {e}")
-            return {"action": "chat", "response": f"I encountered an error planning my next step: {e}"}
+Respond with *only* the valid JSON for "chat", "get_boot_time", "search_logs", "hybrid_analysis", "get_process_stats", "check_major_apps", "port_analysis", or "process_history".
+""")
 
-    def analyze_hybrid_results(self, analysis_request, realtime_stats, events_data):
-        """
-        v19 PROMPT:
-        Synthesizes "Task Manager" data and Event Log data.
-        """
-        
-        try:
-            events = events_data if isinstance(events_data, list) else []
-            
-            system_prompt = f"""You are a Senior Windows System Administrator.
-A user is investigating a real-time issue. Their goal is: **"{analysis_request}"**
+HYBRID_ANALYSIS_PROMPT = register_prompt('hybrid_analysis', 2, """You are a Senior Windows System Administrator.
+A user is investigating a real-time issue. Their goal is stated at the top of the data they send you.
 You have been given TWO sets of data:
 1.  **Real-time Stats:** The *current* "Task Manager" view.
 2.  **Recent Events:** A list of *recent* relevant logs.
@@ -672,7 +1654,7 @@ Your job is to *correlate and synthesize* this data into a single, high-level, i
 
 **Your Analysis MUST Include:**
 1.  **Executive Summary:** A 2-3 sentence answer to the user's question, *linking* the real-time stats to the event logs.
-2.  **Real-time Finding:** What did you learn from the "Task Manager" data? (High CPU? High RAM? A specific process?)
+2.  **Real-time Finding:** What did you learn from the "Task Manager" data? (High CPU? High RAM? Disk queue saturation? A network hog? A specific process?)
 3.  **Historical Finding:** What did you learn from the *recent* logs? (Any hang events? Errors? Warnings?)
 4.  **Hypothesized Root Cause (Correlation):** How do these two findings relate? (e.g., "The high CPU in `process.exe` *correlates* with the 'Application Hang' event I found for it...")
 5.  **Next Steps:** What should the user check next?
@@ -683,53 +1665,16 @@ Your job is to *correlate and synthesize* this data into a single, high-level, i
 * If no clear correlation is found, state that. (e.g., "I see high CPU, but the recent logs seem unrelated. The high CPU might be temporary.")
 * If no events are found, just report on the real-time stats.
 * Use markdown for formatting.
-"""
-            
-            context = f"**User's Goal:** {analysis_request}\n\n"
-            context += "--- (DATA 1) REAL-TIME STATS ---\n"
-            context += realtime_stats
-            context += "\n\n"
-            context += "--- (DATA 2) RECENT EVENT LOGS ---\n"
-            if events:
-                for i, evt in enumerate(events[:10]):
-                    message_snippet = evt.get('message', '')[:300].strip()
-                    context += f"- [{evt.get('event_type')}] ID {evt.get('event_id')} | {evt.get('time_generated')} | {evt.get('source')} | Msg: {message_snippet}...\n"
-            else:
-                context += "No relevant events were found in the specified time range.\n"
-            
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": context}
-            ]
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1500
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            return f"⚠️ AI Synthesis Error: {str(e)}"
+""", """**User's Goal:** {analysis_request}
 
-    def analyze_results(self, analysis_request, events_data):
-        """
-        v21 - This analyzer is "precision-focused".
-        It gives a direct answer for "last event" queries.
-        """
-        try:
-            if isinstance(events_data, list):
-                events = events_data
-            else:
-                events = []
-            
-            is_last_event_query = "last" in analysis_request.lower() or "most recent" in analysis_request.lower()
+--- (DATA 1) REAL-TIME STATS ---
+{realtime_stats}
+
+--- (DATA 2) RECENT EVENT LOGS ---
+{events}""")
 
-            system_prompt = f"""You are a Senior Windows System Administrator and expert Event Log Analyst.
-A user is investigating an issue. Their goal is: **"{analysis_request}"**
-You have been given {len(events)} events matching their query.
+ANALYZE_RESULTS_PROMPT = register_prompt('analyze_results', 1, """You are a Senior Windows System Administrator and expert Event Log Analyst.
+A user is investigating an issue. Their goal, and the events matching their query, follow these instructions.
 Your job is to analyze these events and provide a high-level, intelligent summary.
 
 **CRITICAL ANSWER FORMATTING:**
@@ -751,24 +1696,741 @@ Your job is to analyze these events and provide a high-level, intelligent summar
     5.  **Next Steps:** What should the user check next?
 
 Use markdown for formatting.
-"""
+""", """**User's Goal:** "{analysis_request}"
+**Total Events Found:** {count}
+
+**Event Log Data:**
+{events}""")
+# ==============================================================================
+# ⬆️ END OF PROMPT TEMPLATES (v36) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF EVENT KNOWLEDGE BASE (v44) ⬇️
+# ==============================================================================
+#
+_LOGON_TYPES = {'2': "interactive (at the keyboard)", '3': "network (a share or remote service)", '4': "batch (scheduled task)",
+                '5': "service", '7': "unlock", '8': "network with cleartext credentials", '9': "new credentials (RunAs)",
+                '10': "remote desktop", '11': "cached interactive"}
+
+
+class _KBFields(dict):
+    """Message parameters for a knowledge-base template; anything not found in the message uses the entry's default."""
+    def __init__(self, params, defaults):
+        super().__init__(params)
+        self.defaults = defaults
+
+    def __missing__(self, key):
+        return self.defaults.get(key, "unknown")
+
+
+class EventKnowledgeBase:
+    """
+    v44 Event Knowledge Base:
+    Offline explanations for the events that dominate every log, keyed by
+    (provider, event ID). Answers are built on every lookup and never cached,
+    so an edited entry takes effect immediately.
+    Each entry has the same fields as the LLM answer (see EXPLAIN_PROMPT);
+    `{placeholders}` are filled from regexes over the event message, with
+    per-entry defaults when the message does not match. Unknown events
+    return None and go to the LLM.
+    """
+    FIELDS = ('title', 'simple', 'detail', 'severity', 'action', 'technical', 'impact', 'prevention', 'icon')
+
+    def __init__(self, entries=()):
+        self.entries = {}
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        entry = dict(entry)
+        entry['patterns'] = [re.compile(p, re.DOTALL) for p in entry.get('patterns', ())]
+        for event_id in entry['ids']:
+            self.entries[(entry['provider'].lower(), event_id)] = entry
+
+    def lookup(self, event_id, source):
+        return self.entries.get(((source or '').lower(), event_id))
+
+    def explain(self, event_id, source, message):
+        entry = self.lookup(event_id, source)
+        if entry is None:
+            return None
+        text = (message or '').replace('‎', '').replace('‏', '')
+        params = {'event_id': event_id, 'source': source}
+        for pattern in entry['patterns']:
+            match = pattern.search(text)
+            if match:
+                for key, value in match.groupdict().items():
+                    if value and key not in params:
+                        params[key] = value.strip().rstrip('.')
+        if 'derive' in entry:
+            entry['derive'](params)
+        fields = _KBFields(params, entry.get('defaults', {}))
+        result = {}
+        for name in self.FIELDS:
+            template = entry[name]
+            if isinstance(template, dict):  # one text per event ID
+                template = template[event_id]
+            result[name] = template.format_map(fields)
+        return result
+
+
+def _kb_logon_kind(params):
+    params['logon_kind'] = _LOGON_TYPES.get(params.get('logon_type', ''), "an unrecognised logon type")
+
+
+def _kb_bugcheck(params):
+    code = params.get('bugcheck')
+    if code is None:
+        params['bugcheck_note'] = "This event does not record a bug check code, so it cannot tell a blue screen from a power loss on its own."
+    elif int(code) == 0:
+        params['bugcheck_note'] = "Its bug check code is 0, meaning no blue screen was recorded: that points to a power loss, hard hang or forced power-off."
+    else:
+        params['bugcheck_note'] = f"Its bug check code is {code}, meaning Windows crashed with a blue screen; the matching BugCheck 1001 event has the details."
+
+
+def _kb_process_name(params):
+    if 'process' in params:
+        params['process'] = params['process'].rsplit('\\', 1)[-1]
+
+
+KNOWLEDGE_BASE = EventKnowledgeBase([
+    {'provider': 'EventLog', 'ids': (6005, 6006),
+     'title': {6005: "🟢 Event Log Service Started", 6006: "🔴 Event Log Service Stopped"},
+     'simple': {6005: "Windows started its event logging service, which happens once at every boot.",
+                6006: "Windows stopped its event logging service as part of a clean shutdown or restart."},
+     'detail': {6005: "Event 6005 is written by the Event Log service when it starts, very early in the boot sequence. It is the most reliable marker of when the PC was switched on or restarted. Paired with the 6006 that precedes it, it tells you how long the machine was off. It is purely informational and is expected after every boot.",
+                6006: "Event 6006 is the last thing the Event Log service writes before it stops during an orderly shutdown or restart. Its presence means Windows shut down cleanly. If a boot (6005) is not preceded by a 6006, the previous shutdown was not clean and a 6008 usually follows. It is purely informational."},
+     'severity': "info",
+     'action': "✅ No action needed. 🔎 Use these events to see when the PC was started and shut down.",
+     'technical': "Logged by the Event Log service (wevtsvc) in the System log on service start (6005) and stop (6006).",
+     'impact': "None - this is normal boot and shutdown bookkeeping.",
+     'prevention': "Nothing to prevent; these events are expected.",
+     'icon': {6005: "🟢", 6006: "🔴"}},
+    {'provider': 'EventLog', 'ids': (6008,),
+     'patterns': [r"shutdown at (?P<time>.+?) on (?P<date>.+?) was unexpected"],
+     'defaults': {'time': "an unknown time", 'date': "an unknown date"},
+     'title': "⚡ Unexpected Shutdown",
+     'simple': "The previous shutdown at {time} on {date} was not clean - the PC lost power, crashed or was forced off.",
+     'detail': "At the next boot Windows noticed that the previous session ({time} on {date}) ended without the normal shutdown sequence. Common causes are a power cut, holding the power button, a blue-screen crash or a hard freeze. Any unsaved work from that session was lost. Look for a Kernel-Power 41 and a BugCheck 1001 around the same time to tell a crash from a power loss.",
+     'severity': "error",
+     'action': "🔎 Check for BugCheck (1001) and Kernel-Power (41) events near {time}. 🔌 Check power supply, battery and cables. 🌡️ If it repeats, check temperatures and update drivers.",
+     'technical': "Logged by the Event Log service at boot when the dirty-shutdown marker from the previous session is still set. The time reported is the last heartbeat written before the session ended.",
+     'impact': "Unsaved data may be lost and, rarely, file system or registry corruption can follow repeated unclean shutdowns.",
+     'prevention': "Use Start > Shut down, keep drivers and firmware updated, use a UPS for desktops and watch temperatures.",
+     'icon': "⚡"},
+    {'provider': 'User32', 'ids': (1074,),
+     'patterns': [r"The process (?P<process>.+?)(?: \([^)]*\))? has initiated the (?P<action>[\w ]+?) of computer (?P<computer>\S+) on behalf of user (?P<user>.+?) for the following reason: (?P<reason>[^\r\n]+)"],
+     'derive': _kb_process_name,
+     'defaults': {'process': "unknown", 'action': "restart or shutdown", 'computer': "this computer", 'user': "a user", 'reason': "no reason given"},
+     'title': "🔁 Planned {action}",
+     'simple': "The process {process} started a {action} of {computer} on behalf of {user}.",
+     'detail': "This is an orderly, requested {action}: the process {process} asked Windows to {action} on behalf of {user}. The stated reason was \"{reason}\". Requests from winlogon.exe usually come from the Start menu, while TrustedInstaller.exe, MoUsoCoreWorker.exe or svchost.exe usually mean Windows Update. This event is informational.",
+     'severity': "info",
+     'action': "✅ No action needed if the {action} was expected. 🔎 If not, check which program ({process}) and reason were recorded and review Windows Update active hours.",
+     'technical': "Logged by User32 when a process calls InitiateSystemShutdownEx/ExitWindowsEx. Process: {process}; user: {user}; reason: {reason}.",
+     'impact': "Running applications were closed and the PC was unavailable during the {action}.",
+     'prevention': "Set Windows Update active hours and close or configure the program that requested it if the {action} was unwanted.",
+     'icon': "🔁"},
+    {'provider': 'Microsoft-Windows-Kernel-Power', 'ids': (41,),
+     'patterns': [r"BugcheckCode\W+(?P<bugcheck>\d+)"],
+     'derive': _kb_bugcheck,
+     'defaults': {'bugcheck': "not recorded"},
+     'title': "💥 Kernel-Power: Rebooted Without Clean Shutdown",
+     'simple': "Windows restarted without shutting down cleanly first - it crashed, froze or lost power.",
+     'detail': "Kernel-Power 41 is logged at boot when the previous session did not end normally. {bugcheck_note} Overheating, a failing power supply, unstable overclocks and driver problems are common causes. It usually appears together with EventLog 6008.",
+     'severity': "error",
+     'action': "🔎 Look for BugCheck 1001 events for crash details. 🔌 Check the power supply and cables. 🌡️ Check temperatures, remove overclocks and update chipset, GPU and storage drivers.",
+     'technical': "Written by the kernel power manager during boot when the previous boot's shutdown flag was not set. BugcheckCode: {bugcheck}.",
+     'impact': "Unsaved work was lost; repeated occurrences suggest hardware or driver instability.",
+     'prevention': "Keep drivers and BIOS updated, ensure adequate cooling and power, and avoid forced power-offs.",
+     'icon': "💥"},
+    {'provider': 'Service Control Manager', 'ids': (7036,),
+     'patterns': [r"The (?P<service>.+?) service entered the (?P<state>[\w ]+?) state"],
+     'defaults': {'service': "unknown", 'state': "new"},
+     'title': "🔄 Service State Changed: {service}",
+     'simple': "The {service} service entered the {state} state.",
+     'detail': "The Service Control Manager records every start and stop of a Windows service. The {service} service moved to the {state} state, which is routine: many services start on demand and stop again when idle. On its own this event is not a problem. It only matters if a service you rely on keeps stopping unexpectedly.",
+     'severity': "info",
+     'action': "✅ No action needed. 🔎 If the {service} service keeps stopping, check for related error events (7031/7034) and its recovery settings in services.msc.",
+     'technical': "Logged by the Service Control Manager (services.exe) when the {service} service reported the {state} state.",
+     'impact': "None for routine on-demand start/stop.",
+     'prevention': "Nothing to prevent; these events are expected.",
+     'icon': "🔄"},
+    {'provider': 'Service Control Manager', 'ids': (7040,),
+     'patterns': [r"The start type of the (?P<service>.+?) service was changed from (?P<old>.+?) to (?P<new>.+?)\."],
+     'defaults': {'service': "unknown", 'old': "its previous setting", 'new': "a new setting"},
+     'title': "⚙️ Service Start Type Changed: {service}",
+     'simple': "The start type of the {service} service changed from {old} to {new}.",
+     'detail': "Something changed how {service} starts: from {old} to {new}. Windows Update, installers and some services (BITS, Windows Update) toggle this routinely. A change you did not expect can also come from optimisation tools or malware disabling security services.",
+     'severity': "info",
+     'action': "✅ Usually no action. 🔎 If {service} is a security service and it was set to disabled, find out what changed it.",
+     'technical': "Logged by the Service Control Manager when ChangeServiceConfig modified the start type of the {service} service ({old} -> {new}).",
+     'impact': "{service} will now start as \"{new}\".",
+     'prevention': "Restrict administrative rights and review tools that tweak services.",
+     'icon': "⚙️"},
+    {'provider': 'Application Error', 'ids': (1000,),
+     'patterns': [r"[Ff]aulting application name: (?P<app>[^,\s]+)", r"[Ff]aulting module name: (?P<module>[^,\s]+)", r"[Ee]xception code: (?P<code>0x[0-9a-fA-F]+)"],
+     'defaults': {'app': "unknown application", 'module': "an unknown module", 'code': "unknown"},
+     'title': "❌ Application Crash: {app}",
+     'simple': "The application {app} crashed in {module} (exception {code}).",
+     'detail': "The application {app} hit an unhandled exception and Windows closed it. The fault happened in {module} with exception code {code}; 0xc0000005 is an access violation, 0xc0000409 a stack buffer overrun and 0xe0434352 an unhandled .NET exception. A crash in a system DLL such as ntdll.dll usually means the application or one of its plug-ins corrupted memory, not that Windows is broken. Any unsaved work in {app} was lost.",
+     'severity': "error",
+     'action': "🔄 Update {app} and its plug-ins/extensions. 🔎 If it repeats, repair or reinstall {app} and check the matching Windows Error Reporting (1001) event.",
+     'technical': "Logged by Windows Error Reporting for an unhandled exception. Application: {app}; module: {module}; exception code: {code}.",
+     'impact': "The application {app} closed unexpectedly; other applications are unaffected.",
+     'prevention': "Keep {app}, its add-ons and GPU drivers updated.",
+     'icon': "❌"},
+    {'provider': 'Application Hang', 'ids': (1002,),
+     'patterns': [r"The program (?P<app>\S+) version (?P<version>\S+) stopped interacting"],
+     'defaults': {'app': "unknown application", 'version': "unknown"},
+     'title': "🧊 Application Hang: {app}",
+     'simple': "The program {app} stopped responding and was closed.",
+     'detail': "The program {app} (version {version}) stopped processing window messages long enough for Windows to mark it as \"Not responding\", and it was then closed by the user or by Windows. Hangs are usually caused by long work on the UI thread, waiting on a slow disk or network, or a deadlock. Unsaved work in {app} was likely lost.",
+     'severity': "error",
+     'action': "🔄 Update {app}. 🔎 Check disk and CPU load at the time of the hang and disable recently added extensions.",
+     'technical': "Logged by the Application Hang reporter when a hung window was closed. Program: {app}; version: {version}.",
+     'impact': "The program {app} was unusable until closed; other programs are not directly affected.",
+     'prevention': "Keep {app} updated, ensure enough free RAM and disk space, and avoid very large files or many open tabs.",
+     'icon': "🧊"},
+    {'provider': 'Microsoft-Windows-Security-Auditing', 'ids': (4624,),
+     'patterns': [r"New Logon:.*?Account Name:\s+(?P<account>\S+)", r"Account Name:\s+(?P<account>\S+)", r"Logon Type:\s+(?P<logon_type>\d+)"],
+     'defaults': {'account': "unknown", 'logon_type': "unknown"},
+     'derive': _kb_logon_kind,
+     'title': "🔐 Successful Logon: {account}",
+     'simple': "The account {account} logged on successfully ({logon_kind}).",
+     'detail': "Windows authenticated the account {account} with logon type {logon_type} - {logon_kind}. Thousands of these are normal: services, scheduled tasks and SYSTEM log on constantly. They are worth a look when an unfamiliar account appears, or for remote desktop (10) and network (3) logons at unusual times.",
+     'severity': "info",
+     'action': "✅ No action needed for known accounts. 🔎 Investigate unfamiliar accounts or remote logons you did not expect.",
+     'technical': "Security audit event from the Local Security Authority. Account: {account}; logon type: {logon_type} ({logon_kind}).",
+     'impact': "None for expected logons.",
+     'prevention': "Use strong passwords, disable unused accounts and restrict remote desktop access.",
+     'icon': "🔐"},
+    {'provider': 'Microsoft-Windows-Security-Auditing', 'ids': (4625,),
+     'patterns': [r"Account For Which Logon Failed:.*?Account Name:\s+(?P<account>\S+)", r"Account Name:\s+(?P<account>\S+)",
+                  r"Failure Reason:\s+(?P<reason>[^\r\n]+)", r"Logon Type:\s+(?P<logon_type>\d+)"],
+     'defaults': {'account': "unknown", 'reason': "not recorded", 'logon_type': "unknown"},
+     'derive': _kb_logon_kind,
+     'title': "🚫 Failed Logon: {account}",
+     'simple': "A logon attempt as {account} failed: {reason}.",
+     'detail': "Windows rejected a logon as {account} ({logon_kind}). Reason: {reason}. A single failure is usually a mistyped password or a stale saved credential. Many failures in a short time, especially for administrator accounts or over the network, can be a password-guessing attack.",
+     'severity': "warning",
+     'action': "🔎 Check whether the attempts were yours. 🔑 Update saved credentials for mapped drives and services. 🛡️ If there are many, block the source and enable account lockout.",
+     'technical': "Security audit event from the Local Security Authority. Account: {account}; reason: {reason}; logon type: {logon_type}.",
+     'impact': "None if isolated; repeated failures can lock the account or indicate an attack.",
+     'prevention': "Use strong passwords, account lockout policy and avoid exposing RDP/SMB to the internet.",
+     'icon': "🚫"},
+    {'provider': 'Microsoft-Windows-WindowsUpdateClient', 'ids': (19,),
+     'patterns': [r"following update: (?P<update>[^\r\n]+)"],
+     'defaults': {'update': "an update"},
+     'title': "✅ Update Installed: {update}",
+     'simple': "Windows Update installed {update}.",
+     'detail': "Windows Update successfully installed {update}. Security and quality updates fix vulnerabilities and bugs; some only take full effect after a restart. Definition updates for Microsoft Defender arrive several times a day and are logged the same way.",
+     'severity': "info",
+     'action': "✅ No action needed. 🔁 Restart if Windows Update asks for it.",
+     'technical': "Logged by the Windows Update client after a successful installation of {update}.",
+     'impact': "Improved security and stability; a restart may be pending.",
+     'prevention': "Nothing to prevent - keep automatic updates on.",
+     'icon': "✅"},
+    {'provider': 'Microsoft-Windows-WindowsUpdateClient', 'ids': (20,),
+     'patterns': [r"with error (?P<error>0x[0-9a-fA-F]+): (?P<update>[^\r\n]+)"],
+     'defaults': {'update': "an update", 'error': "unknown"},
+     'title': "⚠️ Update Failed: {update}",
+     'simple': "Windows Update failed to install {update} (error {error}).",
+     'detail': "Installing {update} failed with error {error}. Windows Update retries failed updates automatically, so a single failure that later succeeds (event 19) is harmless. Repeated failures are often caused by low disk space, a too-small recovery partition (0x80070643 for some KB updates), corrupted update components or third-party antivirus.",
+     'severity': "error",
+     'action': "🔁 Run Windows Update again. 🧹 Free disk space and run the Windows Update troubleshooter. 🔎 Search the error code {error} together with the update name.",
+     'technical': "Logged by the Windows Update client when installing {update} returned {error}.",
+     'impact': "The fixes in {update} are not applied until it installs successfully.",
+     'prevention': "Keep enough free disk space and let updates finish before restarting.",
+     'icon': "⚠️"},
+])
+#
+# ==============================================================================
+# ⬆️ END OF EVENT KNOWLEDGE BASE (v44) ⬆️
+# ==============================================================================
+#
+
+
+class AIExplainer:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.model = "gpt-4o-mini"
+        self.cache = {}
+        self._inflight = SingleFlight('explain')
+
+    @property
+    def client(self):
+        return _openai_client(self.api_key)
+    
+    def cached_explanation(self, event):
+        """v47: the explanation if it is known without an LLM call (cache or knowledge base), else None."""
+        cached = self.cache.get(f"{event['event_id']}_{event['event_type']}_{event['source']}_{event['message'][:50]}")
+        return cached or KNOWLEDGE_BASE.explain(event['event_id'], event['source'], event['message'])
+
+    def explain_event(self, event_id, event_type, source, message):
+        cache_key = f"{event_id}_{event_type}_{source}_{message[:50]}"
+        if cache_key in self.cache:
+            TELEMETRY.incr('explain_cache_hits')
+            return self.cache[cache_key]
+
+        # v44: well-known events are answered offline; only unknown ones go to the LLM
+        known = KNOWLEDGE_BASE.explain(event_id, source, message)
+        if known is not None:
+            TELEMETRY.incr('explain_kb_hits')
+            return known
+        
+        def ask():
+            message_snippet = message[:800]
+            
+            response = _timed_completion(self.client, template=EXPLAIN_PROMPT,
+                model=self.model,
+                messages=EXPLAIN_PROMPT.messages(event_id=event_id, event_type=event_type, source=source, message=message_snippet),
+                temperature=0.7,
+                max_tokens=800
+            )
+            
+            result = json.loads(response.choices[0].message.content)
+            self.cache[cache_key] = result
+            return result
+
+        try:
+            # v46: the same event explained twice at once (e.g. a reload) makes one LLM call
+            return self._inflight.do(cache_key, ask)
+        except QueryCancelled:
+            raise
+        except Exception as e:
+            icon_map = {'Error': '❌', 'Warning': '⚠️', 'Information': 'ℹ️'}
+            icon = icon_map.get(event_type, 'ℹ️')
+            
+            return {
+                'title': f'{icon} {source} Event',
+                'simple': f'{source} generated a {event_type.lower()} event',
+                'detail': message[:300] if message else 'A system event occurred.',
+                'severity': event_type.lower(),
+                'action': '✅ Review the event details and monitor for recurring patterns.',
+                'technical': f'Event triggered by {source} component.',
+                'impact': 'Minimal impact on system performance.',
+                'prevention': 'Keep your system updated and monitor regularly.',
+                'icon': icon
+            }
+
+
+#
+# ==============================================================================
+# ⬇️ START OF EXPLANATION SCHEDULER (v45) ⬇️
+# ==============================================================================
+#
+class _ExplanationBatch:
+    """One list of events being explained; `wait()` returns when it is finished or superseded."""
+    def __init__(self, batch_id, events, on_result, query):
+        self.id = batch_id
+        self.events = list(events)  # `ExplanationScheduler.extend` appends to it
+        self.on_result = on_result
+        self.query = query
+        self.token = current_cancel_token()
+        self.claimed = set()
+        self.pending = len(events)
+        self.severe_pending = sum(1 for evt in events if ExplanationScheduler.TYPE_TIERS.get(evt['event_type'], 3) < 3)
+        self.started = time.perf_counter()
+        self.severe_ms = None
+        self.total_ms = None
+        self.cancelled = False
+        self.finished = threading.Event()
+        if not self.severe_pending:
+            self.severe_ms = 0.0
+        if not self.pending:
+            self.total_ms = 0.0
+            self.finished.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+
+class ExplanationScheduler:
+    """
+    v45 Explanation Scheduler:
+    Explains a loaded event list through a priority queue instead of in list
+    order. Positions the user is looking at (on screen, or a card just
+    clicked) go first - the most recent `prioritize()` call wins, so
+    scrolling preempts the previous view - then Errors, then Warnings and
+    audit failures, then everything else; within a tier rarer event IDs come
+    first, then list order. A new batch supersedes the pending one; events
+    from the live tail join it instead (`extend`). The time
+    until every Error/Warning was explained is recorded as the
+    `explain_severe_done` stage, the whole batch as `explain_all_done`.
+    """
+    VISIBLE = 0
+    # Audit Failure sits with Warning on purpose: a failed logon or access check deserves a
+    # look before routine events, but it is a security signal, not a fault like an Error.
+    TYPE_TIERS = {'Error': 1, 'Warning': 2, 'Audit Failure': 2}
+    WORKERS = 4
+
+    def __init__(self, explain, workers=WORKERS):
+        self.explain = explain
+        self.workers = workers
+        self._heap = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._batch = None
+        self._threads = []
+
+    def submit(self, events, on_result, visible=()):
+        """
+        Starts explaining `events`; `on_result(index, event, explanation)` is
+        called from a worker thread as each one is ready. Returns the batch.
+        """
+        rarity = Counter(evt['event_id'] for evt in events)
+        batch = _ExplanationBatch(next(self._seq), events, on_result, TELEMETRY.current_query())
+        heap = [(self.TYPE_TIERS.get(evt['event_type'], 3), rarity[evt['event_id']], idx, idx, batch.id) for idx, evt in enumerate(events)]
+        heapq.heapify(heap)
+        with self._cond:
+            self._cancel_locked()
+            self._batch = batch
+            self._heap = heap
+            self._push_visible_locked(visible)
+            while len(self._threads) < min(self.workers, len(events)):
+                worker = threading.Thread(target=self._work, daemon=True)
+                self._threads.append(worker)
+                worker.start()
+            self._cond.notify_all()
+        return batch
+
+    def extend(self, events, on_result):
+        """
+        Adds `events` (v33 live tail) to the batch in progress, ahead of
+        everything queued so far, or starts a new batch for them when there is
+        none. Returns the batch and the index of the first added event in it.
+        """
+        with self._cond:
+            batch = self._batch
+            if batch is None or batch.finished.is_set():
+                return self.submit(events, on_result, visible=range(len(events))), 0
+            first = len(batch.events)
+            batch.events.extend(events)
+            batch.pending += len(events)
+            batch.severe_pending += sum(1 for evt in events if self.TYPE_TIERS.get(evt['event_type'], 3) < 3)
+            self._push_visible_locked(range(first, len(batch.events)))
+            self._cond.notify_all()
+            return batch, first
+
+    def prioritize(self, indices):
+        """Moves positions of the current batch ahead of everything queued so far."""
+        with self._cond:
+            self._push_visible_locked(indices)
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self._cancel_locked()
+
+    def _push_visible_locked(self, indices):
+        batch = self._batch
+        if batch is None:
+            return
+        generation = -next(self._seq)  # newer requests sort first
+        for idx in indices:
+            if 0 <= idx < len(batch.events) and idx not in batch.claimed:
+                heapq.heappush(self._heap, (self.VISIBLE, generation, idx, idx, batch.id))
+
+    def _cancel_locked(self):
+        if self._batch is not None and not self._batch.finished.is_set():
+            self._batch.cancelled = True
+            self._batch.finished.set()
+            TELEMETRY.incr('explain_batches_superseded')
+        self._batch = None
+        self._heap = []
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                tier, _, _, idx, batch_id = heapq.heappop(self._heap)
+                batch = self._batch
+                if batch is None or batch.id != batch_id or idx in batch.claimed:
+                    continue  # superseded batch, or a position already taken via a higher-priority entry
+                batch.claimed.add(idx)
+            evt = batch.events[idx]
+            try:
+                with TELEMETRY.attach(batch.query), cancellable(batch.token):
+                    explanation = self.explain(evt)
+                if not batch.cancelled:
+                    batch.on_result(idx, evt, explanation)
+            except QueryCancelled:
+                pass
+            except Exception as e:
+                print(f"⚠️ Explaining event {evt.get('event_id')} failed: {e}")
+            self._finish(batch, evt)
+
+    def _finish(self, batch, evt):
+        with self._cond:
+            batch.pending -= 1
+            if self.TYPE_TIERS.get(evt['event_type'], 3) < 3:
+                batch.severe_pending -= 1
+                if not batch.severe_pending and not batch.cancelled:
+                    batch.severe_ms = (time.perf_counter() - batch.started) * 1000
+                    TELEMETRY.record('explain_severe_done', batch.severe_ms)
+            if not batch.pending and not batch.cancelled:
+                batch.total_ms = (time.perf_counter() - batch.started) * 1000
+                TELEMETRY.record('explain_all_done', batch.total_ms)
+                batch.finished.set()
+#
+# ==============================================================================
+# ⬆️ END OF EXPLANATION SCHEDULER (v45) ⬆️
+# ==============================================================================
+#
+
+#
+# ==============================================================================
+# ⬇️ START OF CONVERSATION MEMORY (v35) ⬇️
+# ==============================================================================
+#
+def _estimate_tokens(text):
+    """Rough token count (~4 characters per token) - good enough for budgeting."""
+    return (len(text) + 3) // 4
+
+
+class ConversationMemory:
+    """
+    v35 Conversation Memory:
+    Bounds what the planner sees of the chat. The last `RECENT_MESSAGES`
+    messages go in verbatim; older ones are folded into a rolling summary of
+    one short line each (newest kept first), and the whole block stays within
+    `TOKEN_BUDGET` tokens however long the session gets. `clip()` shortens
+    large tool outputs (event dumps, port lists) before they enter the history.
+    """
+    RECENT_MESSAGES = 6
+    TOKEN_BUDGET = 1500
+    SUMMARY_LINE_CHARS = 160
+    MAX_MESSAGE_TOKENS = 400
+
+    def __init__(self, recent_messages=None, token_budget=None):
+        self.recent_messages = recent_messages or self.RECENT_MESSAGES
+        self.token_budget = token_budget or self.TOKEN_BUDGET
+
+    @classmethod
+    def clip(cls, text, max_tokens=None):
+        """Keeps the head and tail of an over-long message (the result fits, so clipping twice is a no-op)."""
+        max_chars = (max_tokens or cls.MAX_MESSAGE_TOKENS) * 4
+        if len(text) <= max_chars:
+            return text
+        head, tail = text[:max_chars * 3 // 4], text[-(max_chars // 4 - 64):]
+        return f"{head}\n[... {len(text) - len(head) - len(tail)} characters omitted ...]\n{tail}"
+
+    @classmethod
+    def summarize(cls, msg):
+        """One line for an older message: its first meaningful line, markdown stripped."""
+        text = next((line for line in msg['content'].splitlines() if line.strip(' #*-_>|')), '')
+        text = re.sub(r"[*#`_>|]+", "", text).strip()
+        if len(text) > cls.SUMMARY_LINE_CHARS:
+            text = text[:cls.SUMMARY_LINE_CHARS].rsplit(' ', 1)[0] + "..."
+        return f"- {'user' if msg['role'] == 'user' else 'assistant'}: {text}"
+
+    def render(self, history):
+        """The planner's view of `history` as one string within the token budget."""
+        recent = [f"{'user' if m['role'] == 'user' else 'assistant'}: {self.clip(m['content'])}" for m in history[-self.recent_messages:]]
+        older = history[:-self.recent_messages] if len(history) > self.recent_messages else []
+        # Oldest verbatim messages move to the summary while the recent block alone is over budget.
+        while len(recent) > 1 and sum(_estimate_tokens(line) for line in recent) > self.token_budget * 3 // 4:
+            older = older + [history[len(history) - len(recent)]]
+            recent.pop(0)
+
+        budget = self.token_budget - sum(_estimate_tokens(line) for line in recent) - 32  # headers
+        summary = []
+        for msg in reversed(older):
+            line = self.summarize(msg)
+            budget -= _estimate_tokens(line)
+            if budget < 0:
+                break
+            summary.append(line)
+        summary.reverse()
+
+        parts = []
+        if older:
+            dropped = len(older) - len(summary)
+            parts.append("(Earlier conversation, summarized" + (f"; {dropped} older messages omitted" if dropped else "") + ")")
+            parts.extend(summary)
+            parts.append("(Most recent messages)")
+        parts.extend(recent)
+        rendered = "\n".join(parts) + "\n"
+        TELEMETRY.incr('plan_history_tokens', _estimate_tokens(rendered))
+        return rendered
+# ==============================================================================
+# ⬆️ END OF CONVERSATION MEMORY (v35) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF AI ASSISTANT (v25 "Major Apps & History" SPECIALIST BRAIN) ⬇️
+# ==============================================================================
+#
+class AIAssistant:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.model = "gpt-4o-mini"
+        self.memory = ConversationMemory()
+
+    @property
+    def client(self):
+        return _openai_client(self.api_key)
+
+    def extract_process_name(self, user_msg):
+        """
+    Uses GPT to extract the actual application or process name from a user's query.
+    """
+        try:
+            res = _timed_completion(self.client, template=EXTRACT_PROCESS_PROMPT,
+            model=self.model,
+            messages=EXTRACT_PROCESS_PROMPT.messages(user_msg=user_msg),
+            temperature=0,
+            max_tokens=5
+            )
+            return res.choices[0].message.content.strip().lower()
+        except QueryCancelled:
+            raise
+        except:
+            return "none"
+
+
+    
+    def get_ai_plan(self, chat_history): 
+        """
+        UPDATED: v25 - Added "Major Apps" tool (v25) and
+        process history NLU (v24).
+        """
+        
+        current_time_str = datetime.datetime.now().strftime('%Y-%m-%d %A, %I:%M %p')
+        today_date_str = datetime.date.today().strftime('%Y-%m-%d')
+        yesterday_date_str = (datetime.date.today() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        # v35: recent turns verbatim + a summary of older ones, within a token budget
+        history_string = self.memory.render(chat_history)
+        
+        # v36: static rules first (cacheable prefix), dates and history last
+        messages = PLANNER_PROMPT.messages(current_time=current_time_str, today=today_date_str, yesterday=yesterday_date_str, history=history_string)
+        msg = chat_history[-1]['content'].lower()
+
+        import re
+
+        # Case 1: direct port query like "port 8080" / "which app uses port 5000"
+        port_match = re.findall(r"\bport\s*(\d+)\b", msg)
+        if port_match:
+            return {
+                "action": "port_analysis",
+                "params": {"port": port_match[0]}
+            }
+
+        # Case 2: which port a process is using
+        # "mysql port", "on which port is postgres running"
+        if "port" in msg:
+            process_guess = self.extract_process_name(msg)
+            if process_guess != "none":
+                return {
+                    "action": "port_analysis",
+                    "params": {"process_name": process_guess}
+                }
+
+
+        # Case 3: list all ports
+        if any(k in msg for k in ["ports", "all ports", "show ports", "list ports"]):
+            return {"action": "port_analysis", "params": {}}
+
+        try:
+            user_query = chat_history[-1]['content']
+            
+            # Simple check to add context
+            if "today" not in user_query.lower() and "yesterday" not in user_query.lower() and "last" not in user_query.lower() and "november" not in user_query.lower():
+                if "am" in user_query.lower() or "pm" in user_query.lower():
+                    chat_history[-1]['content'] = f"{user_query} (assume this is for today, {today_date_str})"
+            
+            response = _timed_completion(self.client, template=PLANNER_PROMPT,
+                model=self.model,
+                messages=messages,
+                temperature=0.0,
+                max_tokens=1000,
+                response_format={"type": "json_object"}
+            )
+            plan = json.loads(response.choices[0].message.content)
+            
+            # Post-processing safety net
+            if plan.get("action") == "search_logs" or plan.get("action") == "hybrid_analysis":
+                query = chat_history[-1]['content']
+                hang_terms = ['hang', 'freeze', 'lag', 'stuck', 'unresponsive', 'not responding', 'slow', 'feels slow']
+                if any(k in query.lower() for k in hang_terms):
+                    if 'params' not in plan: plan['params'] = {}
+                    plan['params']['log_type'] = 'Application'
+            
+            return plan
+        except QueryCancelled:
+            raise
+        except Exception as e:
+            print(f"Error getting AI plan: {e}")
+            return {"action": "chat", "response": f"I encountered an error planning my next step: {e}"}
+
+    def analyze_hybrid_results(self, analysis_request, realtime_stats, events_data):
+        """
+        v19 PROMPT:
+        Synthesizes "Task Manager" data and Event Log data.
+        """
+        
+        try:
+            events = events_data if isinstance(events_data, list) else []
+            
+            context = ""
+            if events:
+                for i, evt in enumerate(events[:10]):
+                    message_snippet = evt.get('message', '')[:300].strip()
+                    host = f"{evt['host']} | " if evt.get('host') else ""
+                    context += f"- [{evt.get('event_type')}] ID {evt.get('event_id')} | {host}{evt.get('time_generated')} | {evt.get('source')} | Msg: {message_snippet}...\n"
+            else:
+                context += "No relevant events were found in the specified time range.\n"
+            
+            messages = HYBRID_ANALYSIS_PROMPT.messages(analysis_request=analysis_request, realtime_stats=realtime_stats, events=context)
+            
+            response = _timed_completion(self.client, template=HYBRID_ANALYSIS_PROMPT,
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1500
+            )
+            
+            return response.choices[0].message.content
             
-            context = f"**Total Events Found:** {len(events)}\n\n**Event Log Data:**\n"
+        except QueryCancelled:
+            raise
+        except Exception as e:
+            return f"⚠️ AI Synthesis Error: {str(e)}"
+
+    def analyze_results(self, analysis_request, events_data):
+        """
+        v21 - This analyzer is "precision-focused".
+        It gives a direct answer for "last event" queries.
+        """
+        try:
+            if isinstance(events_data, list):
+                events = events_data
+            else:
+                events = []
             
+            is_last_event_query = "last" in analysis_request.lower() or "most recent" in analysis_request.lower()
+
+            context = ""
             if events:
                 context += "--- Event Details ---\n"
                 for i, evt in enumerate(events):
                     message_snippet = evt.get('message', '')[:300].strip()
-                    context += f"- [{evt.get('event_type')}] ID {evt.get('event_id')} | {evt.get('time_generated')} | {evt.get('source')} | Msg: {message_snippet}...\n"
+                    host = f"{evt['host']} | " if evt.get('host') else ""
+                    context += f"- [{evt.get('event_type')}] ID {evt.get('event_id')} | {host}{evt.get('time_generated')} | {evt.get('source')} | Msg: {message_snippet}...\n"
             else:
                 context += "No events were found that match the user's query.\n"
             
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": context}
-            ]
+            messages = ANALYZE_RESULTS_PROMPT.messages(analysis_request=analysis_request, count=len(events), events=context)
             
-            response = self.client.chat.completions.create(
+            response = _timed_completion(self.client, template=ANALYZE_RESULTS_PROMPT,
                 model=self.model,
                 messages=messages,
                 temperature=0.7,
@@ -777,6 +2439,8 @@ Use markdown for formatting.
             
             return response.choices[0].message.content
             
+        except QueryCancelled:
+            raise
         except Exception as e:
             return f"⚠️ AI Error: {str(e)}"
 
@@ -786,31 +2450,165 @@ Use markdown for formatting.
 # ==============================================================================
 #
 
+#
+# ==============================================================================
+# ⬇️ START OF COMPACT EVENT RECORDS (v34) ⬇️
+# ==============================================================================
+#
+class EventRecord:
+    """
+    v34 Compact Events:
+    One event as produced by `read_events` and the archive. A slotted record
+    instead of a dict: the low-cardinality strings are interned (all records of
+    one source share a single `source`, `computer`, `event_type` and `log_type`
+    object), repeated messages share one `message` through a bounded table
+    (interned strings are never freed, and messages are unbounded), and the
+    time is a numeric `timestamp`. `time_generated` is only formatted when something reads it.
+    Keeps the dict-style access the rest of the app uses (`evt['source']`,
+    `evt.get(...)`, `'host' in evt`, `dict(evt)`).
+    """
+    __slots__ = ('source', 'event_id', 'event_type', 'timestamp', 'computer', 'message', 'log_type', 'record_number', 'host')
+    FIELDS = ('source', 'event_id', 'event_type', 'time_generated', 'computer', 'message', 'log_type', 'record_number')
+    _KEYS = frozenset(FIELDS)
+    TIME_FORMAT = '%m/%d/%y %H:%M:%S'
+    SHARED_MESSAGES = 8192
+    _messages = {}
+
+    def __init__(self, source, event_id, event_type, timestamp, computer, message, log_type=None, record_number=None, host=None):
+        intern = sys.intern
+        self.source = intern(source)
+        self.event_id = event_id
+        self.event_type = intern(event_type)
+        self.timestamp = timestamp
+        self.computer = intern(computer)
+        shared = EventRecord._messages
+        self.message = shared.get(message)
+        if self.message is None:
+            if len(shared) >= self.SHARED_MESSAGES:
+                shared.clear()
+            self.message = shared.setdefault(message, message)
+        self.log_type = intern(log_type) if log_type else log_type
+        self.record_number = record_number
+        self.host = host
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('source', ''), data.get('event_id'), data.get('event_type', ''), _event_timestamp(data),
+                   data.get('computer', ''), data.get('message', ''), data.get('log_type'), data.get('record_number'), data.get('host'))
+
+    @property
+    def time_generated(self):
+        return datetime.datetime.fromtimestamp(self.timestamp).strftime(self.TIME_FORMAT)
+
+    def keys(self):
+        return self.FIELDS + ('host',) if self.host is not None else self.FIELDS
+
+    def __contains__(self, key):
+        return key in self._KEYS or (key == 'host' and self.host is not None)
+
+    def __getitem__(self, key):
+        if key in self._KEYS:
+            return getattr(self, key)
+        if key == 'host' and self.host is not None:
+            return self.host
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self else default
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def values(self):
+        return [getattr(self, key) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (EventRecord, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None  # like the dicts it replaces
+
+    def __repr__(self):
+        return f"EventRecord({self.to_dict()!r})"
+
+
+def _json_default(obj):
+    """`json.dumps` fallback: events as plain objects, anything else as a string."""
+    return obj.to_dict() if isinstance(obj, EventRecord) else str(obj)
+# ==============================================================================
+# ⬆️ END OF COMPACT EVENT RECORDS (v34) ⬆️
+# ==============================================================================
+
+
 class EventLogReader:
-    def read_events(self, log_type='System', max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None):
+    # Windows does not guarantee that TimeGenerated is strictly monotonic when a
+    # log is read backwards (clock changes, buffered writers, service restarts).
+    # Records older than `start_datetime` are tolerated for this long before the
+    # scan is considered to have left the requested window for good.
+    OUT_OF_ORDER_TOLERANCE = datetime.timedelta(minutes=5)
+
+    def __init__(self, out_of_order_tolerance=None):
+        self.out_of_order_tolerance = out_of_order_tolerance if out_of_order_tolerance is not None else self.OUT_OF_ORDER_TOLERANCE
+        self.last_scan_stats = {}
+
+    def read_events(self, log_type='System', max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None, out_of_order_tolerance=None, server='localhost', after_record=None):
+        return list(self.iter_events(log_type, max_records, start_datetime, end_datetime, hide_common, keywords, event_type_filter,
+                                     out_of_order_tolerance, server, after_record))
+
+    def iter_events(self, log_type='System', max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None, out_of_order_tolerance=None, server='localhost', after_record=None):
+        """
+        v47: the scan as a generator (newest first), so an export can stream a
+        whole log in constant memory; `read_events` is `list(iter_events(...))`.
+        """
+        # `after_record` (v33 live tail): stop at the first record that is not newer than this RecordNumber.
         if keywords is None:
             keywords = []
+        keyword_filter = KeywordFilter(keywords)
+        if out_of_order_tolerance is None:
+            out_of_order_tolerance = self.out_of_order_tolerance
             
+        hand = None
         try:
-            events = []
-            hand = win32evtlog.OpenEventLog('localhost', log_type)
+            hand = win32evtlog.OpenEventLog(server, log_type)
             flags = win32evtlog.EVENTLOG_BACKWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
             
-            common_sources = ['BITS', 'gpsvc', 'Microsoft-Windows-GroupPolicy', 'Microsoft-Windows-Bits-Client', 
-                            'DCOM', 'DistributedCOM', 'USER32', 'DeviceSetupManager', 'WinMgmt', 
-                            'Microsoft-Windows-Time-Service', 'Service Control Manager',
-                            'Kernel-Power', 'Kernel-General']
-            
             count = 0
             total_read = 0
             max_scan_limit = 999999999
+
+            # --- Termination policy (start boundary) ---
+            # Everything older than `stop_boundary` is definitely outside the window,
+            # so the first such record ends the scan. Records between `stop_boundary`
+            # and `start_datetime` are skipped but do not stop the scan, which keeps
+            # slightly out-of-order records that are still inside the window.
+            stop_boundary = start_datetime - out_of_order_tolerance if start_datetime else None
+            past_boundary_read = 0
+            stop_reason = 'end_of_log'
+            scan_started = time.perf_counter()
+            read_ms = format_ms = 0.0
             
             print(f"\n{'='*80}")
-            print(f"🔍 READING {log_type} LOG (BACKWARDS - UNLIMITED SCAN)")
-            if start_datetime: print(f"    📅 START: {start_datetime}")
+            print(f"🔍 READING {log_type} LOG ON {server} (BACKWARDS - UNLIMITED SCAN)")
+            if start_datetime: print(f"    📅 START: {start_datetime} (out-of-order tolerance: {out_of_order_tolerance})")
             if end_datetime: print(f"      📅 END: {end_datetime}")
             if keywords: print(f"      🔑 KEYWORDS: {keywords}")
             if event_type_filter: print(f"      🚦 TYPE FILTER: {event_type_filter}")
+            if after_record is not None: print(f"      ⏩ AFTER RECORD: {after_record}")
             print(f"      🙈 HIDE COMMON: {hide_common}")
             print(f"      📊 Scanning until we find {max_records} matching events...")
             print(f"{'='*80}\n")
@@ -818,7 +2616,10 @@ class EventLogReader:
             stop_scanning = False
             
             while count < max_records and total_read < max_scan_limit and not stop_scanning:
+                check_cancelled()  # v46: once per read batch
+                t0 = time.perf_counter()
                 event_records = win32evtlog.ReadEventLog(hand, flags, 0)
+                read_ms += (time.perf_counter() - t0) * 1000
                 if not event_records:
                     print(f"\n⚠️ Reached end of event log (scanned all {total_read} events)")
                     break
@@ -829,8 +2630,14 @@ class EventLogReader:
                     if total_read % 1000 == 0:
                         print(f"     📊 Scanned {total_read} events... Found {count} matches so far...")
                     
+                    if after_record is not None and event.RecordNumber <= after_record:
+                        stop_reason = 'after_record'
+                        stop_scanning = True
+                        break
+                    
                     if count >= max_records:
                         print(f"\nℹ️ Reached 'max_records' limit of {max_records}. Stopping scan.")
+                        stop_reason = 'max_records'
                         stop_scanning = True
                         break
                     
@@ -840,8 +2647,10 @@ class EventLogReader:
                         continue
                     
                     if start_datetime and event_time < start_datetime:
-                        if total_read > 500:
-                            print(f"\nℹ️ Reached start of date range. Stopping scan at {event_time}.")
+                        past_boundary_read += 1
+                        if event_time < stop_boundary:
+                            print(f"\nℹ️ Left the date range (+{out_of_order_tolerance} tolerance). Stopping scan at {event_time}.")
+                            stop_reason = 'start_boundary'
                             stop_scanning = True
                             break
                         continue 
@@ -854,90 +2663,2933 @@ class EventLogReader:
 
                     source = event.SourceName
                     
-                    if hide_common and any(common.lower() in source.lower() for common in common_sources):
+                    if hide_common and COMMON_SOURCES.find_cached(source) is not None:
                         continue
                     
+                    t0 = time.perf_counter()
                     try:
                         message = win32evtlogutil.SafeFormatMessage(event, log_type)
                     except Exception:
                         message = ' '.join(str(s) for s in event.StringInserts) if event.StringInserts else 'No description available'
+                    format_ms += (time.perf_counter() - t0) * 1000
 
-                    if keywords:
-                        message_lower = message.lower()
-                        event_id_str = str(event.EventID & 0xFFFF) 
-                        
-                        if not any(k.lower() in message_lower or k.lower() in source.lower() or k == event_id_str for k in keywords):
-                            continue
+                    if keyword_filter and not keyword_filter.matches(event.EventID & 0xFFFF, source, message):
+                        continue
+
+                    count += 1
+                    
+                    if count <= 5 or count % 10 == 0:
+                        print(f"✅ Found {count} matching events...")
+
+                    yield EventRecord(source, event.EventID & 0xFFFF, event_type, event_time.timestamp(),
+                                      event.ComputerName, message.strip(), log_type, event.RecordNumber)
+            
+            if count >= max_records and stop_reason == 'end_of_log':
+                stop_reason = 'max_records'
+            
+            # Filtering is everything in the scan loop that is not reading or formatting
+            # (for a streaming consumer such as an export, its time between records too).
+            filter_ms = max((time.perf_counter() - scan_started) * 1000 - read_ms - format_ms, 0.0)
+            TELEMETRY.record('log_read', read_ms)
+            TELEMETRY.record('format', format_ms)
+            TELEMETRY.record('filter', filter_ms)
+            TELEMETRY.incr('events_scanned', total_read)
+            TELEMETRY.incr('events_matched', count)
+            self.last_scan_stats = {
+                'log_type': log_type,
+                'total_read': total_read,
+                'matched': count,
+                'past_boundary_read': past_boundary_read,
+                'stop_reason': stop_reason,
+                'read_ms': read_ms,
+                'format_ms': format_ms,
+                'filter_ms': filter_ms,
+            }
+            print(f"\n{'='*80}")
+            print(f"✅ RETURNED {count} events (scanned {total_read} total, {past_boundary_read} past start boundary, stop: {stop_reason})")
+            print(f"{'='*80}\n")
+            
+        except QueryCancelled:
+            print(f"⏹️ {log_type} scan cancelled after {total_read} events")
+            raise
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            if "Access is denied" in str(e):
+                raise Exception("Access Denied. Please run this application as an Administrator to read all event logs (especially 'Security').")
+            raise Exception(f"Error reading event log: {str(e)}")
+        finally:
+            if hand is not None:
+                win32evtlog.CloseEventLog(hand)
+    
+    def read_events_multi(self, log_types=('System', 'Application', 'Security'), max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None, out_of_order_tolerance=None, server='localhost'):
+        """
+        Scans several logs concurrently (one worker and one log handle per log)
+        and k-way merges the results newest-first. `max_records` and all filters
+        apply to the merged result, not to each log.
+        """
+        log_types = list(dict.fromkeys(log_types))
+        if len(log_types) == 1:
+            return self.read_events(log_types[0], max_records, start_datetime, end_datetime, hide_common, keywords, event_type_filter, out_of_order_tolerance, server)
+
+        print(f"🔀 Searching {len(log_types)} logs in parallel: {', '.join(log_types)}")
+        tolerance = out_of_order_tolerance if out_of_order_tolerance is not None else self.out_of_order_tolerance
+
+        query = TELEMETRY.current_query()
+        token = current_cancel_token()
+
+        def scan(log_type):
+            # Each worker gets its own reader so scan stats are not shared between threads.
+            # No single log can contribute more than `max_records` to the merged result.
+            reader = EventLogReader(tolerance)
+            with TELEMETRY.attach(query), cancellable(token):
+                events = reader.read_events(log_type, max_records, start_datetime, end_datetime, hide_common, keywords, event_type_filter, server=server)
+            return events, reader.last_scan_stats
+
+        per_log_events = {}
+        per_log_stats = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=len(log_types)) as pool:
+            futures = {log_type: pool.submit(scan, log_type) for log_type in log_types}
+            for log_type, future in futures.items():
+                try:
+                    per_log_events[log_type], per_log_stats[log_type] = future.result()
+                except Exception as e:
+                    print(f"⚠️ Skipping {log_type} log: {e}")
+                    errors[log_type] = str(e)
+        check_cancelled()
+
+        if not per_log_events:
+            raise Exception("; ".join(f"{log_type}: {err}" for log_type, err in errors.items()))
+
+        # Each per-log list is already newest-first, so a heap merge is enough.
+        merged = heapq.merge(*per_log_events.values(), key=_event_sort_key, reverse=True)
+        events = []
+        for event in merged:
+            if len(events) >= max_records:
+                break
+            events.append(event)
+
+        self.last_scan_stats = {
+            'log_type': ', '.join(log_types),
+            'total_read': sum(st['total_read'] for st in per_log_stats.values()),
+            'matched': len(events),
+            'past_boundary_read': sum(st['past_boundary_read'] for st in per_log_stats.values()),
+            'stop_reason': 'merged',
+            'per_log': per_log_stats,
+            'errors': errors,
+        }
+        print(f"🔀 Merged {len(events)} events from {len(per_log_events)} logs")
+        return events
+
+    def iter_events_multi(self, log_types=('System', 'Application', 'Security'), max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None, server='localhost'):
+        """
+        v47: streaming counterpart of `read_events_multi` for exports. The logs
+        are read lazily side by side and merged newest-first on the calling
+        thread; a log that cannot be read is skipped, as in `read_events_multi`.
+        """
+        def guarded(log_type):
+            try:
+                yield from EventLogReader(self.out_of_order_tolerance).iter_events(
+                    log_type, max_records, start_datetime, end_datetime, hide_common, keywords, event_type_filter, server=server)
+            except QueryCancelled:
+                raise
+            except Exception as e:
+                print(f"⚠️ Skipping {log_type} log: {e}")
+
+        streams = [guarded(log_type) for log_type in dict.fromkeys(log_types)]
+        return itertools.islice(heapq.merge(*streams, key=_event_sort_key, reverse=True), max_records)
+
+    def _get_event_type(self, event_type):
+        types = {
+            win32con.EVENTLOG_ERROR_TYPE: 'Error',
+            win32con.EVENTLOG_WARNING_TYPE: 'Warning',
+            win32con.EVENTLOG_INFORMATION_TYPE: 'Information',
+            win32con.EVENTLOG_AUDIT_SUCCESS: 'Audit Success',
+            win32con.EVENTLOG_AUDIT_FAILURE: 'Audit Failure'
+        }
+        return types.get(event_type, 'Unknown')
+
+
+def _event_sort_key(event):
+    """Sort key for events (`EventRecord`s, or dicts with a TimeGenerated.Format() string)."""
+    if isinstance(event, EventRecord):
+        return datetime.datetime.fromtimestamp(event.timestamp)
+    try:
+        return datetime.datetime.strptime(event['time_generated'], '%m/%d/%y %H:%M:%S')
+    except (KeyError, ValueError):
+        return datetime.datetime.min
+
+
+#
+# ==============================================================================
+# ⬇️ START OF LIVE TAIL (v33) ⬇️
+# ==============================================================================
+#
+class EventTail:
+    """
+    v33 Live Tail:
+    Follows one log and pushes only records written after `start()` to
+    `on_events(events)` (newest first), through the same filters as
+    `read_events`. Locally it sleeps on the log's change notification
+    (NotifyChangeEventLog), so an idle log costs no reads; remote logs, or
+    systems without win32event, fall back to checking the newest
+    RecordNumber every `poll_interval` seconds.
+    """
+    POLL_INTERVAL = 2.0
+
+    def __init__(self, log_type='System', on_events=None, hide_common=False, keywords=None, event_type_filter=None, server='localhost', poll_interval=None):
+        self.log_type = log_type
+        self.on_events = on_events or (lambda events: None)
+        self.hide_common = hide_common
+        self.keywords = keywords
+        self.event_type_filter = event_type_filter
+        self.server = server
+        self.poll_interval = poll_interval or self.POLL_INTERVAL
+        self.reader = EventLogReader()
+        self.last_record = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, after_record=None):
+        self.last_record = after_record if after_record is not None else self._newest_record()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"📡 Live tail started on {self.log_type} ({self.server}) after record {self.last_record}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _newest_record(self):
+        hand = win32evtlog.OpenEventLog(self.server, self.log_type)
+        try:
+            records = win32evtlog.ReadEventLog(hand, win32evtlog.EVENTLOG_BACKWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ, 0)
+        finally:
+            win32evtlog.CloseEventLog(hand)
+        return records[0].RecordNumber if records else 0
+
+    def poll(self):
+        """Delivers every matching record newer than `last_record`; returns them."""
+        newest = self._newest_record()
+        if newest == self.last_record:
+            return []
+        if newest < self.last_record:
+            # The log was cleared; everything in it now is new.
+            self.last_record = 0
+        events = self.reader.read_events(self.log_type, 10**9, hide_common=self.hide_common, keywords=self.keywords,
+                                         event_type_filter=self.event_type_filter, server=self.server, after_record=self.last_record)
+        self.last_record = max([newest] + [evt['record_number'] for evt in events])
+        TELEMETRY.incr('tail_events', len(events))
+        if events:
+            self.on_events(events)
+        return events
+
+    def _waiter(self):
+        """Returns (wait(timeout) -> True if the log may have changed, close())."""
+        if win32event is not None and hasattr(win32evtlog, 'NotifyChangeEventLog') and self.server in (None, '', 'localhost'):
+            hand = win32evtlog.OpenEventLog(None, self.log_type)
+            signal = win32event.CreateEvent(None, False, False, None)
+            win32evtlog.NotifyChangeEventLog(hand, signal)
+
+            def wait(timeout):
+                return win32event.WaitForSingleObject(signal, int(timeout * 1000)) == win32event.WAIT_OBJECT_0
+            return wait, lambda: win32evtlog.CloseEventLog(hand)
+        return (lambda timeout: not self._stop.wait(timeout)), (lambda: None)
+
+    def _run(self):
+        wait, close = self._waiter()
+        try:
+            while not self._stop.is_set():
+                if not wait(self.poll_interval) or self._stop.is_set():
+                    continue
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"⚠️ Live tail error on {self.log_type}: {e}")
+        finally:
+            close()
+            print(f"📡 Live tail stopped on {self.log_type}")
+# ==============================================================================
+# ⬆️ END OF LIVE TAIL (v33) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF WATCH RULES (v37) ⬇️
+# ==============================================================================
+#
+class WatchRule:
+    """
+    v37 Watch Rules:
+    One user-defined alert. Event rules fire when `count` matching events
+    arrive within `window` seconds (`count=1`: on every match); metric rules
+    fire once when `metric op value` has held for `duration` seconds.
+    `source` is a case-insensitive substring of the event's source or message
+    (v48 PatternMatcher), so source=chrome also catches the "Application
+    Error" / "Application Hang" events that name chrome.exe.
+    Text form (see `parse`):
+        id=6008
+        log=Application type=Error source=chrome count>20 within=5m
+        cpu>90 for=3m
+    """
+    METRICS = ('cpu', 'ram', 'disk')
+    _OPS = {'>': lambda a, b: a > b, '>=': lambda a, b: a >= b, '<': lambda a, b: a < b, '<=': lambda a, b: a <= b}
+    _TERM_RE = re.compile(r"^(\w+)\s*(>=|<=|=|>|<)\s*(.+)$")
+
+    def __init__(self, event_id=None, source=None, log_type=None, event_type=None, count=1, window=300,
+                 metric=None, op='>', value=None, duration=0, name=None, rule_id=None):
+        self.event_id = int(event_id) if event_id is not None else None
+        self.source = source.lower() if source else None
+        self.log_type = log_type
+        self.event_type = event_type
+        self.count = max(int(count), 1)
+        self.window = float(window)
+        self.metric = metric
+        self.op = op
+        self.value = float(value) if value is not None else None
+        self.duration = float(duration)
+        self.rule_id = rule_id
+        self.name = name or self.describe()
+        if metric is not None and (metric not in self.METRICS or op not in self._OPS or self.value is None):
+            raise ValueError(f"Unsupported metric rule: {metric} {op} {value}")
+        if metric is None and self.event_id is None and self.source is None and self.log_type is None and self.event_type is None:
+            raise ValueError("An event rule needs at least one of id, source, log or type.")
+
+    @staticmethod
+    def _seconds(text):
+        units = {'s': 1, 'm': 60, 'h': 3600}
+        text = text.strip().lower()
+        return float(text[:-1]) * units[text[-1]] if text[-1:] in units else float(text)
+
+    @classmethod
+    def parse(cls, text):
+        """Builds a rule from the text form shown in the class docstring."""
+        fields = {}
+        for term in text.split():
+            match = cls._TERM_RE.match(term)
+            if not match:
+                raise ValueError(f"Cannot parse '{term}' (expected key=value, count>N or cpu>N)")
+            key, op, value = match.group(1).lower(), match.group(2), match.group(3)
+            if key in cls.METRICS:
+                fields.update(metric=key, op=op, value=value)
+            elif key == 'count':
+                fields['count'] = int(value) + 1 if op == '>' else int(value)
+            elif key in ('id', 'event_id'):
+                fields['event_id'] = value
+            elif key == 'source':
+                fields['source'] = value
+            elif key == 'log':
+                fields['log_type'] = value.capitalize()
+            elif key == 'type':
+                fields['event_type'] = value.capitalize()
+            elif key in ('within', 'window'):
+                fields['window'] = cls._seconds(value)
+            elif key in ('for', 'duration'):
+                fields['duration'] = cls._seconds(value)
+            else:
+                raise ValueError(f"Unknown rule key '{key}'")
+        return cls(**fields)
+
+    def describe(self):
+        if self.metric:
+            return f"{self.metric.upper()} {self.op} {self.value:g}%" + (f" for {self.duration:g}s" if self.duration else "")
+        parts = [f"event {self.event_id}" if self.event_id is not None else "events"]
+        if self.event_type: parts.append(f"of type {self.event_type}")
+        if self.source: parts.append(f"from {self.source}")
+        if self.log_type: parts.append(f"in {self.log_type}")
+        if self.count > 1: parts.append(f"x{self.count} within {self.window:g}s")
+        return " ".join(parts)
+
+    def matches(self, evt):
+        """Checks the parts of the rule that are not part of its index key."""
+        return ((self.log_type is None or evt.get('log_type') == self.log_type)
+                and (self.event_type is None or evt.get('event_type') == self.event_type))
+
+    def to_dict(self):
+        return {'id': self.rule_id, 'name': self.name, 'event_id': self.event_id, 'source': self.source, 'log_type': self.log_type,
+                'event_type': self.event_type, 'count': self.count, 'window': self.window, 'metric': self.metric,
+                'op': self.op, 'value': self.value, 'duration': self.duration}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('event_id'), data.get('source'), data.get('log_type'), data.get('event_type'), data.get('count', 1),
+                   data.get('window', 300), data.get('metric'), data.get('op', '>'), data.get('value'), data.get('duration', 0),
+                   data.get('name'), data.get('id'))
+
+
+class RuleEngine:
+    """
+    v37 Watch Rules:
+    Evaluates rules incrementally as events and metric samples arrive. Event
+    rules are indexed by source pattern and event ID (None as a wildcard): the
+    rules whose pattern occurs in an event source are memoized per source, and
+    the message is scanned once by a PatternMatcher over all rule sources, so
+    an event is only checked against the rules it can match, however many
+    there are. Each rule keeps only the timestamps of its last `count` hits (a
+    sliding window of fixed size). Fired alerts go to `on_alert(alert)` and `alerts`.
+    """
+    def __init__(self, on_alert=None, max_alerts=200):
+        self._lock = threading.Lock()
+        self.on_alert = on_alert or (lambda alert: None)
+        self.rules = {}
+        self.alerts = deque(maxlen=max_alerts)
+        self._index = {}          # event ID -> rules without a source
+        self._by_pattern = {}     # source pattern -> {event ID -> rules}
+        self._sources = PatternMatcher(())
+        self._source_memo = {}    # event source -> {event ID -> rules whose pattern it contains}
+        self._metric_rules = {}
+        self._hits = {}
+        self._breach_since = {}
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, rule):
+        with self._lock:
+            if rule.rule_id is None or rule.rule_id in self.rules:
+                rule.rule_id = self._next_id
+            self._next_id = max(self._next_id, rule.rule_id) + 1
+            self.rules[rule.rule_id] = rule
+            if rule.metric:
+                self._metric_rules.setdefault(rule.metric, []).append(rule)
+                return rule
+            if rule.source:
+                self._by_pattern.setdefault(rule.source, {}).setdefault(rule.event_id, []).append(rule)
+                self._reindex_sources()
+            else:
+                self._index.setdefault(rule.event_id, []).append(rule)
+            self._hits[rule.rule_id] = deque(maxlen=rule.count)
+        return rule
+
+    def remove(self, rule_id):
+        with self._lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            if rule.metric:
+                self._metric_rules[rule.metric].remove(rule)
+            elif rule.source:
+                groups = self._by_pattern[rule.source]
+                groups[rule.event_id].remove(rule)
+                if not groups[rule.event_id]:
+                    del groups[rule.event_id]
+                if not groups:
+                    del self._by_pattern[rule.source]
+                self._reindex_sources()
+            else:
+                self._index[rule.event_id].remove(rule)
+            self._hits.pop(rule_id, None)
+            self._breach_since.pop(rule_id, None)
+            return True
+
+    def _reindex_sources(self):
+        self._sources = PatternMatcher(self._by_pattern)
+        self._source_memo = {}
+
+    def _rules_for_source(self, source):
+        """{event ID: rules} for the rule sources that occur in `source` (memoized per source)."""
+        found = self._source_memo.get(source)
+        if found is None:
+            found = {}
+            for pattern in self._sources.find_all(source):
+                for event_id, rules in self._by_pattern[pattern].items():
+                    found.setdefault(event_id, []).extend(rules)
+            if len(self._source_memo) >= PatternMatcher.MEMO_SIZE:
+                self._source_memo.clear()
+            self._source_memo[source] = found
+        return found
+
+    def log_types(self):
+        """Logs the event rules need to watch."""
+        with self._lock:
+            named = {rule.log_type for rule in self.rules.values() if not rule.metric}
+        if not named:
+            return []
+        return ["System", "Application", "Security"] if None in named else sorted(named)
+
+    def process_events(self, events):
+        """Feeds new events (any order; evaluated oldest first). Returns the alerts fired."""
+        fired = []
+        ordered = sorted(events, key=_event_timestamp)
+        with self._lock:
+            index, by_pattern = self._index, self._by_pattern
+            for evt in ordered:
+                event_id = evt.get('event_id')
+                keys = (event_id, None) if event_id is not None else (None,)
+                candidates = [rule for key in keys for rule in index.get(key, ())]
+                if by_pattern:
+                    by_source = self._rules_for_source(evt.get('source') or '')
+                    matched = [rule for key in keys for rule in by_source.get(key, ())]
+                    for pattern in self._sources.find_all(evt.get('message') or ''):
+                        groups = by_pattern[pattern]
+                        matched.extend(rule for key in keys for rule in groups.get(key, ()))
+                    candidates.extend(dict.fromkeys(matched))  # a rule found in both source and message counts once
+                for rule in candidates:
+                    if not rule.matches(evt):
+                        continue
+                    hits = self._hits[rule.rule_id]
+                    hits.append((_event_timestamp(evt), evt))
+                    if len(hits) == rule.count and hits[-1][0] - hits[0][0] <= rule.window:
+                        fired.append(self._alert(rule, f"{rule.name}: {evt.get('source')} (ID {event_id}) {evt.get('message', '')[:120]}", [e for _, e in hits]))
+                        hits.clear()
+        self._deliver(fired)
+        return fired
+
+    def process_sample(self, sample, now=None):
+        """Feeds one metric sample ({'cpu': .., 'ram': .., 'disk': ..}). Returns the alerts fired."""
+        now = now if now is not None else time.time()
+        fired = []
+        with self._lock:
+            for metric, rules in self._metric_rules.items():
+                value = sample.get(metric)
+                if value is None:
+                    continue
+                for rule in rules:
+                    if not WatchRule._OPS[rule.op](value, rule.value):
+                        self._breach_since.pop(rule.rule_id, None)
+                        continue
+                    since, notified = self._breach_since.get(rule.rule_id, (now, False))
+                    if not notified and now - since >= rule.duration:
+                        fired.append(self._alert(rule, f"{rule.name} (now {value:.1f}%)", []))
+                        notified = True
+                    self._breach_since[rule.rule_id] = (since, notified)
+        self._deliver(fired)
+        return fired
+
+    def _alert(self, rule, message, events):
+        alert = {'rule_id': rule.rule_id, 'rule': rule.name, 'message': message,
+                 'time': datetime.datetime.now().isoformat(timespec='seconds'), 'events': events[-5:]}
+        self.alerts.appendleft(alert)
+        TELEMETRY.incr('alerts_fired')
+        return alert
+
+    def _deliver(self, fired):
+        for alert in fired:
+            print(f"🔔 ALERT: {alert['message']}")
+            try:
+                self.on_alert(alert)
+            except Exception as e:
+                print(f"⚠️ Alert callback failed: {e}")
+
+    def save(self, path):
+        with self._lock:
+            data = [rule.to_dict() for rule in self.rules.values()]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            for data in json.load(f):
+                self.add(WatchRule.from_dict(data))
+# ==============================================================================
+# ⬆️ END OF WATCH RULES (v37) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF MULTI-HOST "FLEET" QUERIES (v29) ⬇️
+# ==============================================================================
+#
+class WindowsHostSource:
+    """
+    A host read through the Windows Event Log RPC interface
+    (`OpenEventLog(server, ...)`). Metrics are only available for the local machine.
+    """
+    def __init__(self, host='localhost'):
+        self.name = host
+        self.reader = EventLogReader()
+
+    def read_events(self, log_type='System', max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None):
+        read = self.reader.read_events_multi if isinstance(log_type, list) else self.reader.read_events
+        return read(log_type, max_records, start_datetime, end_datetime, hide_common, keywords, event_type_filter, server=self.name)
+
+    def system_stats(self):
+        if self.name not in ('localhost', '127.0.0.1', '.'):
+            raise Exception(f"Real-time stats are not available for remote host '{self.name}' without a headless engine.")
+        return get_realtime_system_stats()
+
+
+class EngineAPISource:
+    """A host running `event.py --headless`, queried over its HTTP/JSON API."""
+    def __init__(self, url, token=None, timeout=30):
+        self.url = url.rstrip('/')
+        # host:port, so several engines on one machine stay distinct
+        self.name = urlparse(self.url).netloc or self.url
+        self.token = token
+        self.timeout = timeout
+
+    def _get(self, path, params=None):
+        query = ('?' + urlencode({k: v for k, v in (params or {}).items() if v not in (None, '', [])})) if params else ''
+        request = urllib.request.Request(self.url + path + query)
+        if self.token:
+            request.add_header('Authorization', f"Bearer {self.token}")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def read_events(self, log_type='System', max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None):
+        events = self._get('/events', {
+            'log_type': ','.join(log_type) if isinstance(log_type, list) else log_type,
+            'max_records': max_records,
+            'start': start_datetime.isoformat() if start_datetime else None,
+            'end': end_datetime.isoformat() if end_datetime else None,
+            'hide_common': 'true' if hide_common else 'false',
+            'keywords': ','.join(keywords or []),
+            'types': ','.join(event_type_filter or []),
+        })['events']
+        return [EventRecord.from_dict(evt) for evt in events]
+
+    def system_stats(self):
+        return self._get('/system')['report']
+
+
+def make_host_source(spec, token=None):
+    """'http(s)://host:port' -> EngineAPISource, anything else -> WindowsHostSource."""
+    if spec.startswith('http://') or spec.startswith('https://'):
+        return EngineAPISource(spec, token)
+    return WindowsHostSource(spec)
+
+
+class FleetQuery:
+    """
+    v29 Fleet Query:
+    Fans one query out to many hosts through a bounded worker pool. Every host
+    gets its own timeout (counted from when its worker starts, not from when it
+    was queued). Results are reported through `on_result` as each host answers
+    and are then merged newest-first across hosts.
+    """
+    def __init__(self, sources, max_workers=8, timeout=60):
+        self.sources = list(sources)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.last_status = {}
+
+    def _run(self, fn, on_result=None):
+        """Runs fn(source) on every host and yields (host, result, error) as hosts finish or time out."""
+        started = {}  # keyed by source, so hosts that share a name keep their own deadline
+        status = {}
+        self.last_status = status
+
+        def task(source):
+            started[source] = time.perf_counter()
+            return fn(source)
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.sources))))
+        try:
+            pending = {pool.submit(task, source): source for source in self.sources}
+            while pending:
+                now = time.perf_counter()
+                deadlines = [started[src] + self.timeout for src in pending.values() if src in started]
+                wait_for = max(min(deadlines) - now, 0) if deadlines else 0.05
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    source = pending.pop(future)
+                    elapsed_ms = (time.perf_counter() - started.get(source, now)) * 1000
+                    try:
+                        result, error = future.result(), None
+                        status[source.name] = {'status': 'ok', 'elapsed_ms': elapsed_ms}
+                    except Exception as e:
+                        result, error = None, str(e)
+                        status[source.name] = {'status': 'error', 'elapsed_ms': elapsed_ms, 'error': error}
+                    if on_result:
+                        on_result(source.name, result, error)
+                    yield source.name, result, error
+
+                now = time.perf_counter()
+                for future, source in list(pending.items()):
+                    if source in started and now - started[source] >= self.timeout:
+                        # The worker thread cannot be killed; its result is simply ignored.
+                        pending.pop(future)
+                        error = f"timed out after {self.timeout}s"
+                        status[source.name] = {'status': 'timeout', 'elapsed_ms': self.timeout * 1000, 'error': error}
+                        if on_result:
+                            on_result(source.name, None, error)
+                        yield source.name, None, error
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stream_events(self, on_result=None, **filters):
+        """Yields (host, events, error) per host as soon as that host answers."""
+        def fetch(source):
+            events = source.read_events(**filters)
+            for evt in events:
+                evt['host'] = source.name
+            return events
+        return self._run(fetch, on_result)
+
+    def read_events(self, max_records=500, on_result=None, **filters):
+        """Queries every host and returns the time-ordered merge, capped at `max_records` overall."""
+        print(f"🛰️ Fleet query across {len(self.sources)} hosts (workers: {self.max_workers}, timeout: {self.timeout}s)")
+        per_host = [events for _, events, error in self.stream_events(on_result=on_result, max_records=max_records, **filters) if events]
+        merged = []
+        for event in heapq.merge(*per_host, key=_event_sort_key, reverse=True):
+            if len(merged) >= max_records:
+                break
+            merged.append(event)
+        ok = sum(1 for st in self.last_status.values() if st['status'] == 'ok')
+        print(f"🛰️ Fleet query merged {len(merged)} events from {ok}/{len(self.sources)} hosts")
+        return merged
+
+    def system_stats(self, on_result=None):
+        return {host: (report if error is None else f"Error: {error}") for host, report, error in self._run(lambda source: source.system_stats(), on_result)}
+# ==============================================================================
+# ⬆️ END OF MULTI-HOST "FLEET" QUERIES (v29) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF EVENT ARCHIVE (v30) ⬇️
+# ==============================================================================
+#
+class EventArchive:
+    """
+    v30 Event Archive (.evarc):
+    Compact on-disk history of `read_events` results.
+
+        [magic]
+        [block]*            one block per appended batch (<= BLOCK_ROWS rows, oldest first)
+          header            <IIII rows, meta_raw_len, meta_len, msg_len
+          meta (zlib)       columns: time (int64 epoch s), event_id, source, type, computer, log, record_number, message length
+          messages (zlib)   UTF-8 messages, concatenated
+        [footer (zlib JSON)] dictionaries + per-block index (offset, rows, time/ID min-max, sources, types, logs)
+        [trailer]           <QQ footer offset/length + end magic
+
+    Sources, event types, computers and log names are dictionary-encoded. The
+    reader uses the block index to skip blocks (time range, event IDs, sources,
+    types) without reading them; the message column is only decompressed for
+    blocks that still have matching rows.
+
+    Writers (`append`, `sync_from_log`) hold the archive lock for the whole
+    write. Before an append replaces the footer, the current one is saved to
+    `<path>.footer`; if the append is interrupted, the archive reopens from
+    that copy with the blocks it describes. A scan snapshots the block index
+    under the lock and reads through its own file handle, so appends (which
+    only add bytes after the blocks it knows about) can run while it is being
+    consumed. The reader uses plain seek/read, not a memory map: Windows
+    cannot truncate a file that is mapped, and every append truncates the
+    old footer.
+    """
+    MAGIC = b'EVARC1\0\0'
+    END_MAGIC = b'EVARCEND'
+    BLOCK_ROWS = 4096
+    _BLOCK_HEADER = struct.Struct('<IIII')
+    _TRAILER = struct.Struct('<QQ8s')
+    _COLUMNS = (('time', 'q'), ('event_id', 'I'), ('source', 'I'), ('event_type', 'I'), ('computer', 'I'), ('log', 'I'), ('record_number', 'I'), ('msg_len', 'I'))
+
+    def __init__(self, path):
+        self.path = path
+        self.backup_path = path + '.footer'
+        self._lock = threading.RLock()
+        self.dicts = {'source': [], 'event_type': [], 'computer': [], 'log': []}
+        self.blocks = []
+        self.watermarks = {}
+        self.data_end = len(self.MAGIC)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._load_footer()
+
+    # --- Footer ---
+    def _load_footer(self):
+        with open(self.path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise Exception(f"{self.path} is not an event archive")
+            footer = self._read_footer(f)
+        if footer is None:
+            footer = self._read_backup_footer()
+            if footer is None:
+                raise Exception(f"{self.path} is truncated or corrupt (missing trailer)")
+            print(f"⚠️ {self.path} has no valid footer (interrupted append?); reopened from {self.backup_path}")
+        self.dicts = footer['dicts']
+        self.blocks = footer['blocks']
+        self.watermarks = footer.get('watermarks', {})
+        self.data_end = footer['data_end']
+
+    def _read_footer(self, f):
+        """The footer the trailer points at, or None if the trailer or footer is missing or damaged."""
+        size = f.seek(0, os.SEEK_END)
+        if size < len(self.MAGIC) + self._TRAILER.size:
+            return None
+        f.seek(-self._TRAILER.size, os.SEEK_END)
+        footer_offset, footer_len, end_magic = self._TRAILER.unpack(f.read(self._TRAILER.size))
+        if end_magic != self.END_MAGIC or footer_offset + footer_len + self._TRAILER.size != size:
+            return None
+        f.seek(footer_offset)
+        try:
+            footer = json.loads(zlib.decompress(f.read(footer_len)))
+        except (zlib.error, ValueError):
+            return None
+        footer['data_end'] = footer_offset
+        return footer
+
+    def _read_backup_footer(self):
+        try:
+            with open(self.backup_path, 'rb') as f:
+                return json.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, ValueError):
+            return None
+
+    def _footer_bytes(self, data_end=None):
+        footer = {'version': 1, 'dicts': self.dicts, 'blocks': self.blocks, 'watermarks': self.watermarks}
+        if data_end is not None:
+            footer['data_end'] = data_end
+        return zlib.compress(json.dumps(footer).encode('utf-8'), 6)
+
+    def _write_backup_footer(self):
+        tmp = self.backup_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(self._footer_bytes(self.data_end))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.backup_path)
+
+    # --- Writing ---
+    def append(self, events, log_type=None):
+        """Appends events (dicts from `read_events`) as new blocks. Returns the number written."""
+        if not events:
+            return 0
+        with self._lock:
+            return self._append(events, log_type)
+
+    def _append(self, events, log_type):
+        saved = ({name: list(values) for name, values in self.dicts.items()}, len(self.blocks), dict(self.watermarks))
+        try:
+            return self._write_blocks(events, log_type)
+        except BaseException:
+            # The file still ends at a damaged tail; the next append rewrites it from data_end.
+            self.dicts, self.watermarks = saved[0], saved[2]
+            del self.blocks[saved[1]:]
+            raise
+
+    def _write_blocks(self, events, log_type):
+        lookups = {name: {value: i for i, value in enumerate(values)} for name, values in self.dicts.items()}
+
+        def encode(name, value):
+            table = lookups[name]
+            idx = table.get(value)
+            if idx is None:
+                idx = table[value] = len(self.dicts[name])
+                self.dicts[name].append(value)
+            return idx
+
+        rows = sorted(((_event_timestamp(evt), evt) for evt in events), key=lambda row: row[0])
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._write_backup_footer()
+        with open(self.path, 'wb' if new_file else 'r+b') as f:
+            if new_file:
+                f.write(self.MAGIC)
+            f.seek(self.data_end)
+            f.truncate()
+            for start in range(0, len(rows), self.BLOCK_ROWS):
+                chunk = rows[start:start + self.BLOCK_ROWS]
+                columns = {name: array.array(code) for name, code in self._COLUMNS}
+                messages = []
+                for ts, evt in chunk:
+                    message = (evt.get('message') or '').encode('utf-8')
+                    log = evt.get('log_type') or log_type or ''
+                    columns['time'].append(int(ts))
+                    columns['event_id'].append(int(evt.get('event_id', 0)))
+                    columns['source'].append(encode('source', evt.get('source', '')))
+                    columns['event_type'].append(encode('event_type', evt.get('event_type', '')))
+                    columns['computer'].append(encode('computer', evt.get('computer', '')))
+                    columns['log'].append(encode('log', log))
+                    columns['record_number'].append(int(evt.get('record_number') or 0))
+                    columns['msg_len'].append(len(message))
+                    messages.append(message)
+                    if evt.get('record_number') and log:
+                        self.watermarks[log] = max(self.watermarks.get(log, 0), int(evt['record_number']))
+
+                meta_raw = b''.join(_le_bytes(columns[name]) for name, _ in self._COLUMNS)
+                meta = zlib.compress(meta_raw, 6)
+                msgs = zlib.compress(b''.join(messages), 6)
+                offset = f.tell()
+                f.write(self._BLOCK_HEADER.pack(len(chunk), len(meta_raw), len(meta), len(msgs)))
+                f.write(meta)
+                f.write(msgs)
+                self.blocks.append({
+                    'offset': offset, 'rows': len(chunk),
+                    't_min': columns['time'][0], 't_max': columns['time'][-1],
+                    'id_min': min(columns['event_id']), 'id_max': max(columns['event_id']),
+                    'sources': sorted(set(columns['source'])), 'types': sorted(set(columns['event_type'])),
+                    'logs': sorted(set(columns['log'])),
+                })
+            data_end = f.tell()
+            footer = self._footer_bytes()
+            f.write(footer)
+            f.write(self._TRAILER.pack(data_end, len(footer), self.END_MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        self.data_end = data_end
+        os.remove(self.backup_path)
+        print(f"🗄️ Archived {len(rows)} events to {self.path} ({len(self.blocks)} blocks, {os.path.getsize(self.path) / 1024:.0f} KB)")
+        return len(rows)
+
+    def sync_from_log(self, reader, log_type, max_records=10**9, server='localhost'):
+        """
+        Appends every record of `log_type` that is newer than the archive's
+        watermark for that log (by RecordNumber), so repeated syncs never
+        duplicate events and history survives log rotation.
+
+        RecordNumber restarts at 1 when a log is cleared. That shows up as a
+        live log whose newest number is below the watermark, or as a record
+        at or below the watermark that is newer than anything archived for
+        the log; the sync then falls back to the time watermark and restarts
+        the RecordNumber watermark from the new records.
+        """
+        with self._lock:
+            return self._sync_from_log(reader, log_type, max_records, server)
+
+    def _sync_from_log(self, reader, log_type, max_records, server):
+        watermark = self.watermarks.get(log_type, 0)
+        log_idx = self.dicts['log'].index(log_type) if log_type in self.dicts['log'] else None
+        last_time = max((b['t_max'] for b in self.blocks if log_idx in b['logs']), default=None)
+        # read_events' out-of-order tolerance covers records written slightly late.
+        start = datetime.datetime.fromtimestamp(last_time) if last_time else None
+        events = reader.read_events(log_type, max_records, start_datetime=start, server=server)
+        newest_number = max((evt.get('record_number') or 0 for evt in events), default=None)
+        reset = bool(watermark and last_time is not None and events) and (
+            newest_number < watermark
+            or any((evt.get('record_number') or 0) <= watermark and _event_timestamp(evt) > last_time for evt in events))
+        if reset:
+            print(f"🔄 {log_type} log record numbers restarted (cleared?); archiving by time after {start}")
+            self.watermarks[log_type] = 0
+            fresh = [evt for evt in events if _event_timestamp(evt) > last_time]
+        else:
+            fresh = [evt for evt in events if (evt.get('record_number') or 0) > watermark]
+        return self._append(fresh, log_type) if fresh else 0
+
+    # --- Reading ---
+    def close(self):
+        """Nothing to release: every scan opens and closes its own read handle."""
+
+    def _decode_meta(self, f, block):
+        f.seek(block['offset'])
+        rows, meta_raw_len, meta_len, msg_len = self._BLOCK_HEADER.unpack(f.read(self._BLOCK_HEADER.size))
+        meta_start = block['offset'] + self._BLOCK_HEADER.size
+        raw = zlib.decompress(f.read(meta_len))
+        columns, pos = {}, 0
+        for name, code in self._COLUMNS:
+            col = array.array(code)
+            size = col.itemsize * rows
+            col.frombytes(raw[pos:pos + size])
+            if sys.byteorder == 'big':
+                col.byteswap()
+            columns[name] = col
+            pos += size
+        return columns, (meta_start + meta_len, msg_len)
+
+    def scan(self, start_datetime=None, end_datetime=None, event_ids=None, sources=None, event_type_filter=None, log_types=None, keywords=None, max_records=None):
+        """
+        Yields matching events newest-first across all blocks (and so across
+        logs), in the same dict shape as `read_events`. Blocks whose index rules
+        them out are never decompressed; the others are merged by time and each
+        is only opened once it can hold the next-newest event, so `max_records`
+        still stops early.
+        """
+        with self._lock:
+            if not self.blocks:
+                return
+            blocks = list(self.blocks)
+            dicts = {name: list(values) for name, values in self.dicts.items()}
+            f = open(self.path, 'rb')
+        try:
+            yield from self._scan(f, blocks, dicts, start_datetime, end_datetime, event_ids, sources, event_type_filter, log_types, keywords, max_records)
+        finally:
+            f.close()
+
+    def _scan(self, f, blocks, dicts, start_datetime, end_datetime, event_ids, sources, event_type_filter, log_types, keywords, max_records):
+        t_lo = int(start_datetime.timestamp()) if start_datetime else None
+        t_hi = int(end_datetime.timestamp()) if end_datetime else None
+        ids = {int(i) for i in event_ids} if event_ids else None
+        id_lo, id_hi = (min(ids), max(ids)) if ids else (None, None)
+        source_matcher = PatternMatcher(sources or ())
+        src_idx = {i for i, name in enumerate(dicts['source']) if source_matcher.find(name) is not None} if sources else None
+        type_idx = {i for i, name in enumerate(dicts['event_type']) if name in event_type_filter} if event_type_filter else None
+        log_idx = {i for i, name in enumerate(dicts['log']) if name in log_types} if log_types else None
+        keyword_filter = KeywordFilter(keywords or ())
+
+        candidates = [block for block in blocks
+                      if not ((t_lo is not None and block['t_max'] < t_lo) or (t_hi is not None and block['t_min'] > t_hi)
+                              or (ids is not None and (block['id_max'] < id_lo or block['id_min'] > id_hi))
+                              or (src_idx is not None and src_idx.isdisjoint(block['sources']))
+                              or (type_idx is not None and type_idx.isdisjoint(block['types']))
+                              or (log_idx is not None and log_idx.isdisjoint(block['logs'])))]
+        TELEMETRY.incr('archive_blocks_skipped', len(blocks) - len(candidates))
+        candidates.sort(key=lambda block: block['t_max'], reverse=True)
+
+        def block_events(block):
+            """(time, EventRecord) for the block's matching rows, newest first."""
+            columns, (msg_start, msg_len) = self._decode_meta(f, block)
+            rows = [i for i in range(block['rows'] - 1, -1, -1)
+                    if (t_lo is None or columns['time'][i] >= t_lo) and (t_hi is None or columns['time'][i] <= t_hi)
+                    and (ids is None or columns['event_id'][i] in ids)
+                    and (src_idx is None or columns['source'][i] in src_idx)
+                    and (type_idx is None or columns['event_type'][i] in type_idx)
+                    and (log_idx is None or columns['log'][i] in log_idx)]
+            if not rows:
+                return
+
+            f.seek(msg_start)
+            messages = zlib.decompress(f.read(msg_len))
+            offsets = [0]
+            for n in columns['msg_len']:
+                offsets.append(offsets[-1] + n)
+            for i in rows:
+                message = messages[offsets[i]:offsets[i + 1]].decode('utf-8', errors='replace')
+                source = dicts['source'][columns['source'][i]]
+                if keyword_filter and not keyword_filter.matches(columns['event_id'][i], source, message):
+                    continue
+                yield columns['time'][i], EventRecord(source, columns['event_id'][i], dicts['event_type'][columns['event_type'][i]],
+                                                      float(columns['time'][i]), dicts['computer'][columns['computer'][i]], message,
+                                                      dicts['log'][columns['log'][i]], columns['record_number'][i])
+
+        # Newest-first k-way merge. Blocks are time-sorted inside, so a block only
+        # joins the heap when its t_max reaches the newest row still pending.
+        heap, order, emitted = [], itertools.count(), 0
+        pending = iter(candidates)
+        block = next(pending, None)
+        while True:
+            while block is not None and (not heap or block['t_max'] >= -heap[0][0]):
+                rows = block_events(block)
+                first = next(rows, None)
+                if first is not None:
+                    heapq.heappush(heap, (-first[0], next(order), first[1], rows))
+                block = next(pending, None)
+            if not heap:
+                return
+            _, _, record, rows = heapq.heappop(heap)
+            yield record
+            emitted += 1
+            if max_records is not None and emitted >= max_records:
+                return
+            following = next(rows, None)
+            if following is not None:
+                heapq.heappush(heap, (-following[0], next(order), following[1], rows))
+
+    def read_events(self, log_type=None, max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None):
+        """`read_events`-compatible query over the archive (`hide_common` is ignored)."""
+        log_types = log_type if isinstance(log_type, list) else ([log_type] if log_type and log_type != "All Logs" else None)
+        return list(self.scan(start_datetime, end_datetime, event_type_filter=event_type_filter, log_types=log_types, keywords=keywords, max_records=max_records))
+
+    def info(self):
+        with self._lock:
+            return {
+                'path': self.path, 'blocks': len(self.blocks), 'events': sum(b['rows'] for b in self.blocks),
+                'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+                'oldest': datetime.datetime.fromtimestamp(min(b['t_min'] for b in self.blocks)).isoformat() if self.blocks else None,
+                'newest': datetime.datetime.fromtimestamp(max(b['t_max'] for b in self.blocks)).isoformat() if self.blocks else None,
+                'watermarks': dict(self.watermarks),
+            }
+
+
+def _le_bytes(col):
+    if sys.byteorder == 'big':
+        col = array.array(col.typecode, col)
+        col.byteswap()
+    return col.tobytes()
+
+
+def _event_timestamp(event):
+    if isinstance(event, EventRecord):
+        return event.timestamp
+    dt = _event_sort_key(event)
+    return dt.timestamp() if dt != datetime.datetime.min else 0
+# ==============================================================================
+# ⬆️ END OF EVENT ARCHIVE (v30) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF EVENT EXPORT (v47) ⬇️
+# ==============================================================================
+#
+class EventExporter:
+    """
+    v47 Export:
+    Streams events (and any explanation already known for them) from an
+    iterator to JSON lines, CSV or Parquet, one row at a time - nothing is
+    collected in memory except one Parquet row group. Writes go through a
+    1 MB buffer, optionally gzip-compressed (text formats) or zstd/snappy
+    (Parquet, which needs pyarrow). Files are written to "<path>.part" and
+    renamed when complete.
+    """
+    FORMATS = ('jsonl', 'csv', 'parquet')
+    EXPLANATION_FIELDS = EventKnowledgeBase.FIELDS
+    COLUMNS = EventRecord.FIELDS + tuple(f"explanation_{name}" for name in EventKnowledgeBase.FIELDS)
+    BUFFER_SIZE = 1 << 20
+    ROW_GROUP = 50000
+    PROGRESS_EVERY = 10000
+    MEMO_SIZE = 4096
+
+    def __init__(self, fmt='jsonl', explain=None, on_progress=None):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}' (use {', '.join(self.FORMATS)})")
+        self.fmt = fmt
+        self.explain = explain
+        self.on_progress = on_progress
+        self.events = 0
+        self.explained = 0
+        self._encoder = json.JSONEncoder(ensure_ascii=False, default=_json_default)
+        # Logs repeat the same few messages; explanations (and their JSON) are looked up once per message
+        self._memo = {}
+
+    def _explanation(self, evt):
+        key = (evt['event_id'], evt['event_type'], evt['source'], evt['message'])
+        hit = self._memo.get(key)
+        if hit is None:
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            explanation = self.explain(evt)
+            hit = self._memo[key] = (explanation, self._encoder.encode(explanation) if explanation else None)
+        return hit
+
+    @classmethod
+    def infer(cls, path):
+        """(format, compression) from a file name such as events.jsonl.gz or events.parquet."""
+        name = path.lower()
+        compression = 'gzip' if name.endswith('.gz') else None
+        if compression:
+            name = name[:-3]
+        ext = os.path.splitext(name)[1].lstrip('.')
+        fmt = {'ndjson': 'jsonl', 'json': 'jsonl', 'pq': 'parquet'}.get(ext, ext)
+        return (fmt if fmt in cls.FORMATS else 'jsonl'), compression
+
+    def _rows(self, events):
+        none = (None, None)
+        for evt in events:
+            explanation = self._explanation(evt) if self.explain else none
+            self.events += 1
+            if explanation[0]:
+                self.explained += 1
+            if self.events % self.PROGRESS_EVERY == 0:
+                check_cancelled()
+                if self.on_progress:
+                    self.on_progress(self.events)
+            yield evt, explanation
+
+    def write(self, events, out, compression=None):
+        """Streams `events` to the binary file object `out`."""
+        if self.fmt == 'parquet':
+            return self._write_parquet(events, out, compression or 'zstd')
+        gz = gzip.GzipFile(fileobj=out, mode='wb', compresslevel=6) if compression == 'gzip' else None
+        text = io.TextIOWrapper(gz or out, encoding='utf-8', newline='')
+        try:
+            if self.fmt == 'jsonl':
+                encode = self._encoder.encode
+                for evt, (explanation, encoded) in self._rows(events):
+                    line = encode(evt.to_dict() if isinstance(evt, EventRecord) else dict(evt))
+                    text.write(f'{line[:-1]}, "explanation": {encoded}}}\n' if encoded else line + "\n")
+            else:
+                writer = csv.writer(text)
+                writer.writerow(self.COLUMNS)
+                for evt, (explanation, _) in self._rows(events):
+                    writer.writerow([evt.get(name) for name in EventRecord.FIELDS] +
+                                    [explanation.get(name, '') if explanation else '' for name in self.EXPLANATION_FIELDS])
+            text.flush()
+        finally:
+            text.detach()
+            if gz is not None:
+                gz.close()
+        return self.events
+
+    def _write_parquet(self, events, out, compression):
+        pa, pq = _lazy_import('pyarrow'), _lazy_import('pyarrow.parquet')
+        if pa is None or pq is None:
+            raise Exception("Parquet export needs pyarrow (pip install pyarrow); use JSONL or CSV instead.")
+        types = {'event_id': pa.int32(), 'record_number': pa.int64()}
+        schema = pa.schema([(name, types.get(name, pa.string())) for name in self.COLUMNS])
+        writer = pq.ParquetWriter(out, schema, compression=compression)
+        columns = {name: [] for name in self.COLUMNS}
+        try:
+            for evt, (explanation, _) in self._rows(events):
+                for name in EventRecord.FIELDS:
+                    columns[name].append(evt.get(name))
+                for name in self.EXPLANATION_FIELDS:
+                    columns[f"explanation_{name}"].append(explanation.get(name) if explanation else None)
+                if len(columns['source']) >= self.ROW_GROUP:
+                    writer.write_table(pa.table(columns, schema=schema))
+                    columns = {name: [] for name in self.COLUMNS}
+            if columns['source'] or not self.events:
+                writer.write_table(pa.table(columns, schema=schema))
+        finally:
+            writer.close()
+        return self.events
+
+    def export(self, events, path, compression=None):
+        """Writes `events` to `path`; returns a summary of the export."""
+        started = time.perf_counter()
+        partial = path + '.part'
+        try:
+            with open(partial, 'wb', buffering=self.BUFFER_SIZE) as out:
+                self.write(events, out, compression)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        elapsed = time.perf_counter() - started
+        TELEMETRY.record('export', elapsed * 1000)
+        TELEMETRY.incr('events_exported', self.events)
+        return {'path': path, 'format': self.fmt, 'compression': compression, 'events': self.events, 'explained': self.explained,
+                'bytes': os.path.getsize(path), 'seconds': elapsed}
+#
+# ==============================================================================
+# ⬆️ END OF EVENT EXPORT (v47) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF EVENT SEARCH INDEX (v31) ⬇️
+# ==============================================================================
+#
+class EventSearchIndex:
+    """
+    v31 Event Search:
+    In-memory inverted index over event sources, IDs and messages with BM25
+    ranking. Queries support plain terms, "quoted phrases" and prefix* terms.
+    The index grows incrementally; events already indexed (same machine, log
+    and RecordNumber) are skipped, so identical events from two fleet hosts
+    stay separate documents.
+    """
+    K1 = 1.2
+    B = 0.75
+    MAX_PREFIX_EXPANSIONS = 50
+    _TOKEN_RE = re.compile(r"[a-z0-9]+")
+    _QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+    STOPWORDS = frozenset("""a an and any are as at be by can did do does for from has have how i in is it its kya me my
+        of on or pc please show tell that the there this to was were what when where which why with yesterday today
+        last night morning happened hai tha kab""".split())
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.docs = []
+        self.doc_times = array.array('d')
+        self.doc_lens = array.array('I')
+        self.total_len = 0
+        self.postings = {}
+        self.newest = {}
+        self._seen = set()
+        self._vocab = None
+
+    @classmethod
+    def tokenize(cls, text):
+        return cls._TOKEN_RE.findall(text.lower())
+
+    def __len__(self):
+        return len(self.docs)
+
+    def covers(self, log_types):
+        return all(log_type in self.newest for log_type in log_types)
+
+    def add(self, events, log_type=None):
+        """Indexes new events; returns how many were added."""
+        added = 0
+        with self._lock:
+            if log_type and log_type not in self.newest:
+                self.newest[log_type] = 0.0
+            for evt in events:
+                key = (evt.get('host'), evt.get('computer'), evt.get('log_type'), evt.get('record_number'))
+                if key[3] is not None:
+                    if key in self._seen:
+                        continue
+                    self._seen.add(key)
+                doc_id = len(self.docs)
+                # Source and ID first, then the message after a gap so phrases cannot span them.
+                tokens = self.tokenize(evt.get('source', '')) + [str(evt.get('event_id', ''))]
+                offset = len(tokens) + 1
+                message_tokens = self.tokenize(evt.get('message', ''))
+                for pos, term in enumerate(tokens):
+                    self._post(term, doc_id, pos)
+                for pos, term in enumerate(message_tokens):
+                    self._post(term, doc_id, offset + pos)
+                length = len(tokens) + len(message_tokens)
+                ts = _event_timestamp(evt)
+                self.docs.append(evt)
+                self.doc_times.append(ts)
+                self.doc_lens.append(length)
+                self.total_len += length
+                if evt.get('log_type'):
+                    self.newest[evt['log_type']] = max(self.newest.get(evt['log_type'], 0.0), ts)
+                added += 1
+        return added
+
+    def _post(self, term, doc_id, pos):
+        docs = self.postings.get(term)
+        if docs is None:
+            docs = self.postings[term] = {}
+            self._vocab = None
+        positions = docs.get(doc_id)
+        if positions is None:
+            positions = docs[doc_id] = array.array('I')
+        positions.append(pos)
+
+    def _expand_prefix(self, prefix):
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        i = bisect.bisect_left(self._vocab, prefix)
+        expansions = []
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix) and len(expansions) < self.MAX_PREFIX_EXPANSIONS:
+            expansions.append(self._vocab[i])
+            i += 1
+        return expansions
+
+    def parse_query(self, query):
+        """Splits a query into ('phrase', [terms]), ('prefix', stem) and ('term', term) clauses."""
+        clauses = []
+        for phrase, word in self._QUERY_RE.findall(query):
+            if phrase:
+                terms = self.tokenize(phrase)
+                if len(terms) > 1:
+                    clauses.append(('phrase', terms))
+                elif terms:
+                    clauses.append(('term', terms[0]))
+            elif word.endswith('*') and len(word) > 1:
+                stem = self.tokenize(word[:-1])
+                if stem:
+                    clauses.append(('prefix', stem[-1]))
+            else:
+                clauses.extend(('term', t) for t in self.tokenize(word) if t not in self.STOPWORDS)
+        return clauses
+
+    def search(self, query, k=50, start_datetime=None, end_datetime=None, log_types=None, event_type_filter=None):
+        """Returns up to k (score, event) pairs, best first."""
+        clauses = self.parse_query(query)
+        if not clauses:
+            return []
+        t_lo = start_datetime.timestamp() if start_datetime else None
+        t_hi = end_datetime.timestamp() if end_datetime else None
+        log_types = set(log_types) if log_types else None
+        event_types = set(event_type_filter) if event_type_filter else None
+
+        with self._lock:
+            n_docs = len(self.docs)
+            if not n_docs:
+                return []
+            avgdl = self.total_len / n_docs
+
+            def allowed(doc_id):
+                if t_lo is not None and self.doc_times[doc_id] < t_lo:
+                    return False
+                if t_hi is not None and self.doc_times[doc_id] > t_hi:
+                    return False
+                evt = self.docs[doc_id]
+                if log_types is not None and evt.get('log_type') not in log_types:
+                    return False
+                return event_types is None or evt.get('event_type') in event_types
+
+            filtered = t_lo is not None or t_hi is not None or log_types is not None or event_types is not None
+            allowed_cache = {}
+
+            def is_allowed(doc_id):
+                if not filtered:
+                    return True
+                ok = allowed_cache.get(doc_id)
+                if ok is None:
+                    ok = allowed_cache[doc_id] = allowed(doc_id)
+                return ok
+
+            def term_scores(term):
+                docs = self.postings.get(term)
+                if not docs:
+                    return {}
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores = {}
+                for doc_id, positions in docs.items():
+                    if is_allowed(doc_id):
+                        tf = len(positions)
+                        norm = self.K1 * (1 - self.B + self.B * self.doc_lens[doc_id] / avgdl)
+                        scores[doc_id] = idf * tf * (self.K1 + 1) / (tf + norm)
+                return scores
+
+            scores = {}
+            required = None
+            for kind, value in clauses:
+                if kind == 'term':
+                    for doc_id, score in term_scores(value).items():
+                        scores[doc_id] = scores.get(doc_id, 0.0) + score
+                elif kind == 'prefix':
+                    best = {}
+                    for term in self._expand_prefix(value):
+                        for doc_id, score in term_scores(term).items():
+                            if score > best.get(doc_id, 0.0):
+                                best[doc_id] = score
+                    for doc_id, score in best.items():
+                        scores[doc_id] = scores.get(doc_id, 0.0) + score
+                else:
+                    matches = self._phrase_docs(value)
+                    required = matches if required is None else required & matches
+                    for term in value:
+                        for doc_id, score in term_scores(term).items():
+                            if doc_id in matches:
+                                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+            if required is not None:
+                scores = {doc_id: score for doc_id, score in scores.items() if doc_id in required}
+            top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], self.doc_times[item[0]]))
+            return [(score, self.docs[doc_id]) for doc_id, score in top]
+
+    def _phrase_docs(self, terms):
+        postings = [self.postings.get(t) for t in terms]
+        if not all(postings):
+            return set()
+        candidates = set(min(postings, key=len))
+        for docs in postings:
+            candidates &= docs.keys()
+        matches = set()
+        for doc_id in candidates:
+            following = [set(docs[doc_id]) for docs in postings[1:]]
+            if any(all(p + i + 1 in positions for i, positions in enumerate(following)) for p in postings[0][doc_id]):
+                matches.add(doc_id)
+        return matches
+# ==============================================================================
+# ⬆️ END OF EVENT SEARCH INDEX (v31) ⬆️
+# ==============================================================================
+
+#
+# ==============================================================================
+# ⬇️ START OF "SIMILAR EVENTS" (v32) ⬇️
+# ==============================================================================
+#
+class EventSimilarityIndex:
+    """
+    v32 Similar Events:
+    TF-IDF vectors (sublinear tf, smoothed idf) over event message words plus
+    the event ID and source, stored as one L2-normalized sparse CSR matrix.
+    A "find similar" query is a single sparse mat-vec product followed by a
+    top-k partial sort, so it stays fast on hundreds of thousands of events.
+    The matrix is rebuilt lazily after new events were added.
+    Needs numpy and scipy; `available()` is False without them.
+    """
+    SIMILAR_THRESHOLD = 0.8
+    _TOKEN_RE = re.compile(r"[a-z]{2,}")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.docs = []
+        self.vocab = {}
+        self._seen = set()
+        self._row_indices = []
+        self._row_counts = []
+        self._row_of = {}
+        self._doc_times = array.array('d')
+        self._matrix = None
+        self._times = None
+        self._idf = None
+        self._dirty = False
+
+    @staticmethod
+    def available():
+        """True if numpy/scipy are installed; imports them on first call (v43)."""
+        global np, sparse
+        if np is None:
+            np, sparse = _lazy_import('numpy'), _lazy_import('scipy.sparse')
+        return np is not None and sparse is not None
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _tokens(self, evt):
+        return self._TOKEN_RE.findall((evt.get('message') or '').lower()) + [f"id:{evt.get('event_id')}", f"src:{(evt.get('source') or '').lower()}"]
+
+    def add(self, events):
+        added = 0
+        with self._lock:
+            for evt in events:
+                key = (evt.get('host'), evt.get('log_type'), evt.get('record_number'))
+                if key[2] is not None:
+                    if key in self._seen:
+                        continue
+                    self._seen.add(key)
+                    self._row_of[key] = len(self.docs)
+                counts = Counter()
+                for token in self._tokens(evt):
+                    idx = self.vocab.get(token)
+                    if idx is None:
+                        idx = self.vocab[token] = len(self.vocab)
+                    counts[idx] += 1
+                self._row_indices.append(np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)))
+                self._row_counts.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+                self.docs.append(evt)
+                self._doc_times.append(_event_timestamp(evt))
+                added += 1
+            if added:
+                self._dirty = True
+        return added
+
+    def _rebuild(self):
+        n, v = len(self.docs), len(self.vocab)
+        lengths = np.fromiter((len(r) for r in self._row_indices), dtype=np.int64, count=n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.concatenate(self._row_indices) if n else np.zeros(0, dtype=np.int32)
+        data = 1.0 + np.log(np.concatenate(self._row_counts)) if n else np.zeros(0, dtype=np.float32)
+        df = np.bincount(indices, minlength=v)
+        self._idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+        data = (data * self._idf[indices]).astype(np.float32)
+        norms = np.sqrt(np.add.reduceat(data * data, indptr[:-1])) if len(data) else np.zeros(n, dtype=np.float32)
+        norms[lengths == 0] = 1.0
+        data /= np.repeat(norms, lengths)
+        self._matrix = sparse.csr_matrix((data, indices, indptr), shape=(n, v))
+        self._times = np.frombuffer(self._doc_times, dtype=np.float64).copy()
+        self._dirty = False
+
+    def _query_vector(self, evt):
+        counts = Counter(self.vocab[t] for t in self._tokens(evt) if t in self.vocab)
+        if not counts:
+            return None
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        data = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self._idf[indices]
+        data /= np.sqrt((data * data).sum())
+        return sparse.csr_matrix((data, indices, [0, len(indices)]), shape=(1, len(self.vocab)))
+
+    def similar(self, evt, k=5, threshold=None):
+        """
+        Returns the k most similar other events plus how often near-identical
+        events (cosine >= threshold) occurred: {'matches': [(score, event)], 'count', 'first_seen', 'last_seen'}.
+        """
+        threshold = self.SIMILAR_THRESHOLD if threshold is None else threshold
+        with self._lock:
+            if self._dirty or self._matrix is None:
+                self._rebuild()
+            if not self.docs:
+                return {'matches': [], 'count': 0, 'first_seen': None, 'last_seen': None}
+            row = self._row_of.get((evt.get('host'), evt.get('log_type'), evt.get('record_number')))
+            query = self._matrix[row] if row is not None else self._query_vector(evt)
+            if query is None:
+                return {'matches': [], 'count': 0, 'first_seen': None, 'last_seen': None}
+            scores = np.asarray((self._matrix @ query.T).todense()).ravel()
+            if row is not None:
+                scores[row] = -1.0
+            frequent = scores >= threshold
+            count = int(frequent.sum())
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k] if k else []
+            top = sorted(top, key=lambda i: scores[i], reverse=True)
+            return {
+                'matches': [(float(scores[i]), self.docs[i]) for i in top if scores[i] > 0],
+                'count': count,
+                'first_seen': datetime.datetime.fromtimestamp(self._times[frequent].min()) if count else None,
+                'last_seen': datetime.datetime.fromtimestamp(self._times[frequent].max()) if count else None,
+            }
+# ==============================================================================
+# ⬆️ END OF "SIMILAR EVENTS" (v32) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF PRECOMPUTED DIGESTS (v38) ⬇️
+# ==============================================================================
+#
+class EventDigest:
+    """
+    v38 Digests:
+    Hour buckets maintained incrementally as events and samples arrive: counts
+    by type / source / event ID, crashes, restarts, notable errors, peak
+    CPU/RAM and the biggest processes. `summarize(start, end)` merges the
+    buckets of a window without touching the logs, and `match_intent` maps
+    the common "what happened last night" style questions to such a window.
+    Counts are kept per whole hour; the listed events are cut to the exact window.
+    """
+    CRASH_IDS = frozenset({6008, 41, 1001, 1000, 1002})  # unexpected shutdown, Kernel-Power, BugCheck/WER, app crash, app hang
+    RESTART_IDS = frozenset({1074, 6005, 6006})  # restart requested, event log started / stopped
+    MAX_LISTED = 20
+
+    _WINDOW_RES = (
+        ('last_night', re.compile(r"last night|overnight|kal raat")),
+        ('this_morning', re.compile(r"this morning|aaj subah")),
+        ('yesterday', re.compile(r"\byesterday\b")),
+        ('today', re.compile(r"\btoday\b|\baaj\b")),
+    )
+    _KIND_RES = (
+        ('performance', re.compile(r"slow|lag|hang|freez|stuck")),
+        ('crashes', re.compile(r"crash|blue ?screen|bsod|unexpected shutdown|restart|reboot")),
+        ('overview', re.compile(r"what happened|anything (?:wrong|unusual|bad)|kya hua|summary|overview|\berrors?\b|issues?")),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hours = {}
+        self.watermarks = {}
+        self.covered_since = {}
+        self.narratives = {}
+
+    @staticmethod
+    def windows(now=None):
+        """The standard windows: name -> (start, end, label)."""
+        now = now or datetime.datetime.now()
+        today = datetime.datetime.combine(now.date(), datetime.time())
+        yesterday = today - datetime.timedelta(days=1)
+        return {
+            'last_night': (yesterday + datetime.timedelta(hours=20), min(today + datetime.timedelta(hours=6), now), "last night"),
+            'this_morning': (today + datetime.timedelta(hours=6), min(today + datetime.timedelta(hours=11), now), "this morning"),
+            'today': (today, now, "today"),
+            'yesterday': (yesterday, today, "yesterday"),
+        }
+
+    def _bucket(self, ts):
+        hour = int(ts // 3600 * 3600)
+        bucket = self.hours.get(hour)
+        if bucket is None:
+            bucket = self.hours[hour] = {'total': 0, 'by_type': Counter(), 'by_source': Counter(), 'by_id': Counter(),
+                                         'crashes': [], 'restarts': [], 'notable': [], 'cpu_max': None, 'ram_max': None,
+                                         'processes': Counter()}
+        return bucket
+
+    def add_events(self, events, log_type=None, covered_since=None, advance=True):
+        """
+        Counts events into their hour buckets; records already seen (per log
+        RecordNumber) are skipped. With `advance=False` the watermarks stay put,
+        for a caller that feeds one gap in several newest-first chunks and then
+        calls `advance_watermark`.
+        """
+        added = 0
+        with self._lock:
+            if log_type and covered_since is not None:
+                self.covered_since[log_type] = min(self.covered_since.get(log_type, covered_since), covered_since)
+            for evt in events:
+                log = evt.get('log_type')
+                record = evt.get('record_number')
+                if record is not None and record <= self.watermarks.get(log, -1):
+                    continue
+                bucket = self._bucket(_event_timestamp(evt))
+                bucket['total'] += 1
+                bucket['by_type'][evt.get('event_type')] += 1
+                bucket['by_source'][evt.get('source')] += 1
+                bucket['by_id'][evt.get('event_id')] += 1
+                event_id = evt.get('event_id')
+                if event_id in self.CRASH_IDS and (event_id not in (1000, 1002) or log == 'Application'):
+                    if len(bucket['crashes']) < self.MAX_LISTED:
+                        bucket['crashes'].append(evt)
+                elif event_id in self.RESTART_IDS and log in (None, 'System'):
+                    if len(bucket['restarts']) < self.MAX_LISTED:
+                        bucket['restarts'].append(evt)
+                elif evt.get('event_type') == 'Error' and len(bucket['notable']) < self.MAX_LISTED:
+                    bucket['notable'].append(evt)
+                added += 1
+            if advance:
+                for evt in events:
+                    if evt.get('record_number') is not None:
+                        log = evt.get('log_type')
+                        self.watermarks[log] = max(self.watermarks.get(log, -1), evt['record_number'])
+        return added
+
+    def advance_watermark(self, log_type, record_number):
+        with self._lock:
+            self.watermarks[log_type] = max(self.watermarks.get(log_type, -1), record_number)
+
+    def add_sample(self, sample, processes=None, ts=None):
+        """Peak CPU/RAM per hour, and (optionally) the biggest processes as {name: MB}."""
+        with self._lock:
+            bucket = self._bucket(ts if ts is not None else time.time())
+            for key, field in (('cpu', 'cpu_max'), ('ram', 'ram_max')):
+                if sample.get(key) is not None:
+                    bucket[field] = max(bucket[field] or 0.0, sample[key])
+            for name, mb in (processes or {}).items():
+                bucket['processes'][name] = max(bucket['processes'][name], mb)
+
+    def covers(self, start, log_types=('System', 'Application')):
+        return all(log_type in self.covered_since and self.covered_since[log_type] <= start.timestamp() for log_type in log_types)
+
+    def summarize(self, start, end):
+        lo, hi = start.timestamp(), end.timestamp()
+        summary = {'start': start, 'end': end, 'total': 0, 'by_type': Counter(), 'by_source': Counter(), 'by_id': Counter(),
+                   'crashes': [], 'restarts': [], 'notable': [], 'cpu_max': None, 'ram_max': None, 'processes': Counter()}
+        with self._lock:
+            for hour in sorted(self.hours):
+                if hour + 3600 <= lo or hour >= hi:
+                    continue
+                bucket = self.hours[hour]
+                for key in ('by_type', 'by_source', 'by_id'):
+                    summary[key].update(bucket[key])
+                summary['total'] += bucket['total']
+                for key in ('crashes', 'restarts', 'notable'):
+                    summary[key].extend(evt for evt in bucket[key] if lo <= _event_timestamp(evt) <= hi)
+                for key in ('cpu_max', 'ram_max'):
+                    if bucket[key] is not None:
+                        summary[key] = max(summary[key] or 0.0, bucket[key])
+                for name, mb in bucket['processes'].items():
+                    summary['processes'][name] = max(summary['processes'][name], mb)
+        for key in ('crashes', 'restarts', 'notable'):
+            summary[key].sort(key=_event_timestamp, reverse=True)
+        return summary
+
+    @classmethod
+    def match_intent(cls, question):
+        """(window, kind) for a common digest question, or None if the question needs the full planner."""
+        q = question.lower()
+        if len(q) > 80 or re.search(r"\d|\.exe|host|machine|server|fleet", q):
+            return None
+        window = next((name for name, rx in cls._WINDOW_RES if rx.search(q)), None)
+        kind = next((name for name, rx in cls._KIND_RES if rx.search(q)), None)
+        if window and kind:
+            return window, kind
+        return None
+
+    @staticmethod
+    def _event_line(evt):
+        return f"- {evt.get('time_generated')} | {evt.get('source')} (ID {evt.get('event_id')}) | {(evt.get('message') or '')[:140].strip()}"
+
+    def render(self, summary, label, kind='overview'):
+        """The digest as markdown (no LLM involved)."""
+        errors, warnings = summary['by_type'].get('Error', 0), summary['by_type'].get('Warning', 0)
+        lines = [f"**Digest for {label}** ({summary['start']:%b %d %I:%M %p} – {summary['end']:%b %d %I:%M %p}): "
+                 f"{summary['total']:,} events, {errors:,} errors, {warnings:,} warnings."]
+        perf = []
+        if summary['cpu_max'] is not None:
+            perf.append(f"peak CPU {summary['cpu_max']:.0f}%, peak RAM {summary['ram_max'] or 0:.0f}%")
+        if summary['processes']:
+            perf.append("biggest processes: " + ", ".join(f"{name} ({mb:,.0f} MB)" for name, mb in summary['processes'].most_common(5)))
+        hangs = [evt for evt in summary['crashes'] if evt.get('event_id') == 1002]
+        sections = [
+            ("💥 Crashes / unexpected shutdowns", [self._event_line(evt) for evt in summary['crashes'][:8]] or ["- None"]),
+            ("🔁 Restarts / shutdowns", [self._event_line(evt) for evt in summary['restarts'][:8]] or ["- None"]),
+            ("❌ Notable errors", [self._event_line(evt) for evt in summary['notable'][:5]] or ["- None"]),
+            ("📊 Top sources", ["- " + ", ".join(f"{src} ({n})" for src, n in summary['by_source'].most_common(5))] if summary['total'] else ["- None"]),
+            ("📈 Performance", ["- " + "; ".join(perf)] if perf else ["- No metric samples recorded for this window."]),
+        ]
+        if kind == 'performance':
+            sections = [sections[4], ("🧊 Application hangs", [self._event_line(evt) for evt in hangs[:8]] or ["- None"]), sections[2], sections[0]]
+        elif kind == 'crashes':
+            sections = sections[:2] + [sections[2]]
+        for title, body in sections:
+            lines.append(f"\n**{title}**")
+            lines.extend(body)
+        return "\n".join(lines)
+
+    def narrative_events(self, summary):
+        return (summary['crashes'] + summary['restarts'] + summary['notable'])[:50]
+# ==============================================================================
+# ⬆️ END OF PRECOMPUTED DIGESTS (v38) ⬆️
+# ==============================================================================
+
+
+#
+# ==============================================================================
+# ⬇️ START OF FACETS (v39) ⬇️
+# ==============================================================================
+#
+def _hour_bucket(evt):
+    return int(_event_timestamp(evt) // 3600 * 3600)
+
+
+class EventFacets:
+    """
+    v39 Facets:
+    Per-value counts and row bitmaps for the loaded events, kept up to date as
+    events are added (load, live tail) or dropped (tail trimming). A bitmap is
+    a Python int with one bit per row, so a drill-down is a handful of big-int
+    ANDs/ORs (values of one facet are OR-ed, facets are AND-ed) and never
+    touches the events themselves. Rows are numbered oldest first; `select`
+    returns newest first, which is the order the Events tab shows.
+    """
+    FACETS = {
+        'type': operator.itemgetter('event_type'),
+        'source': operator.itemgetter('source'),
+        'id': operator.itemgetter('event_id'),
+        'hour': _hour_bucket,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, events=()):
+        """Replaces the indexed set; `events` are in display order (newest first)."""
+        with self._lock:
+            self._rows = []
+            self._row_of = {}
+            self._alive = 0
+            self.counts = {facet: Counter() for facet in self.FACETS}
+            self._bitmaps = {facet: {} for facet in self.FACETS}
+        self.add(events)
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def add(self, events):
+        """Indexes newly arrived events (display order, newest first); they get the highest rows."""
+        if not events:
+            return
+        with self._lock:
+            base = len(self._rows)
+            batch = list(reversed(events))
+            self._rows.extend(batch)
+            self._row_of.update((id(evt), base + offset) for offset, evt in enumerate(batch))
+            width = (len(batch) + 7) // 8
+            for facet, key in self.FACETS.items():
+                values = {}
+                for offset, value in enumerate(map(key, batch)):
+                    rows = values.get(value)
+                    if rows is None:
+                        values[value] = [offset]
+                    else:
+                        rows.append(offset)
+                counts, bitmaps = self.counts[facet], self._bitmaps[facet]
+                for value, offsets in values.items():
+                    mask = bytearray(width)
+                    for offset in offsets:
+                        mask[offset >> 3] |= 1 << (offset & 7)
+                    bitmaps[value] = bitmaps.get(value, 0) | (int.from_bytes(mask, 'little') << base)
+                    counts[value] += len(offsets)
+            self._alive |= ((1 << len(batch)) - 1) << base
+
+    def discard(self, events):
+        """Drops events that left the loaded set (e.g. trimmed off the end of a live tail)."""
+        with self._lock:
+            for evt in events:
+                row = self._row_of.pop(id(evt), None)
+                if row is None:
+                    continue
+                bit = 1 << row
+                self._alive &= ~bit
+                self._rows[row] = None
+                for facet, key in self.FACETS.items():
+                    value = key(evt)
+                    self._bitmaps[facet][value] &= ~bit
+                    self.counts[facet][value] -= 1
+                    if not self.counts[facet][value]:
+                        del self.counts[facet][value], self._bitmaps[facet][value]
+            compact = len(self._rows) > 2 * len(self._row_of) + 1024
+        if compact:
+            self.reset(self.select())  # renumber once most rows are dead so the bitmaps stay small
+
+    def _mask(self, selection, skip=None):
+        mask = self._alive
+        for facet, values in (selection or {}).items():
+            if facet == skip or not values:
+                continue
+            bitmaps = self._bitmaps[facet]
+            facet_mask = 0
+            for value in values:
+                facet_mask |= bitmaps.get(value, 0)
+            mask &= facet_mask
+        return mask
+
+    def select(self, selection=None, limit=None):
+        """Events matching `{facet: [values]}` (newest first), straight from the bitmaps."""
+        with self._lock:
+            mask = self._mask(selection)
+            rows = self._rows
+            bits = bin(mask)
+            top = len(bits) - 1
+            out = []
+            pos = bits.find('1', 2)
+            while pos != -1 and (limit is None or len(out) < limit):
+                out.append(rows[top - pos])
+                pos = bits.find('1', pos + 1)
+            return out
+
+    def facet_counts(self, selection=None, top=8):
+        """
+        Drill-down counts: for each facet, its `top` values counted within the
+        rows selected by the *other* facets (so chips of one facet stay OR-able).
+        """
+        with self._lock:
+            result = {}
+            for facet, bitmaps in self._bitmaps.items():
+                mask = self._mask(selection, skip=facet)
+                if mask == self._alive:
+                    counts = self.counts[facet]
+                else:
+                    counts = Counter({value: (bitmap & mask).bit_count() for value, bitmap in bitmaps.items()})
+                result[facet] = [(value, n) for value, n in counts.most_common(top) if n]
+            return result
+
+    @staticmethod
+    def label(facet, value):
+        if facet == 'hour':
+            return datetime.datetime.fromtimestamp(value).strftime('%m/%d %H:00')
+        if facet == 'id':
+            return f"ID {value}"
+        return str(value)
+# ==============================================================================
+# ⬆️ END OF FACETS (v39) ⬆️
+# ==============================================================================
+
+
+
+def parse_time_input(time_str):
+    if not time_str or not time_str.strip():
+        return None
+    time_str = time_str.strip().lower().replace(' ', '')
+    is_pm = 'pm' in time_str
+    is_am = 'am' in time_str
+    time_str = time_str.replace('am', '').replace('pm', '')
+    try:
+        if ':' in time_str:
+            parts = time_str.split(':')
+            hour = int(parts[0])
+            minute = int(parts[1]) if len(parts) > 1 else 0
+        else:
+            if len(time_str) >= 3:
+                hour = int(time_str[:-2])
+                minute = int(time_str[-2:])
+            else:
+                hour = int(time_str)
+                minute = 0
+        if is_pm and hour != 12:
+            hour += 12
+        elif is_am and hour == 12:
+            hour = 0
+        if 0 <= hour <= 23 and 0 <= minute <= 59:
+            return (hour, minute)
+        return None
+    except:
+        return None
+
+
+#
+# ==============================================================================
+# ⬇️ START OF HEADLESS ENGINE (v28) ⬇️
+# ==============================================================================
+#
+def _plan_date(value):
+    """A planner date: YYYY-MM-DD, or the prompt's TODAY / YESTERDAY tokens (v36) if the model copied one back."""
+    token = value.strip().upper()
+    if token == 'TODAY':
+        return datetime.date.today()
+    if token == 'YESTERDAY':
+        return datetime.date.today() - datetime.timedelta(days=1)
+    return datetime.datetime.strptime(value.strip(), '%Y-%m-%d').date()
+
+
+def _parse_plan_datetimes(params):
+    """
+    v21 DATETIME FIX, shared by every plan that searches logs.
+    Turns the planner's start/end date+time strings into datetimes (or None).
+    """
+    start_datetime, end_datetime = None, None
+    if params.get('start_date'):
+        start_date = _plan_date(params['start_date'])
+        start_time = datetime.datetime.strptime(params.get('start_time', '00:00'), '%H:%M').time()
+        start_datetime = datetime.datetime.combine(start_date, start_time)
+
+    if params.get('end_date'):
+        end_date = _plan_date(params['end_date'])
+        end_time = datetime.datetime.strptime(params.get('end_time', '23:59'), '%H:%M').time()
+        end_datetime = datetime.datetime.combine(end_date, end_time)
+    return start_datetime, end_datetime
+
+
+class MonitorEngine:
+    """
+    v28 Headless Engine:
+    Owns the event reader, the AI explainer/assistant, the plan executor, the
+    metrics collector and the session state (`current_events`, `chat_history`).
+    The Flet GUI is one client of this class; `run_headless` exposes the same
+    engine over a local HTTP/JSON API.
+    """
+    def __init__(self, api_key, hosts=None, host_token=None, archive_path=None, rules_path=None, process_history_path=None):
+        self.api_key = api_key
+        self.event_reader = EventLogReader()
+        self.fleet = FleetQuery([make_host_source(h, host_token) for h in hosts]) if hosts else None
+        self.archive = EventArchive(archive_path) if archive_path else None
+        self.search_index = EventSearchIndex()
+        self._index_warming = set()
+        self.similarity_index = EventSimilarityIndex()
+        self._similarity_synced = 0
+        self._tails = []
+        self.rules = RuleEngine(on_alert=self._on_alert)
+        self.rules_path = rules_path
+        self.on_alert = None
+        self._watch_tails = []
+        self.digest = EventDigest()
+        self.processes = ProcessTracker(process_history_path)
+        self._digest_job = None
+        self._last_chat = 0.0
+        if rules_path and os.path.exists(rules_path):
+            try:
+                self.rules.load(rules_path)
+            except Exception as e:
+                print(f"⚠️ Could not load watch rules from {rules_path}: {e}")
+        self.ai_explainer = AIExplainer(api_key)
+        self.explanations = ExplanationScheduler(self.explain)
+        self.ai_assistant = AIAssistant(api_key)
+        self.current_events = []
+        self.facets = EventFacets()
+        self.chat_history = []
+        self.metrics = deque(maxlen=3600)
+        self._lock = threading.Lock()
+        self._collector = None
+        self._queries = {}
+        self._load_flights = SingleFlight('load')
+        self.last_query = {'log_type': 'System', 'max_records': 500}
+
+    def check_api_key(self):
+        if not self.api_key or self.api_key == "YOUR_API_KEY_HERE":
+            raise Exception("OpenAI API key is not set.")
+
+    def _set_current_events(self, events):
+        with self._lock:
+            self.current_events.clear()
+            self.current_events.extend(events)
+            self.facets.reset(self.current_events)
+
+    # --- Queries (v46) ---
+    def begin(self, kind):
+        """
+        New cancel token for a `kind` of query ('load', 'chat'); the previous
+        query of that kind is cancelled, so the newer one supersedes it.
+        """
+        token = CancelToken()
+        with self._lock:
+            previous = self._queries.get(kind)
+            self._queries[kind] = token
+        if previous is not None:
+            previous.cancel()
+        return token
+
+    def cancel(self, kind):
+        with self._lock:
+            token = self._queries.pop(kind, None)
+        if token is not None:
+            token.cancel()
+        if kind == 'load':
+            self.explanations.cancel()
+
+    # --- Event log ---
+    def load_events(self, log_type='System', max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None):
+        """
+        Reads one log (or several, if `log_type` is a list / "All Logs") and makes the result current.
+        Identical concurrent loads share one scan (v46); a cancelled caller raises QueryCancelled.
+        """
+        if log_type == "All Logs":
+            log_type = ["System", "Application", "Security"]
+        read = self.event_reader.read_events_multi if isinstance(log_type, list) else self.event_reader.read_events
+        key = (tuple(log_type) if isinstance(log_type, list) else log_type, max_records, start_datetime, end_datetime, hide_common,
+               tuple(keywords or ()), tuple(event_type_filter or ()))
+        events = self._load_flights.do(key, lambda: read(log_type, max_records, start_datetime, end_datetime, hide_common, keywords, event_type_filter))
+        check_cancelled()
+        self._set_current_events(events)
+        self.last_query = dict(log_type=log_type, max_records=max_records, start_datetime=start_datetime, end_datetime=end_datetime,
+                               hide_common=hide_common, keywords=keywords, event_type_filter=event_type_filter)
+        return events
+
+    def iter_events(self, log_type='System', max_records=500, start_datetime=None, end_datetime=None, hide_common=False, keywords=None, event_type_filter=None):
+        """Streaming version of `load_events` (v47): yields events without making them current."""
+        if log_type == "All Logs":
+            log_type = ["System", "Application", "Security"]
+        if isinstance(log_type, list):
+            return self.event_reader.iter_events_multi(log_type, max_records, start_datetime, end_datetime, hide_common, keywords, event_type_filter)
+        # A reader of its own, so `last_scan_stats` of the loaded query stays intact
+        return EventLogReader(self.event_reader.out_of_order_tolerance).iter_events(
+            log_type, max_records, start_datetime, end_datetime, hide_common, keywords, event_type_filter)
+
+    def export_events(self, path, fmt=None, compression=None, explanations=True, on_progress=None, **query):
+        """
+        v47: streams the last loaded query (or `query` overrides, e.g. a larger
+        `max_records`) to `path` straight from the log reader, with every
+        explanation that is known without an LLM call.
+        """
+        inferred_fmt, inferred_compression = EventExporter.infer(path)
+        exporter = EventExporter(fmt or inferred_fmt, self.ai_explainer.cached_explanation if explanations else None, on_progress)
+        with TELEMETRY.query(f"Export {os.path.basename(path)}"):
+            return exporter.export(self.iter_events(**dict(self.last_query, **query)), path, compression or inferred_compression)
+
+    def start_tail(self, log_type='System', on_events=None, hide_common=False, keywords=None, event_type_filter=None, max_events=None):
+        """
+        Live tail (v33): new records of the log(s) are pushed to `on_events(events)`
+        as they are written and put on top of `current_events` (capped at `max_events`).
+        Replaces any tail that is already running.
+        """
+        self.stop_tail()
+        if log_type == "All Logs":
+            log_type = ["System", "Application", "Security"]
+        log_types = log_type if isinstance(log_type, list) else [log_type]
+
+        def deliver(events):
+            with self._lock:
+                self.current_events[:0] = events
+                self.facets.add(events)
+                if max_events:
+                    self.facets.discard(self.current_events[max_events:])
+                    del self.current_events[max_events:]
+            if on_events:
+                on_events(events)
+
+        tails = [EventTail(lt, deliver, hide_common, keywords, event_type_filter) for lt in log_types]
+        for tail in tails:
+            tail.start()
+        self._tails = tails
+        return tails
+
+    def stop_tail(self):
+        for tail in self._tails:
+            tail.stop()
+        self._tails = []
+
+    def load_fleet_events(self, max_records=500, on_result=None, **filters):
+        """Same as `load_events`, but across every configured host (events carry a 'host' field)."""
+        if not self.fleet:
+            raise Exception("No hosts configured. Set EVENT_MONITOR_HOSTS to a comma-separated list of hosts or engine URLs.")
+        events = self.fleet.read_events(max_records=max_records, on_result=on_result, **filters)
+        self._set_current_events(events)
+        return events
+
+    def sync_archive(self, log_types=('System', 'Application')):
+        """Copies everything new in the live logs into the archive (no-op without an archive)."""
+        if not self.archive:
+            return 0
+        with TELEMETRY.span('archive_sync'):
+            written = 0
+            for log_type in log_types:
+                try:
+                    written += self.archive.sync_from_log(self.event_reader, log_type)
+                except Exception as e:
+                    print(f"⚠️ Could not archive {log_type} log: {e}")
+            return written
+
+    def start_archiver(self, interval=900, log_types=('System', 'Application')):
+        def archive_loop():
+            while True:
+                self.sync_archive(log_types)
+                time.sleep(interval)
+        threading.Thread(target=archive_loop, daemon=True).start()
+
+    # --- Search index ---
+    def refresh_search_index(self, log_types=('System', 'Application')):
+        """Indexes everything newer than what the index has already seen for each log."""
+        with TELEMETRY.span('index_refresh'):
+            added = 0
+            for log_type in log_types:
+                newest = self.search_index.newest.get(log_type)
+                start = datetime.datetime.fromtimestamp(newest) if newest else None
+                # A private reader, so this never clobbers the scan stats of a user query.
+                reader = EventLogReader(self.event_reader.out_of_order_tolerance)
+                added += self.search_index.add(reader.read_events(log_type, 10**9, start_datetime=start), log_type)
+            return added
+
+    def warm_search_index(self, log_types=('System', 'Application'), block=False):
+        """Builds the index for logs it does not cover yet, in the background (or inline with `block`)."""
+        missing = [lt for lt in log_types if lt not in self.search_index.newest and lt not in self._index_warming]
+        if not missing:
+            return
+        self._index_warming.update(missing)
+
+        def warm():
+            try:
+                self.refresh_search_index(missing)
+            except Exception as e:
+                print(f"⚠️ Could not build search index: {e}")
+            finally:
+                self._index_warming.difference_update(missing)
+        if block:
+            warm()
+        else:
+            threading.Thread(target=warm, daemon=True).start()
+
+    def warm_up(self, log_types=('System', 'Application')):
+        """
+        v43: background warm-up once the UI / API is up - process tree and I/O
+        baselines, the LLM client, numpy/scipy and the search index - so the
+        first question does not pay for them. Each step is a startup phase.
+        """
+        def run():
+            steps = [('warm: process tree', lambda: (PROCESS_TREE.refresh(), IO_METER.prime())),
+                     ('warm: similar-events libraries', EventSimilarityIndex.available),
+                     ('warm: search index', lambda: self.warm_search_index(log_types, block=True))]
+            if self.api_key and self.api_key != "YOUR_API_KEY_HERE":
+                steps.insert(1, ('warm: LLM client', lambda: _openai_client(self.api_key)))
+            for name, step in steps:
+                try:
+                    with STARTUP.phase(name, background=True):
+                        step()
+                except Exception as e:
+                    print(f"⚠️ Warm-up step '{name}' failed: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def search_events(self, query, k=50, **filters):
+        return [evt for _, evt in self.search_index.search(query, k=k, **filters)]
+
+    def similar_events(self, event, k=5):
+        """
+        Past events that look like `event` (TF-IDF cosine) over everything the
+        search index and the current view hold, plus how often near-identical
+        ones occurred. Kicks off indexing of the event's log if needed.
+        """
+        if not EventSimilarityIndex.available():
+            raise Exception("Similar events need numpy and scipy (pip install numpy scipy).")
+        with TELEMETRY.span('similar'):
+            if event.get('log_type') and not event.get('host'):
+                self.warm_search_index([event['log_type']])
+            docs = self.search_index.docs
+            synced = len(docs)
+            self.similarity_index.add(docs[self._similarity_synced:synced])
+            self._similarity_synced = synced
+            with self._lock:
+                current = list(self.current_events)
+            self.similarity_index.add(current)
+            return self.similarity_index.similar(event, k=k)
+
+    def explain(self, event):
+        return self.ai_explainer.explain_event(event['event_id'], event['event_type'], event['source'], event['message'])
+
+    def stats(self):
+        """Totals by type, read off the incrementally maintained facets (v39)."""
+        with self._lock:
+            counts = dict(self.facets.counts['type'])
+            total = len(self.facets)
+        return {'total': total, 'errors': counts.get('Error', 0), 'warnings': counts.get('Warning', 0),
+                'information': counts.get('Information', 0), 'by_type': counts}
+
+    def filter_events(self, selection=None, limit=None):
+        """The loaded events matching `{facet: [values]}` (facets: type, source, id, hour), newest first."""
+        return self.facets.select(selection, limit)
+
+    def facet_counts(self, selection=None, top=8):
+        return self.facets.facet_counts(selection, top)
+
+    # --- Metrics collector ---
+    def sample_metrics(self, cpu_interval=1):
+        """One cheap sampling pass (the same numbers the Monitor tab shows)."""
+        cpu = psutil.cpu_percent(interval=cpu_interval)
+        with TELEMETRY.span('psutil.monitor'):
+            sample = {
+                'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                'cpu': cpu,
+                'ram': psutil.virtual_memory().percent,
+                'disk': psutil.disk_usage('/').percent,
+            }
+            rates = IO_METER.sample()  # v42: disk / network / per-process I/O activity since the last sample
+            if rates:
+                sample.update(rates)
+        self.metrics.append(sample)
+        self.rules.process_sample(sample)
+        self.digest.add_sample(sample)
+        return sample
+
+    # --- Digests (v38) ---
+    def refresh_digest(self, log_types=('System', 'Application'), backfill_hours=48, backfill_records=20000):
+        """
+        Folds the records written since the last refresh into the digest; the
+        first call backfills `backfill_hours` of history (at most
+        `backfill_records`; the digest then only claims to cover what it read).
+        Later calls read the whole gap since the watermark, `backfill_records`
+        at a time, and move the watermark once the gap is counted.
+        """
+        added = 0
+        with TELEMETRY.span('digest.refresh'):
+            for log_type in log_types:
+                try:
+                    watermark = self.digest.watermarks.get(log_type)
+                    if watermark is None:
+                        since = datetime.datetime.now() - datetime.timedelta(hours=backfill_hours)
+                        events = self.event_reader.read_events(log_type, backfill_records, start_datetime=since)
+                        covered = since.timestamp() if len(events) < backfill_records else min(map(_event_timestamp, events))
+                        if len(events) >= backfill_records:
+                            print(f"ℹ️ Digest backfill for {log_type} capped at {backfill_records} records (covers since {datetime.datetime.fromtimestamp(covered)})")
+                        added += self.digest.add_events(events, log_type, covered_since=covered)
+                        if not events:
+                            newest = self.event_reader.read_events(log_type, 1)
+                            self.digest.advance_watermark(log_type, newest[0]['record_number'] if newest else -1)
+                    else:
+                        # Newest first: moving the watermark after the first chunk would make
+                        # the older chunks look already seen, so it moves once at the end.
+                        chunk, newest = [], watermark
+                        for evt in self.event_reader.iter_events(log_type, 10**9, after_record=watermark):
+                            chunk.append(evt)
+                            newest = max(newest, evt['record_number'])
+                            if len(chunk) >= backfill_records:
+                                added += self.digest.add_events(chunk, advance=False)
+                                chunk = []
+                        added += self.digest.add_events(chunk, advance=False)
+                        self.digest.advance_watermark(log_type, newest)
+                except Exception as e:
+                    print(f"⚠️ Digest refresh failed for {log_type}: {e}")
+            try:
+                top = Counter()
+                for proc in psutil.process_iter(['name', 'memory_info']):
+                    if proc.info['memory_info'] is not None:
+                        top[proc.info['name']] += proc.info['memory_info'].rss / (1024 * 1024)
+                self.digest.add_sample({}, processes=dict(top.most_common(5)))
+            except Exception as e:
+                print(f"⚠️ Digest process snapshot failed: {e}")
+        TELEMETRY.incr('digest_events', added)
+        return added
+
+    def digest_summary(self, window=None, start=None, end=None):
+        """(summary, label) for a named window ('last_night', 'today', ...) or an explicit range."""
+        if window:
+            start, end, label = EventDigest.windows()[window]
+        else:
+            end = end or datetime.datetime.now()
+            label = f"{start:%b %d %I:%M %p} – {end:%b %d %I:%M %p}"
+        return self.digest.summarize(start, end), label
+
+    def _digest_narrative(self, window, summary, label):
+        fingerprint = (summary['total'], len(summary['crashes']), len(summary['restarts']), len(summary['notable']))
+        cached = self.digest.narratives.get(window)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        if not self.api_key or self.api_key == "YOUR_API_KEY_HERE":
+            return None
+        text = self.ai_assistant.analyze_results(f"Give a short summary of what happened on this PC {label}, most important first.",
+                                                 self.digest.narrative_events(summary))
+        self.digest.narratives[window] = (fingerprint, text)
+        return text
+
+    def answer_from_digest(self, question):
+        """Answers a common question ("what happened last night?") from the digest, or returns None."""
+        intent = EventDigest.match_intent(question)
+        if not intent:
+            return None
+        window, kind = intent
+        start, end, label = EventDigest.windows()[window]
+        if end <= start or not self.digest.covers(start):
+            return None
+        with TELEMETRY.span('digest.answer'):
+            summary = self.digest.summarize(start, end)
+            text = self.digest.render(summary, label, kind)
+            cached = self.digest.narratives.get(window)
+            fingerprint = (summary['total'], len(summary['crashes']), len(summary['restarts']), len(summary['notable']))
+            if kind == 'overview' and cached and cached[0] == fingerprint:
+                text = f"{cached[1]}\n\n---\n{text}"
+        TELEMETRY.incr('digest_answers')
+        return {'action': 'digest', 'window': window, 'kind': kind}, text
+
+    # --- Process lifecycle (v40) ---
+    def start_process_tracker(self, interval=ProcessTracker.INTERVAL):
+        """Starts following process starts/exits (every `interval` seconds; 0 disables it)."""
+        if interval:
+            self.processes.interval = interval
+            self.processes.start()
+
+    def start_digest(self, interval=300, log_types=('System', 'Application'), idle_seconds=60):
+        """
+        Background digest job: refreshes the digest every `interval` seconds and,
+        while nobody is chatting, pre-writes the LLM narratives for the standard
+        windows so the common questions answer without waiting on the model.
+        """
+        if self._digest_job is not None or not interval:
+            return
+
+        def run():
+            while True:
+                self.refresh_digest(log_types)
+                if time.time() - self._last_chat > idle_seconds:
+                    for window in ('last_night', 'this_morning', 'today'):
+                        start, end, label = EventDigest.windows()[window]
+                        if end <= start:
+                            continue
+                        try:
+                            self._digest_narrative(window, self.digest.summarize(start, end), label)
+                        except Exception as e:
+                            print(f"⚠️ Digest narrative failed for {window}: {e}")
+                time.sleep(interval)
+
+        self._digest_job = threading.Thread(target=run, daemon=True)
+        self._digest_job.start()
+
+    # --- Watch rules (v37) ---
+    def add_rule(self, rule):
+        """Adds a WatchRule (or its text form) and starts following the logs it needs."""
+        rule = self.rules.add(WatchRule.parse(rule) if isinstance(rule, str) else rule)
+        self._save_rules()
+        self.start_watch()
+        return rule
+
+    def remove_rule(self, rule_id):
+        removed = self.rules.remove(rule_id)
+        self._save_rules()
+        self.start_watch()
+        return removed
+
+    def _save_rules(self):
+        if self.rules_path:
+            self.rules.save(self.rules_path)
+
+    def _on_alert(self, alert):
+        if self.on_alert:
+            self.on_alert(alert)
+
+    def start_watch(self):
+        """(Re)starts the live tails that feed the event rules - only for the logs the rules need."""
+        wanted = self.rules.log_types()
+        if sorted(tail.log_type for tail in self._watch_tails if tail.running) == wanted:
+            return
+        for tail in self._watch_tails:
+            tail.stop()
+        self._watch_tails = []
+        for log_type in wanted:
+            try:
+                self._watch_tails.append(EventTail(log_type, self.rules.process_events).start())
+            except Exception as e:
+                print(f"⚠️ Cannot watch {log_type}: {e}")
+
+    def start_collector(self, interval=5):
+        """Background metrics collection for headless mode (one sample every `interval` seconds)."""
+        if self._collector is not None:
+            return
+
+        def collect():
+            while True:
+                try:
+                    self.sample_metrics(cpu_interval=1)
+                except Exception as e:
+                    print(f"Error sampling metrics: {e}")
+                time.sleep(max(interval - 1, 0))
+
+        self._collector = threading.Thread(target=collect, daemon=True)
+        self._collector.start()
+
+    # --- Chat / plan execution ---
+    def plan(self, history):
+        self.check_api_key()
+        with TELEMETRY.span('plan'):
+            return self.ai_assistant.get_ai_plan(history)
+
+    def execute_plan(self, plan, status=None, on_events=None, question=None):
+        """
+        Runs a planner decision and returns the markdown answer.
+        `status(text)` is called with progress messages; `on_events(events)` is
+        called whenever the plan replaces `current_events`. `question` (the
+        user's message) is used to rank events when the search index is warm.
+        """
+        status = status or (lambda text: None)
+        on_events = on_events or (lambda events: None)
+        action = plan.get("action")
+
+        if action == "chat":
+            # --- ACTION: CHAT ---
+            status("💬 Generating response...")
+            return plan.get("response", "I'm not sure how to respond to that.")
+
+        if action == "get_boot_time":
+            # --- ACTION: GET BOOT TIME ---
+            status("⏱️ Checking system boot time...")
+            return get_system_boot_time()
+
+        if action == "get_process_stats":
+            # --- ACTION: GET SPECIFIC PROCESS STATS (v23) ---
+            process_name = plan.get("params", {}).get("process_name")
+            if not process_name:
+                return "⚠️ AI Error: The AI plan wanted to check a process, but didn't specify which one. Please try rephrasing your query."
+            status(f"🔎 Checking stats for processes matching '{process_name}'...")
+            return get_specific_process_stats(process_name)
+
+        if action == "process_history":
+            # --- ACTION: PROCESS START/EXIT HISTORY (v40) ---
+            process_name = plan.get("params", {}).get("process_name")
+            if not process_name:
+                return "⚠️ AI Error: The AI plan wanted a process history, but didn't specify which process. Please try rephrasing your query."
+            if self.processes.tracking_since is None:
+                # Tracker not running: fall back to process-creation auditing in the Security log.
+                return self.execute_plan({"action": "search_logs", "params": {
+                    "log_type": "Security", "search_keywords": ["4688", "4689", process_name], "find_most_recent": True,
+                    "analysis_request": f"User is checking for the last Process Start (4688) or Stop (4689) event for '{process_name}'. Note: This requires process auditing to be enabled."}},
+                    status=status, on_events=on_events, question=question)
+            status(f"🕒 Looking up start/exit history for '{process_name}'...")
+            return self.processes.describe(process_name)
+
+        if action == "check_major_apps":
+            # --- ACTION: GET MAJOR APPS OVERVIEW (v25) ---
+            status("📊 Scanning for major applications...")
+            return get_major_apps_overview()
+
+        if action == "port_analysis":
+            # --- ACTION: PORT ANALYSIS (v26) ---
+            params = plan.get("params", {})
+            port = params.get("port")
+            process = params.get("process_name")
+            status("🌐 Analyzing network ports...")
+
+            if port:
+                data = find_processes_on_port(port)
+                if not data:
+                    return f"No application is using port **{port}**."
+                return f"""
+                **Port {port} Analysis**
+                ✅ Process: **{data['process_name']}**
+                ✅ PID: **{data['pid']}**
+                ✅ Status: **{data['status']}**
+                """
+            if process:
+                data = find_ports_for_process(process)
+                if not data:
+                    return f"Process **{process}** is not using any ports."
+                response_text = f"**{process} Port Usage:**\n"
+                for p, info in data.items():
+                    response_text += f"- Port **{p}** → PID {info['pid']} ({info['status']})\n"
+                return response_text
+            full_map = get_port_process_mapping()
+            lines = []
+            for p, info in full_map.items():
+                lines.append(f"- Port **{p}** → {info['process_name']} (PID {info['pid']}, {info['status']})")
+            return "**All Active Ports:**\n" + "\n".join(lines)
+
+        if action == "search_logs":
+            # --- ACTION: SEARCH LOGS (Past-tense) ---
+            params = plan.get("params", {})
+            log_type = params.get('log_type', 'System')
+            log_label = ', '.join(log_type) if isinstance(log_type, list) else log_type
+            status(f"🔍 Searching {log_label} logs...")
+
+            analysis_request = params.get('analysis_request', "Analyze the user's query.")
+            is_last_event_query = params.get("find_most_recent", False)
+            max_records_to_fetch = 5 if is_last_event_query else 500
+
+            try:
+                start_datetime, end_datetime = _parse_plan_datetimes(params)
+            except Exception as e:
+                print(f"Error parsing AI-generated dates: {e}")
+                start_datetime, end_datetime = None, None
+
+            filters = dict(
+                start_datetime=start_datetime, end_datetime=end_datetime,
+                hide_common=False, keywords=params.get('search_keywords', []),
+                event_type_filter=params.get('event_type_filter')
+            )
+            log_list = log_type if isinstance(log_type, list) else [log_type]
+            ranked = []
+            if params.get('hosts') and self.fleet:
+                def host_done(host, events, error):
+                    status(f"🛰️ {host}: {len(events)} events" if error is None else f"🛰️ {host}: {error}")
+                events_to_analyze = self.load_fleet_events(max_records=max_records_to_fetch, on_result=host_done, log_type=log_type, **filters)
+            elif not is_last_event_query and self.search_index.covers(log_list):
+                # v31: pick the most relevant events (BM25) instead of the first N substring matches.
+                status("🔎 Ranking events by relevance...")
+                self.refresh_search_index(log_list)
+                query_text = " ".join([question or ""] + [str(k) for k in filters['keywords'] or []])
+                with TELEMETRY.span('index_search'):
+                    ranked = self.search_events(query_text, k=max_records_to_fetch, start_datetime=start_datetime, end_datetime=end_datetime,
+                                                log_types=log_list, event_type_filter=filters['event_type_filter'])
+                # Analysts read a timeline, so the selected events are presented newest-first.
+                events_to_analyze = sorted(ranked, key=_event_sort_key, reverse=True)
+                self._set_current_events(events_to_analyze)
+            if not params.get('hosts') or not self.fleet:
+                if not ranked:
+                    events_to_analyze = self.load_events(log_type, max_records=max_records_to_fetch, **filters)
+                    self.warm_search_index(log_list)
+            if not events_to_analyze and self.archive:
+                # Older events may have rotated out of the live log.
+                status("🗄️ Nothing in the live log, searching the archive...")
+                events_to_analyze = self.archive.read_events(log_type, max_records=max_records_to_fetch, **filters)
+                self._set_current_events(events_to_analyze)
+            on_events(events_to_analyze)
+
+            status(f"🧠 Analyzing {len(events_to_analyze)} found events...")
+            if not events_to_analyze:
+                return (
+                    "I searched the logs based on your query but found **0 events** matching those criteria.\n\n"
+                    "This could mean no relevant events were logged, or the time range is incorrect. You could try broadening your search."
+                )
+            return self.ai_assistant.analyze_results(analysis_request, events_to_analyze)
+
+        if action == "hybrid_analysis":
+            # --- ACTION: HYBRID ANALYSIS (Present-tense) ---
+            params = plan.get("params", {})
+            analysis_request = plan.get('analysis_request', "Analyze real-time system issues.")
+
+            # Step 1: Get "Task Manager" stats
+            status("🔬 Checking real-time stats (Task Manager)...")
+            realtime_data = get_realtime_system_stats()
+
+            # Step 2: Get recent logs
+            status("🔍 Correlating with recent event logs...")
+            try:
+                start_datetime, end_datetime = _parse_plan_datetimes(params)
+            except Exception as e:
+                print(f"Error parsing AI-generated dates: {e}")
+                # Default to today for hybrid analysis if parsing fails
+                start_datetime = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+                end_datetime = datetime.datetime.combine(datetime.date.today(), datetime.time.max)
+
+            events_to_analyze = self.load_events(
+                params.get('log_type', 'Application'), max_records=100,
+                start_datetime=start_datetime, end_datetime=end_datetime,
+                hide_common=False, keywords=params.get('search_keywords', []),
+                event_type_filter=params.get('event_type_filter')
+            )
+            on_events(events_to_analyze)
+
+            # Step 3: Synthesize both
+            status("🧠 Synthesizing real-time and historical data...")
+            return self.ai_assistant.analyze_hybrid_results(analysis_request, realtime_data, events_to_analyze)
+
+        raise Exception(f"Unknown AI action: {action}")
+
+    def answer(self, history, status=None, on_events=None):
+        """Plans and executes one turn for the given history snapshot (digest questions skip the planner, v38)."""
+        self._last_chat = time.time()
+        digested = self.answer_from_digest(history[-1]['content'])
+        if digested:
+            return digested
+        plan = self.plan(history)
+        return plan, self.execute_plan(plan, status=status, on_events=on_events, question=history[-1]['content'])
+
+    def remember(self, role, content):
+        """Adds a chat message to `chat_history`, clipping large tool output first (v35)."""
+        with self._lock:
+            self.chat_history.append({"role": role, "content": ConversationMemory.clip(content)})
+
+    def ask(self, message, status=None, on_events=None):
+        """Full chat turn for API clients: records the message and the answer in `chat_history`."""
+        self.remember("user", message)
+        with self._lock:
+            history_copy = list(self.chat_history)
+        with TELEMETRY.query(message[:60]):
+            try:
+                plan, response_text = self.answer(history_copy, status=status, on_events=on_events)
+            except Exception as ex:
+                plan, response_text = None, f"An error occurred: {str(ex)}"
+        self.remember("assistant", response_text)
+        return {'plan': plan, 'response': response_text}
+
+
+class _EngineRequestHandler(BaseHTTPRequestHandler):
+    """
+    Local JSON API over a MonitorEngine:
+        GET  /health, /stats, /events, /metrics, /system, /uptime, /apps,
+             /processes?name=, /ports?port=&process=, /diagnostics,
+             /fleet/events, /tail (NDJSON streams), /archive/info, /archive/events,
+             /search?q=, /rules, /alerts, /digest?window=|start=&end=,
+             /facets?type=&source=&id=&hour=&limit= (drill-down over the loaded events),
+             /processes/history?name=, /startup (phase timings),
+             /export?format=jsonl|csv&gzip=1&explanations=0 (+ the /events filters; streamed)
+        POST /ask {"message": "..."}, /explain {event}, /similar {event},
+             /archive/sync, /rules {"rule": "id=6008"}, /rules/delete {"id": n}
+    """
+    engine = None
+    token = None
+
+    def log_message(self, fmt, *args):
+        print(f"🌐 API {self.address_string()} - {fmt % args}")
+
+    def _send(self, payload, status=200):
+        data = json.dumps(payload, default=_json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        if not self.token:
+            return True
+        if self.headers.get('Authorization') == f"Bearer {self.token}":
+            return True
+        self._send({'error': 'unauthorized'}, 401)
+        return False
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == '/health':
+                self._send({'status': 'ok', 'events_loaded': len(self.engine.current_events)})
+            elif url.path == '/stats':
+                self._send(self.engine.stats())
+            elif url.path == '/events':
+                log_types = query.get('log_type', 'System').split(',')
+                events = self.engine.load_events(
+                    log_types if len(log_types) > 1 else log_types[0],
+                    max_records=int(query.get('max_records', 100)),
+                    start_datetime=datetime.datetime.fromisoformat(query['start']) if query.get('start') else None,
+                    end_datetime=datetime.datetime.fromisoformat(query['end']) if query.get('end') else None,
+                    hide_common=query.get('hide_common', 'false').lower() == 'true',
+                    keywords=[k for k in query.get('keywords', '').split(',') if k] or None,
+                    event_type_filter=[t for t in query.get('types', '').split(',') if t] or None,
+                )
+                self._send({'events': events, 'scan': self.engine.event_reader.last_scan_stats})
+            elif url.path == '/tail':
+                self._stream_tail(query)
+            elif url.path == '/export':
+                self._stream_export(query)
+            elif url.path == '/fleet/events':
+                self._stream_fleet_events(query)
+            elif url.path == '/archive/info':
+                self._send(self.engine.archive.info() if self.engine.archive else {'error': 'no archive configured'})
+            elif url.path == '/archive/events':
+                if not self.engine.archive:
+                    self._send({'error': 'no archive configured (EVENT_MONITOR_ARCHIVE)'}, 400)
+                    return
+                log_types = [t for t in query.get('log_type', '').split(',') if t]
+                events = list(self.engine.archive.scan(
+                    start_datetime=datetime.datetime.fromisoformat(query['start']) if query.get('start') else None,
+                    end_datetime=datetime.datetime.fromisoformat(query['end']) if query.get('end') else None,
+                    event_ids=[i for i in query.get('ids', '').split(',') if i] or None,
+                    sources=[s for s in query.get('sources', '').split(',') if s] or None,
+                    event_type_filter=[t for t in query.get('types', '').split(',') if t] or None,
+                    log_types=log_types or None,
+                    keywords=[k for k in query.get('keywords', '').split(',') if k] or None,
+                    max_records=int(query.get('max_records', 100)),
+                ))
+                self._send({'events': events})
+            elif url.path == '/search':
+                log_types = [t for t in query.get('log_type', '').split(',') if t]
+                if log_types:
+                    self.engine.refresh_search_index(log_types)
+                self._send({'events': self.engine.search_events(
+                    query.get('q', ''), k=int(query.get('k', 50)),
+                    start_datetime=datetime.datetime.fromisoformat(query['start']) if query.get('start') else None,
+                    end_datetime=datetime.datetime.fromisoformat(query['end']) if query.get('end') else None,
+                    log_types=log_types or None,
+                    event_type_filter=[t for t in query.get('types', '').split(',') if t] or None,
+                )})
+            elif url.path == '/metrics':
+                self._send({'samples': list(self.engine.metrics)})
+            elif url.path == '/system':
+                self._send({'report': get_realtime_system_stats()})
+            elif url.path == '/uptime':
+                self._send({'report': get_system_boot_time()})
+            elif url.path == '/apps':
+                self._send({'report': get_major_apps_overview()})
+            elif url.path == '/processes/history':
+                running, finished = self.engine.processes.runs(query.get('name', ''))
+                self._send({'report': self.engine.processes.describe(query.get('name', '')),
+                            'running': [run.to_dict() for run in running], 'finished': [run.to_dict() for run in finished[:100]],
+                            'tracker_cpu_overhead': self.engine.processes.cpu_overhead, 'poll_interval': self.engine.processes.interval})
+            elif url.path == '/processes':
+                self._send({'report': get_specific_process_stats(query.get('name', ''))})
+            elif url.path == '/ports':
+                if query.get('port'):
+                    self._send({'port': query['port'], 'process': find_processes_on_port(query['port'])})
+                elif query.get('process'):
+                    self._send({'ports': find_ports_for_process(query['process'])})
+                else:
+                    self._send({'ports': get_port_process_mapping()})
+            elif url.path == '/rules':
+                self._send({'rules': [rule.to_dict() for rule in self.engine.rules.rules.values()]})
+            elif url.path == '/alerts':
+                self._send({'alerts': list(self.engine.rules.alerts)})
+            elif url.path == '/facets':
+                selection = {facet: [int(v) if facet in ('id', 'hour') else v for v in query[facet].split(',') if v]
+                             for facet in EventFacets.FACETS if query.get(facet)}
+                self._send({'facets': {facet: [[value, n] for value, n in values]
+                                       for facet, values in self.engine.facet_counts(selection, int(query.get('top', 8))).items()},
+                            'events': self.engine.filter_events(selection, int(query.get('limit', 100)))})
+            elif url.path == '/digest':
+                if query.get('start'):
+                    summary, label = self.engine.digest_summary(start=datetime.datetime.fromisoformat(query['start']),
+                                                                end=datetime.datetime.fromisoformat(query['end']) if query.get('end') else None)
+                else:
+                    summary, label = self.engine.digest_summary(window=query.get('window', 'today'))
+                self._send({'label': label, 'report': self.engine.digest.render(summary, label),
+                            'total': summary['total'], 'by_type': dict(summary['by_type']),
+                            'top_sources': summary['by_source'].most_common(10), 'crashes': summary['crashes'],
+                            'restarts': summary['restarts'], 'cpu_max': summary['cpu_max'], 'ram_max': summary['ram_max']})
+            elif url.path == '/diagnostics':
+                self._send({'telemetry': TELEMETRY.snapshot(), 'queries': TELEMETRY.recent_queries()})
+            elif url.path == '/startup':
+                self._send(STARTUP.snapshot())
+            else:
+                self._send({'error': f'unknown endpoint {url.path}'}, 404)
+        except Exception as e:
+            self._send({'error': str(e)}, 500)
+
+    def _stream_fleet_events(self, query):
+        """Newline-delimited JSON: one line per host as it answers, then the merged result."""
+        if not self.engine.fleet:
+            self._send({'error': 'no hosts configured (EVENT_MONITOR_HOSTS)'}, 400)
+            return
+        log_types = query.get('log_type', 'System').split(',')
+        max_records = int(query.get('max_records', 100))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+
+        def write_line(payload):
+            self.wfile.write(json.dumps(payload, default=_json_default).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+        events = self.engine.load_fleet_events(
+            max_records=max_records,
+            on_result=lambda host, events, error: write_line({'host': host, 'events': events, 'error': error}),
+            log_type=log_types if len(log_types) > 1 else log_types[0],
+            start_datetime=datetime.datetime.fromisoformat(query['start']) if query.get('start') else None,
+            end_datetime=datetime.datetime.fromisoformat(query['end']) if query.get('end') else None,
+            keywords=[k for k in query.get('keywords', '').split(',') if k] or None,
+            event_type_filter=[t for t in query.get('types', '').split(',') if t] or None,
+        )
+        write_line({'merged': events, 'hosts': self.engine.fleet.last_status})
+
+    def _stream_export(self, query):
+        """v47: the export written straight into the response body (JSON lines or CSV, optionally gzip)."""
+        fmt = query.get('format', 'jsonl')
+        if fmt not in ('jsonl', 'csv'):
+            self._send({'error': "format must be jsonl or csv"}, 400)
+            return
+        log_types = query.get('log_type', 'System').split(',')
+        events = self.engine.iter_events(
+            log_types if len(log_types) > 1 else log_types[0],
+            max_records=int(query.get('max_records', 10**9)),
+            start_datetime=datetime.datetime.fromisoformat(query['start']) if query.get('start') else None,
+            end_datetime=datetime.datetime.fromisoformat(query['end']) if query.get('end') else None,
+            hide_common=query.get('hide_common', 'false').lower() == 'true',
+            keywords=[k for k in query.get('keywords', '').split(',') if k] or None,
+            event_type_filter=[t for t in query.get('types', '').split(',') if t] or None,
+        )
+        explain = self.engine.ai_explainer.cached_explanation if query.get('explanations', '1') not in ('0', 'false') else None
+        compressed = query.get('gzip') in ('1', 'true')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv')
+        if compressed:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        try:
+            EventExporter(fmt, explain).write(events, self.wfile, 'gzip' if compressed else None)
+        except OSError:
+            pass  # client went away
+
+    def _stream_tail(self, query):
+        """Newline-delimited JSON: one line per batch of new events until the client disconnects."""
+        pending = Queue()
+        tails = [EventTail(log_type, pending.put,
+                           hide_common=query.get('hide_common') in ('1', 'true'),
+                           keywords=[k for k in query.get('keywords', '').split(',') if k] or None,
+                           event_type_filter=[t for t in query.get('types', '').split(',') if t] or None).start()
+                 for log_type in query.get('log_type', 'System').split(',')]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        try:
+            while True:
+                try:
+                    payload = {'events': pending.get(timeout=15)}
+                except Empty:
+                    payload = {'events': []}  # keep-alive; also notices a closed connection
+                self.wfile.write(json.dumps(payload, default=_json_default).encode('utf-8') + b"\n")
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            for tail in tails:
+                tail.stop()
 
-                    event_data = {
-                        'source': source,
-                        'event_id': event.EventID & 0xFFFF,
-                        'event_type': event_type,
-                        'time_generated': event.TimeGenerated.Format(),
-                        'computer': event.ComputerName,
-                        'message': message.strip()
-                    }
-                    events.append(event_data)
-                    count += 1
-                    
-                    if count <= 5 or count % 10 == 0:
-                        print(f"✅ Found {count} matching events...")
-            
-            win32evtlog.CloseEventLog(hand)
-            print(f"\n{'='*80}")
-            print(f"✅ RETURNED {len(events)} events (scanned {total_read} total)")
-            print(f"{'='*80}\n")
-            return events
-            
+    def do_POST(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        try:
+            body = self._read_json()
+            if url.path == '/ask':
+                if not body.get('message'):
+                    self._send({'error': "'message' is required"}, 400)
+                    return
+                self._send(self.engine.ask(body['message']))
+            elif url.path == '/archive/sync':
+                self._send({'archived': self.engine.sync_archive(body.get('log_types', ('System', 'Application')))})
+            elif url.path == '/explain':
+                self.engine.check_api_key()
+                self._send(self.engine.explain(body))
+            elif url.path == '/rules':
+                rule = body.get('rule')
+                if not rule:
+                    self._send({'error': "'rule' is required (text like \"cpu>90 for=3m\" or a rule object)"}, 400)
+                    return
+                try:
+                    rule = self.engine.add_rule(rule if isinstance(rule, str) else WatchRule.from_dict(rule))
+                except ValueError as e:
+                    self._send({'error': str(e)}, 400)
+                    return
+                self._send({'rule': rule.to_dict()})
+            elif url.path == '/rules/delete':
+                self._send({'removed': self.engine.remove_rule(int(body.get('id', 0)))})
+            elif url.path == '/similar':
+                result = self.engine.similar_events(body.get('event') or body, k=int(body.get('k', 5)))
+                result['matches'] = [{'score': round(score, 4), 'event': evt} for score, evt in result['matches']]
+                self._send(result)
+            else:
+                self._send({'error': f'unknown endpoint {url.path}'}, 404)
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            if "Access is denied" in str(e):
-                raise Exception("Access Denied. Please run this application as an Administrator to read all event logs (especially 'Security').")
-            raise Exception(f"Error reading event log: {str(e)}")
-    
-    def _get_event_type(self, event_type):
-        types = {
-            win32con.EVENTLOG_ERROR_TYPE: 'Error',
-            win32con.EVENTLOG_WARNING_TYPE: 'Warning',
-            win32con.EVENTLOG_INFORMATION_TYPE: 'Information',
-            win32con.EVENTLOG_AUDIT_SUCCESS: 'Audit Success',
-            win32con.EVENTLOG_AUDIT_FAILURE: 'Audit Failure'
-        }
-        return types.get(event_type, 'Unknown')
+            self._send({'error': str(e)}, 500)
 
 
-def parse_time_input(time_str):
-    if not time_str or not time_str.strip():
-        return None
-    time_str = time_str.strip().lower().replace(' ', '')
-    is_pm = 'pm' in time_str
-    is_am = 'am' in time_str
-    time_str = time_str.replace('am', '').replace('pm', '')
+DEFAULT_RULES_PATH = os.path.join(os.path.expanduser("~"), ".event_monitor_rules.json")
+DEFAULT_PROCESS_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".event_monitor_process_history.jsonl")
+
+
+def _is_loopback(host):
+    if host.lower() == 'localhost':
+        return True
     try:
-        if ':' in time_str:
-            parts = time_str.split(':')
-            hour = int(parts[0])
-            minute = int(parts[1]) if len(parts) > 1 else 0
-        else:
-            if len(time_str) >= 3:
-                hour = int(time_str[:-2])
-                minute = int(time_str[-2:])
-            else:
-                hour = int(time_str)
-                minute = 0
-        if is_pm and hour != 12:
-            hour += 12
-        elif is_am and hour == 12:
-            hour = 0
-        if 0 <= hour <= 23 and 0 <= minute <= 59:
-            return (hour, minute)
-        return None
-    except:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _unauthenticated_bind_error(host, token, insecure=False):
+    """Why the API must not listen on `host` without a token, or None if it may."""
+    if token or insecure or _is_loopback(host):
         return None
+    return (f"Refusing to listen on {host} without a token: anyone on the network could call /ask (your OpenAI key), "
+            f"/export and /rules. Set EVENT_MONITOR_TOKEN, or pass --insecure if you really mean it.")
+
+
+def run_headless(api_key, host='127.0.0.1', port=8765, collect_interval=5, token=None, hosts=None, archive_path=None, archive_interval=900, rules_path=None, digest_interval=300,
+                 process_interval=ProcessTracker.INTERVAL, process_history_path=None, host_token=None, insecure=False):
+    """
+    Runs the engine without the GUI: background metrics collection, watch
+    rules, precomputed digests, the process lifecycle tracker, optional
+    archiving of the live logs, and the local HTTP/JSON API.
+    `token` protects this API; `host_token` is what fleet queries send to
+    other engines. Blocks until interrupted.
+    """
+    error = _unauthenticated_bind_error(host, token, insecure)
+    if error:
+        raise ValueError(error)
+    if not token and not _is_loopback(host):
+        print(f"⚠️ WARNING: the API on {host} is open to the network without a token (--insecure)")
+    engine = MonitorEngine(api_key, hosts=hosts, host_token=host_token, archive_path=archive_path, rules_path=rules_path,
+                           process_history_path=process_history_path)
+    engine.start_watch()
+    engine.start_digest(digest_interval)
+    engine.start_process_tracker(process_interval)
+    if collect_interval:
+        engine.start_collector(collect_interval)
+    if engine.archive and archive_interval:
+        engine.start_archiver(archive_interval)
+    handler = type('EngineRequestHandler', (_EngineRequestHandler,), {'engine': engine, 'token': token})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"🛰️ Event Monitor engine listening on http://{host}:{server.server_address[1]} (headless)")
+    STARTUP.mark_interactive()
+    engine.warm_up()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return engine
+# ==============================================================================
+# ⬆️ END OF HEADLESS ENGINE (v28) ⬆️
+# ==============================================================================
+
 
+def _import_flet():
+    """v43: imports flet for the GUI only (main() imports the controls it uses by name)."""
+    global ft
+    if ft is None:
+        with STARTUP.phase("import flet"):
+            ft = importlib.import_module('flet')
+    return ft
 
-def main(page: Page):
+
+def main(page: "ft.Page"):
+    _import_flet()
+    from flet import (AlertDialog, Checkbox, Chip, Column, Container, CrossAxisAlignment, Divider, Dropdown, ElevatedButton,
+                      FontWeight, Icon, IconButton, Icons, MainAxisAlignment, ProgressBar, ProgressRing, Row, ScrollMode,
+                      SnackBar, Switch, Tab, Tabs, Text, TextButton, TextField, ThemeMode, border, border_radius, dropdown,
+                      margin, padding)
     page.title = "Event Monitor Pro"
     page.padding = 0
     page.window_width = 1450
@@ -964,7 +5616,7 @@ def main(page: Page):
         return theme[0][key]
     
     # ⚠️ PASTE YOUR API KEY HERE ⚠️
-    OPENAI_API_KEY = ""
+    OPENAI_API_KEY = "" or os.environ.get("OPENAI_API_KEY", "")
  # Please paste your actual key here
     
     if OPENAI_API_KEY == "YOUR_API_KEY_HERE":
@@ -973,16 +5625,8 @@ def main(page: Page):
         print("Please paste your API key into the `OPENAI_API_KEY` variable.")
         print("="*80)
 
-    event_reader = EventLogReader()
-    ai_explainer = AIExplainer(OPENAI_API_KEY)
-    ai_assistant = AIAssistant(OPENAI_API_KEY)
-    current_events = [] 
-    
-    chat_history = []
-    
-    filter_state = {'start_date': None, 'end_date': None}
-    
-    hide_common_checkbox = Checkbox(label="Hide common events", value=True, check_color=get_color('WHITE'), fill_color=get_color('PRIMARY'))
+    # v43: the splash goes up first and reports real progress instead of a fixed 2 s sleep
+    splash_status = Text("Starting engine...", size=13, color="#64748b")
 
     def show_splash():
         splash_content = Container(
@@ -995,7 +5639,7 @@ def main(page: Page):
                 Container(height=40),
                 ProgressBar(width=350, color="#4f46e5", height=3),
                 Container(height=15),
-                Text("Initializing AI Engine...", size=13, color="#64748b"),
+                splash_status,
                 Container(height=30),
                 Row([
                     Container(content=Text("Realtime", size=11, color="#ffffff"), bgcolor="#10b981", padding=10, border_radius=20),
@@ -1010,17 +5654,36 @@ def main(page: Page):
         
         page.add(Container(content=splash_content, expand=True, bgcolor="#f8fafc", alignment=ft.alignment.center))
         page.update()
-        time.sleep(2)
-        page.clean()
+
+    def splash_progress(message):
+        splash_status.value = message
+        page.update()
+
+    with STARTUP.phase("splash"):
+        show_splash()
+
+    # The GUI is a client of the headless engine (v28); these names alias its state.
+    with STARTUP.phase("engine init"):
+        engine = MonitorEngine(OPENAI_API_KEY, hosts=[h for h in os.environ.get("EVENT_MONITOR_HOSTS", "").split(",") if h.strip()],
+                               host_token=os.environ.get("EVENT_MONITOR_HOST_TOKEN") or None,
+                               archive_path=os.environ.get("EVENT_MONITOR_ARCHIVE") or None,
+                               rules_path=os.environ.get("EVENT_MONITOR_RULES") or DEFAULT_RULES_PATH,
+                               process_history_path=os.environ.get("EVENT_MONITOR_PROCESS_HISTORY") or DEFAULT_PROCESS_HISTORY_PATH)
+    splash_progress("Building dashboard...")
+    current_events = engine.current_events
+    
+    chat_history = engine.chat_history
     
-    show_splash()
+    filter_state = {'start_date': None, 'end_date': None}
     
+    hide_common_checkbox = Checkbox(label="Hide common events", value=True, check_color=get_color('WHITE'), fill_color=get_color('PRIMARY'))
+
     stats_total = Text("0", size=36, weight=FontWeight.BOLD, color=get_color('TEXT'))
     stats_errors = Text("0", size=36, weight=FontWeight.BOLD, color=get_color('ERROR'))
     stats_warnings = Text("0", size=36, weight=FontWeight.BOLD, color=get_color('WARNING'))
     stats_info = Text("0", size=36, weight=FontWeight.BOLD, color=get_color('SUCCESS'))
     
-    def create_stat_card(icon, label, value_text, color, description):
+    def create_stat_card(icon, label, value_text, color, description, on_click=None):
         return Container(
             content=Column([
                 Row([
@@ -1033,7 +5696,8 @@ def main(page: Page):
             padding=20,
             border_radius=16,
             border=border.all(1, get_color('BORDER')),
-            expand=True
+            expand=True,
+            on_click=on_click
         )
     
     theme_toggle = IconButton(icon=Icons.DARK_MODE_OUTLINED if not is_dark_mode[0] else Icons.LIGHT_MODE_OUTLINED, icon_color=get_color('TEXT_LIGHT'), tooltip="Toggle Theme", on_click=lambda e: toggle_theme())
@@ -1069,17 +5733,45 @@ def main(page: Page):
             border=border.only(bottom=border.BorderSide(1, get_color('BORDER')))
         )
         
+        # --- v39: Facet chips (drill-down over the loaded events) ---
+        facet_row = Row([], spacing=8, wrap=True)
+        facet_selection = {}
+        event_cards = {}  # id(event) -> its rendered card, so a drill-down only re-orders existing cards
+        explain_order = {}  # id(event) -> its index in the running explanation batch
+        explain_batch = [None]
+        last_flush = [0.0]
+        cards_lock = threading.RLock()  # event_list/event_cards change on the loader, scheduler and tail threads
+
         stats_row = Container(
-            content=Row([
-                create_stat_card(Icons.ANALYTICS_OUTLINED, "Total Events", stats_total, get_color('ACCENT'), "All events"),
-                create_stat_card(Icons.ERROR_OUTLINE, "Errors", stats_errors, get_color('ERROR'), "Critical issues"),
-                create_stat_card(Icons.WARNING_AMBER_OUTLINED, "Warnings", stats_warnings, get_color('WARNING'), "Potential issues"),
-                create_stat_card(Icons.INFO_OUTLINE, "Information", stats_info, get_color('SUCCESS'), "Normal activity")
-            ], spacing=16),
+            content=Column([
+                Row([
+                    create_stat_card(Icons.ANALYTICS_OUTLINED, "Total Events", stats_total, get_color('ACCENT'), "All events", on_click=lambda e: clear_facets()),
+                    create_stat_card(Icons.ERROR_OUTLINE, "Errors", stats_errors, get_color('ERROR'), "Critical issues", on_click=lambda e: toggle_facet('type', 'Error')),
+                    create_stat_card(Icons.WARNING_AMBER_OUTLINED, "Warnings", stats_warnings, get_color('WARNING'), "Potential issues", on_click=lambda e: toggle_facet('type', 'Warning')),
+                    create_stat_card(Icons.INFO_OUTLINE, "Information", stats_info, get_color('SUCCESS'), "Normal activity", on_click=lambda e: toggle_facet('type', 'Information'))
+                ], spacing=16),
+                facet_row
+            ], spacing=12),
             padding=padding.symmetric(horizontal=40, vertical=24)
         )
 
-        event_list = Column([], spacing=10, scroll=ScrollMode.AUTO, expand=True)
+        event_list = Column([], spacing=10, scroll=ScrollMode.AUTO, expand=True, on_scroll_interval=150)
+        VISIBLE_CARDS = 8
+
+        def on_event_scroll(e):
+            # v45: explain what scrolled into view first (positions estimated from the scroll offset)
+            n = len(event_list.controls)
+            extent = (getattr(e, 'max_scroll_extent', 0) or 0) + (getattr(e, 'viewport_dimension', 0) or 0)
+            if not n or not extent:
+                return
+            first = int((getattr(e, 'pixels', 0) or 0) / extent * n)
+            count = int(e.viewport_dimension / extent * n) + 2
+            # Positions are list positions; after a drill-down or a live insert they are
+            # not batch indices, so map each visible control back to its event.
+            visible = event_list.controls[max(first - 1, 0):first + count]
+            engine.explanations.prioritize([i for i in (explain_order.get(id(getattr(c, 'data', None))) for c in visible) if i is not None])
+
+        event_list.on_scroll = on_event_scroll
         
         start_date_field = TextField(label="Start Date", hint_text="Select", read_only=True, width=130, border_radius=8, filled=True, dense=True, bgcolor=get_color('BG'), suffix_icon=Icons.CALENDAR_TODAY_OUTLINED)
         start_time_field = TextField(label="Start Time", hint_text="9am", width=110, border_radius=8, filled=True, dense=True, bgcolor=get_color('BG'))
@@ -1133,7 +5825,9 @@ def main(page: Page):
                 bg = f"rgba({int(color[1:3],16)},{int(color[3:5],16)},{int(color[5:7],16)},0.08)"
             
             try:
-                dt = datetime.datetime.strptime(event['time_generated'], '%m/%d/%y %H:%M:%S')
+                dt = _event_sort_key(event)
+                if dt == datetime.datetime.min:
+                    raise ValueError(event['time_generated'])
                 time_str = dt.strftime('%I:%M %p')
                 date_str = dt.strftime('%b %d, %Y')
             except:
@@ -1141,6 +5835,8 @@ def main(page: Page):
                 date_str = ""
             
             is_expanded = [False]
+            similar_loaded = [False]
+            similar_section = Container(content=Text("Looking for similar events...", size=12, color=get_color('TEXT_LIGHT')), bgcolor=get_color('BG'), padding=12, border_radius=8)
             header_row = Row([
                 Container(content=Text(explanation['icon'], size=24), width=50, height=50, bgcolor=bg, border_radius=10, alignment=ft.alignment.center),
                 Container(width=12),
@@ -1161,30 +5857,110 @@ def main(page: Page):
                 Container(height=12),
                 Text("📋 Raw Message", size=13, weight=FontWeight.BOLD, color=get_color('TEXT')), Container(height=6),
                 Container(content=Text(event['message'], size=12, color=get_color('TEXT_LIGHT'), selectable=True), bgcolor=get_color('BG'), padding=12, border_radius=8),
+                Container(height=12),
+                Text("🔗 Similar Events", size=13, weight=FontWeight.BOLD, color=get_color('TEXT')), Container(height=6),
+                similar_section,
             ], spacing=0), padding=padding.only(top=12))
             
             card_column = Column([header_row, details_section], spacing=0)
             card_container = Container(content=card_column, bgcolor=get_color('CARD'), padding=16, border_radius=12, border=border.all(1, get_color('BORDER')))
             
+            def load_similar():
+                # v32: filled in the background on first expand
+                try:
+                    result = engine.similar_events(event, k=5)
+                    lines = []
+                    if result['count']:
+                        lines.append(Text(f"Seen {result['count']} more time(s) • first {result['first_seen']:%b %d, %Y %I:%M %p} • last {result['last_seen']:%b %d, %Y %I:%M %p}", size=12, weight=FontWeight.W_600, color=get_color('TEXT')))
+                    for score, match in result['matches']:
+                        lines.append(Text(f"{match['time_generated']} • {match['source']} (ID {match['event_id']}) • {score:.0%} similar\n{match['message'][:160]}", size=11, color=get_color('TEXT_LIGHT'), selectable=True))
+                    if not lines:
+                        lines.append(Text("No similar events found yet (the log is still being indexed - try again in a moment).", size=12, color=get_color('TEXT_LIGHT')))
+                        similar_loaded[0] = False
+                    similar_section.content = Column(lines, spacing=8)
+                except Exception as ex:
+                    similar_section.content = Text(f"⚠️ {ex}", size=12, color=get_color('TEXT_LIGHT'))
+                page.update()
+
             def toggle_expand(e):
                 is_expanded[0] = not is_expanded[0]
                 details_section.visible = is_expanded[0]
                 header_row.controls[3] = Icon(Icons.KEYBOARD_ARROW_UP_ROUNDED if is_expanded[0] else Icons.KEYBOARD_ARROW_DOWN_ROUNDED, size=20, color=get_color('TEXT_LIGHT'))
                 page.update()
+                if is_expanded[0] and not similar_loaded[0]:
+                    similar_loaded[0] = True
+                    threading.Thread(target=load_similar, daemon=True).start()
             
             card_container.on_click = toggle_expand
+            card_container.data = event  # v45: lets the list map a card back to its event
             return card_container
 
+        def flush_ui():
+            with TELEMETRY.span('ui_flush'):
+                page.update()
+
+        def explain_placeholder(evt, idx):
+            return Container(content=Row([ProgressRing(width=24, height=24, stroke_width=2, color=get_color('PRIMARY')), Container(width=12), Text(f"AI analyzing... {evt['source']} (ID {evt['event_id']})", size=12, color=get_color('TEXT_LIGHT'))]), bgcolor=get_color('CARD'), padding=16, border_radius=12, border=border.all(1, get_color('BORDER')),
+                             on_click=lambda e: engine.explanations.prioritize([idx]), data=evt)
+
+        def show_explanation(idx, evt, explanation):
+            # Called by the explanation scheduler for loaded and live-tail events alike.
+            card = create_event_card(evt, explanation, idx)
+            with cards_lock:
+                # Replace this event's placeholder wherever it is now (a drill-down
+                # or a live-tail insert moves it), or nowhere if it is filtered out.
+                placeholder = event_cards.get(id(evt))
+                event_cards[id(evt)] = card
+                for pos, control in enumerate(event_list.controls):
+                    if control is placeholder:
+                        event_list.controls[pos] = card
+                        break
+            if time.perf_counter() - last_flush[0] > 0.2:
+                last_flush[0] = time.perf_counter()
+                flush_ui()
+
         def update_stats():
-            if not current_events:
-                stats_total.value = stats_errors.value = stats_warnings.value = stats_info.value = "0"
-            else:
-                counts = Counter(e['event_type'] for e in current_events)
-                stats_total.value = str(len(current_events))
-                stats_errors.value = str(counts.get('Error', 0))
-                stats_warnings.value = str(counts.get('Warning', 0))
-                stats_info.value = str(counts.get('Information', 0))
-            page.update()
+            stats = engine.stats()
+            stats_total.value = str(stats['total'])
+            stats_errors.value = str(stats['errors'])
+            stats_warnings.value = str(stats['warnings'])
+            stats_info.value = str(stats['information'])
+            render_facets()
+            flush_ui()
+
+        def render_facets():
+            counts = engine.facet_counts(facet_selection, top=6)
+            facet_row.controls.clear()
+            for facet, title in (('type', "Type"), ('source', "Source"), ('id', "Event ID"), ('hour', "Hour")):
+                if not counts.get(facet):
+                    continue
+                facet_row.controls.append(Text(title, size=12, weight=FontWeight.W_600, color=get_color('TEXT_LIGHT')))
+                for value, n in counts[facet]:
+                    facet_row.controls.append(Chip(
+                        label=Text(f"{EventFacets.label(facet, value)} ({n})", size=12, color=get_color('TEXT')),
+                        selected=value in facet_selection.get(facet, ()), show_checkmark=False,
+                        bgcolor=get_color('CARD'), selected_color=f"rgba({int(get_color('PRIMARY')[1:3],16)},{int(get_color('PRIMARY')[3:5],16)},{int(get_color('PRIMARY')[5:7],16)},0.2)",
+                        on_select=lambda e, facet=facet, value=value: toggle_facet(facet, value)))
+            if facet_selection:
+                facet_row.controls.append(TextButton("Clear filters", icon=Icons.FILTER_ALT_OFF_OUTLINED, on_click=lambda e: clear_facets()))
+
+        def apply_facets():
+            with TELEMETRY.span('facet_filter'), cards_lock:
+                events = engine.filter_events(facet_selection)
+                event_list.controls[:] = [event_cards[id(evt)] for evt in events if id(evt) in event_cards]
+            update_stats()
+
+        def toggle_facet(facet, value):
+            values = facet_selection.setdefault(facet, set())
+            values.symmetric_difference_update({value})
+            if not values:
+                del facet_selection[facet]
+            apply_facets()
+
+        def clear_facets():
+            if facet_selection:
+                facet_selection.clear()
+                apply_facets()
 
         def load_events(e):
             dialog = AlertDialog(
@@ -1196,73 +5972,179 @@ def main(page: Page):
             dialog.open = True
             page.update()
             
+            token = engine.begin('load')  # v46: supersedes a load that is still running
+
             def load_bg():
+                query = TELEMETRY.begin_query(f"Load {log_dropdown.value} events")
                 try:
-                    if OPENAI_API_KEY == "YOUR_API_KEY_HERE":
-                        raise Exception("OpenAI API key is not set. Please add it to the code.")
-                    
-                    log_type = log_dropdown.value
-                    max_records = int(records_field.value)
-                    hide_common = hide_common_checkbox.value
-                    
-                    start_datetime = None
-                    end_datetime = None
-                    
-                    if filter_state['start_date']:
-                        start_time = parse_time_input(start_time_field.value)
-                        start_hour, start_minute = start_time if start_time else (0, 0)
-                        start_datetime = datetime.datetime.combine(filter_state['start_date'], datetime.time(start_hour, start_minute, 0))
-                        print(f"\n📅 START FILTER: {start_datetime}")
-                    
-                    if filter_state['end_date']:
-                        end_time = parse_time_input(end_time_field.value)
-                        end_hour, end_minute = end_time if end_time else (23, 59)
-                        end_datetime = datetime.datetime.combine(filter_state['end_date'], datetime.time(end_hour, end_minute, 59))
-                        print(f"📅 END FILTER: {end_datetime}\n")
-                    
-                    events = event_reader.read_events(log_type, max_records, start_datetime, end_datetime, hide_common, keywords=None)
-                    
-                    current_events.clear()
-                    current_events.extend(events)
-                    
-                    event_list.controls.clear()
-                    
-                    if not events:
-                        event_list.controls.append(Container(content=Row([Icon(Icons.INFO_OUTLINE, color=get_color('TEXT_LIGHT')), Container(width=12), Text("No events found matching your criteria.", size=13, color=get_color('TEXT_LIGHT'))]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))))
-                    else:
-                        for idx, evt in enumerate(events):
-                            placeholder = Container(content=Row([ProgressRing(width=24, height=24, stroke_width=2, color=get_color('PRIMARY')), Container(width=12), Text("AI analyzing...", size=12, color=get_color('TEXT_LIGHT'))]), bgcolor=get_color('CARD'), padding=16, border_radius=12, border=border.all(1, get_color('BORDER')))
-                            event_list.controls.append(placeholder)
-                        page.update()
-                        
-                        for idx, evt in enumerate(events):
-                            explanation = ai_explainer.explain_event(evt['event_id'], evt['event_type'], evt['source'], evt['message'])
-                            event_list.controls[idx] = create_event_card(evt, explanation, idx)
-                            if idx % 5 == 0:
-                                page.update()
-                    
-                    update_stats()
-                    dialog.open = False
-                    page.snack_bar = SnackBar(content=Row([Icon(Icons.CHECK_CIRCLE, color="#ffffff", size=20), Text(f"Loaded {len(events)} events", color="#ffffff")], spacing=8), bgcolor=get_color('SUCCESS'))
-                    page.snack_bar.open = True
-                    page.update()
+                    with cancellable(token):
+                        load_and_explain()
+                except QueryCancelled:
+                    print("⏹️ Load superseded by a newer one")
                 except Exception as ex:
                     import traceback
                     traceback.print_exc()
                     dialog.open = False
                     page.snack_bar = SnackBar(content=Row([Icon(Icons.ERROR, color="#ffffff", size=20), Text(f"Error: {str(ex)}", color="#ffffff")], spacing=8), bgcolor=get_color('ERROR'))
                     page.snack_bar.open = True
-                    page.update()
+                    flush_ui()
+                finally:
+                    TELEMETRY.end_query(query)
+
+            def load_and_explain():
+                if OPENAI_API_KEY == "YOUR_API_KEY_HERE":
+                    raise Exception("OpenAI API key is not set. Please add it to the code.")
+                
+                log_type = log_dropdown.value
+                max_records = int(records_field.value)
+                hide_common = hide_common_checkbox.value
+                
+                start_datetime = None
+                end_datetime = None
+                
+                if filter_state['start_date']:
+                    start_time = parse_time_input(start_time_field.value)
+                    start_hour, start_minute = start_time if start_time else (0, 0)
+                    start_datetime = datetime.datetime.combine(filter_state['start_date'], datetime.time(start_hour, start_minute, 0))
+                    print(f"\n📅 START FILTER: {start_datetime}")
+                
+                if filter_state['end_date']:
+                    end_time = parse_time_input(end_time_field.value)
+                    end_hour, end_minute = end_time if end_time else (23, 59)
+                    end_datetime = datetime.datetime.combine(filter_state['end_date'], datetime.time(end_hour, end_minute, 59))
+                    print(f"📅 END FILTER: {end_datetime}\n")
+                
+                engine.explanations.cancel()
+                events = engine.load_events(log_type, max_records, start_datetime, end_datetime, hide_common, keywords=None)
+                
+                token.check()
+                with cards_lock:
+                    event_list.controls.clear()
+                    event_cards.clear()
+                    explain_order.clear()
+                facet_selection.clear()
+                
+                if not events:
+                    event_list.controls.append(Container(content=Row([Icon(Icons.INFO_OUTLINE, color=get_color('TEXT_LIGHT')), Container(width=12), Text("No events found matching your criteria.", size=13, color=get_color('TEXT_LIGHT'))]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))))
+                else:
+                    with cards_lock:
+                        for idx, evt in enumerate(events):
+                            placeholder = explain_placeholder(evt, idx)
+                            event_list.controls.append(placeholder)
+                            event_cards[id(evt)] = placeholder
+                            explain_order[id(evt)] = idx
+                    # v45: the list is usable while explanations stream in, visible and severe events first
+                    dialog.open = False
+                    flush_ui()
+
+                    last_flush[0] = time.perf_counter()
+                    with cards_lock:
+                        batch = explain_batch[0] = engine.explanations.submit(events, show_explanation, visible=range(VISIBLE_CARDS))
+                    batch.wait()
+                    if batch.cancelled:
+                        return
+                    if facet_selection:
+                        apply_facets()
+                
+                update_stats()
+                dialog.open = False
+                page.snack_bar = SnackBar(content=Row([Icon(Icons.CHECK_CIRCLE, color="#ffffff", size=20), Text(f"Loaded {len(events)} events", color="#ffffff")], spacing=8), bgcolor=get_color('SUCCESS'))
+                page.snack_bar.open = True
+                flush_ui()
             
             threading.Thread(target=load_bg, daemon=True).start()
         
-        log_dropdown = Dropdown(label="Log Type", options=[dropdown.Option(t) for t in ["System", "Application", "Security"]], value="System", width=130, border_radius=8, filled=True, dense=True, bgcolor=get_color('BG'))
+        log_dropdown = Dropdown(label="Log Type", options=[dropdown.Option(t) for t in ["System", "Application", "Security", "All Logs"]], value="System", width=130, border_radius=8, filled=True, dense=True, bgcolor=get_color('BG'))
         records_field = TextField(label="Max Events", value="10", width=100, border_radius=8, filled=True, dense=True, bgcolor=get_color('BG'), keyboard_type=ft.KeyboardType.NUMBER)
         load_btn = ElevatedButton("Load & Analyze", icon=Icons.REFRESH_ROUNDED, on_click=load_events, bgcolor=get_color('PRIMARY'), color=get_color('WHITE'), height=40)
+
+        # --- v47: Export ---
+        export_format = Dropdown(label="Export", options=[dropdown.Option(f) for f in ("JSONL", "CSV", "Parquet")], value="JSONL", width=110, border_radius=8, filled=True, dense=True, bgcolor=get_color('BG'))
+        export_compress = Checkbox(label="gzip", value=True, check_color=get_color('WHITE'), fill_color=get_color('PRIMARY'))
+
+        def export_events(e):
+            fmt = export_format.value.lower()
+            suffix = {'jsonl': '.jsonl', 'csv': '.csv', 'parquet': '.parquet'}[fmt]
+            if export_compress.value and fmt != 'parquet':
+                suffix += '.gz'
+            path = os.path.join(os.path.expanduser("~"), f"event-export-{datetime.datetime.now():%Y%m%d-%H%M%S}{suffix}")
+            token = engine.begin('export')
+
+            def progress(n):
+                export_btn.text = f"Exporting... {n:,}"
+                flush_ui()
+
+            def export_bg():
+                export_btn.disabled = True
+                flush_ui()
+                try:
+                    with cancellable(token):
+                        summary = engine.export_events(path, fmt, on_progress=progress)
+                    page.snack_bar = SnackBar(content=Row([Icon(Icons.CHECK_CIRCLE, color="#ffffff", size=20), Text(f"Exported {summary['events']:,} events ({summary['explained']:,} explained, {summary['bytes'] / (1024 * 1024):.1f} MB) to {summary['path']}", color="#ffffff")], spacing=8), bgcolor=get_color('SUCCESS'))
+                except QueryCancelled:
+                    return
+                except Exception as ex:
+                    page.snack_bar = SnackBar(content=Row([Icon(Icons.ERROR, color="#ffffff", size=20), Text(f"Export failed: {str(ex)}", color="#ffffff")], spacing=8), bgcolor=get_color('ERROR'))
+                finally:
+                    export_btn.text = "Export"
+                    export_btn.disabled = False
+                page.snack_bar.open = True
+                flush_ui()
+
+            threading.Thread(target=export_bg, daemon=True).start()
+
+        export_btn = ElevatedButton("Export", icon=Icons.DOWNLOAD_ROUNDED, on_click=export_events, bgcolor=get_color('ACCENT'), color=get_color('WHITE'), height=40)
+
+        # --- v33: Live tail ---
+        engine.stop_tail()  # a rebuilt UI starts with live mode off
+
+        def add_live_events(new_events):
+            # Runs on the tail thread: the new events show up as placeholders at once and
+            # the explanation scheduler (v45) fills them in ahead of the rest of the list.
+            max_events = int(records_field.value or 0) or None
+            with cards_lock:
+                batch, first = engine.explanations.extend(new_events, show_explanation)
+                if batch is not explain_batch[0]:
+                    explain_batch[0] = batch
+                    explain_order.clear()
+                if len(current_events) == len(new_events):
+                    event_list.controls.clear()  # drop the "No events found" note
+                for offset in range(len(new_events) - 1, -1, -1):
+                    evt = new_events[offset]
+                    placeholder = explain_placeholder(evt, first + offset)
+                    event_list.controls.insert(0, placeholder)
+                    event_cards[id(evt)] = placeholder
+                    explain_order[id(evt)] = first + offset
+                if max_events:
+                    del event_list.controls[max_events:]
+                if len(event_cards) > 2 * len(current_events) + 100:
+                    live = {id(evt) for evt in current_events}
+                    for key in [key for key in event_cards if key not in live]:
+                        del event_cards[key]
+                        explain_order.pop(key, None)
+            if facet_selection:
+                apply_facets()
+            else:
+                update_stats()
+
+        def toggle_live(e):
+            if live_switch.value:
+                try:
+                    engine.start_tail(log_dropdown.value, on_events=add_live_events, hide_common=hide_common_checkbox.value,
+                                      max_events=int(records_field.value or 0) or None)
+                except Exception as ex:
+                    live_switch.value = False
+                    page.snack_bar = SnackBar(content=Row([Icon(Icons.ERROR, color="#ffffff", size=20), Text(f"Error: {str(ex)}", color="#ffffff")], spacing=8), bgcolor=get_color('ERROR'))
+                    page.snack_bar.open = True
+            else:
+                engine.stop_tail()
+            page.update()
+
+        live_switch = Switch(label="Live", value=False, on_change=toggle_live, active_color=get_color('PRIMARY'))
         
         events_tab = Container(
             content=Column([
-                Container(content=Column([Text("Event Controls", size=16, weight=FontWeight.W_600, color=get_color('TEXT')), Container(height=16), Row([log_dropdown, records_field, start_date_field, start_time_field, end_date_field, end_time_field, clear_filter_btn, load_btn], spacing=10, wrap=True), Container(height=12), hide_common_checkbox]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
+                Container(content=Column([Text("Event Controls", size=16, weight=FontWeight.W_600, color=get_color('TEXT')), Container(height=16), Row([log_dropdown, records_field, start_date_field, start_time_field, end_date_field, end_time_field, clear_filter_btn, load_btn, live_switch], spacing=10, wrap=True), Container(height=12), Row([hide_common_checkbox, Container(expand=True), export_format, export_compress, export_btn], spacing=10)]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
                 Container(height=20),
                 Container(content=Column([Row([Text("Recent Events", size=16, weight=FontWeight.W_600, color=get_color('TEXT'))]), Container(height=16), event_list]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER')), expand=True)
             ], expand=True),
@@ -1291,13 +6173,13 @@ def main(page: Page):
                 return
             
             chat_list.controls.append(create_chat_bubble(msg, True))
-            chat_history.append({"role": "user", "content": msg})
+            engine.remember("user", msg)
             chat_input.value = ""
             chat_input.disabled = True
             
             page.update()
             
-            history_copy = list(chat_history[-10:])
+            history_copy = list(chat_history)  # bounded by the planner's ConversationMemory (v35)
             threading.Thread(target=get_smart_response, args=(history_copy,), daemon=True).start()
         
         def get_smart_response(history_copy):
@@ -1325,208 +6207,36 @@ def main(page: Page):
                 border=border.all(1, get_color('BORDER'))
             )
             
+            query = TELEMETRY.begin_query(history_copy[-1]['content'][:60])
+            token = engine.begin('chat')
             try:
                 chat_list.controls.append(status_bubble)
-                page.update()
-                
-                if OPENAI_API_KEY == "YOUR_API_KEY_HERE":
-                    raise Exception("OpenAI API key is not set.")
-
-                # --- Step 1: Get the AI's plan (Chat, Search, Hybrid, or Uptime) ---
-                plan = ai_assistant.get_ai_plan(history_copy)
-                
-                # --- Step 2: Execute the plan ---
-                
-                if plan.get("action") == "chat":
-                    # --- ACTION: CHAT ---
-                    status_text.value = "💬 Generating response..."
-                    page.update()
-                    response_text = plan.get("response", "I'm not sure how to respond to that.")
-                    
-                elif plan.get("action") == "get_boot_time":
-                    # --- ACTION: GET BOOT TIME ---
-                    status_text.value = "⏱️ Checking system boot time..."
-                    page.update()
-                    response_text = get_system_boot_time()
-                
-
-                elif plan.get("action") == "get_process_stats":
-                    # --- ACTION: GET SPECIFIC PROCESS STATS (v23) ---
-                    params = plan.get("params", {})
-                    process_name = params.get("process_name")
-                    
-                    if not process_name:
-                        response_text = "⚠️ AI Error: The AI plan wanted to check a process, but didn't specify which one. Please try rephrasing your query."
-                    else:
-                        status_text.value = f"🔎 Checking stats for processes matching '{process_name}'..."
-                        page.update()
-                        response_text = get_specific_process_stats(process_name)
+                stop_btn.visible = True
+                flush_ui()
                 
-                # ==========================================================
-                # ⬇️ ADDED THIS NEW BLOCK (v25) ⬇️
-                # ==========================================================
-                elif plan.get("action") == "check_major_apps":
-                    # --- ACTION: GET MAJOR APPS OVERVIEW (v25) ---
-                    status_text.value = "📊 Scanning for major applications..."
-                    page.update()
-                    response_text = get_major_apps_overview()
-                # ==========================================================
-                # ⬆️ END OF NEW BLOCK (v25) ⬆️
-                # ==========================================================
-                # ✅ ACTION: PORT ANALYSIS (v26)
-                elif plan.get("action") == "port_analysis":
-                    params = plan.get("params", {})
-
-                    port = params.get("port")
-                    process = params.get("process_name")
-
-                    status_text.value = "🌐 Analyzing network ports..."
-                    page.update()
-
-                    if port:
-                        data = find_processes_on_port(port)
-                        if not data:
-                            response_text = f"No application is using port **{port}**."
-                        else:
-                            response_text = f"""
-                **Port {port} Analysis**
-                ✅ Process: **{data['process_name']}**
-                ✅ PID: **{data['pid']}**
-                ✅ Status: **{data['status']}**
-                """
-                    elif process:
-                        data = find_ports_for_process(process)
-                        if not data:
-                            response_text = f"Process **{process}** is not using any ports."
-                        else:
-                            response_text = f"**{process} Port Usage:**\n"
-                            for p, info in data.items():
-                                response_text += f"- Port **{p}** → PID {info['pid']} ({info['status']})\n"
-                    else:
-                        full_map = get_port_process_mapping()
-                        lines = []
-                        for p, info in full_map.items():
-                            lines.append(f"- Port **{p}** → {info['process_name']} (PID {info['pid']}, {info['status']})")
-                        response_text = "**All Active Ports:**\n" + "\n".join(lines)
-
-                elif plan.get("action") == "search_logs":
-                    # --- ACTION: SEARCH LOGS (Past-tense) ---
-                    params = plan.get("params", {})
-                    status_text.value = f"🔍 Searching {params.get('log_type', 'System')} logs..."
-                    page.update()
-                    
-                    log_type = params.get('log_type', 'System')
-                    keywords = params.get('search_keywords', [])
-                    analysis_request = params.get('analysis_request', "Analyze the user's query.")
-                    event_type_filter = params.get('event_type_filter')
-
-                    is_last_event_query = params.get("find_most_recent", False)
-                    max_records_to_fetch = 5 if is_last_event_query else 500
-                    
-                    # --- v21 DATETIME FIX ---
-                    start_datetime, end_datetime = None, None
-                    try:
-                        if params.get('start_date'):
-                            start_date = datetime.datetime.strptime(params['start_date'], '%Y-%m-%d').date()
-                            start_time = datetime.datetime.strptime(params.get('start_time', '00:00'), '%H:%M').time()
-                            start_datetime = datetime.datetime.combine(start_date, start_time)
-                        
-                        if params.get('end_date'):
-                            end_date = datetime.datetime.strptime(params['end_date'], '%Y-%m-%d').date()
-                            end_time = datetime.datetime.strptime(params.get('end_time', '23:59'), '%H:%M').time()
-                            end_datetime = datetime.datetime.combine(end_date, end_time)
-                    except Exception as e:
-                        print(f"Error parsing AI-generated dates: {e}")
-                        start_datetime, end_datetime = None, None
-
-                    events_to_analyze = event_reader.read_events(
-                        log_type, max_records=max_records_to_fetch,
-                        start_datetime=start_datetime, end_datetime=end_datetime,
-                        hide_common=False, keywords=keywords, event_type_filter=event_type_filter
-                    )
-                    
-                    current_events.clear()
-                    current_events.extend(events_to_analyze)
-                    update_stats()
-
-                    status_text.value = f"🧠 Analyzing {len(events_to_analyze)} found events..."
-                    page.update()
-                    
-                    if not events_to_analyze:
-                        response_text = (
-                            "I searched the logs based on your query but found **0 events** matching those criteria.\n\n"
-                            "This could mean no relevant events were logged, or the time range is incorrect. You could try broadening your search."
-                        )
-                    else:
-                        response_text = ai_assistant.analyze_results(analysis_request, events_to_analyze)
-
-                elif plan.get("action") == "hybrid_analysis":
-                    # --- ACTION: HYBRID ANALYSIS (Present-tense) ---
-                    params = plan.get("params", {})
-                    analysis_request = plan.get('analysis_request', "Analyze real-time system issues.")
-                    
-                    # Step 1: Get "Task Manager" stats
-                    status_text.value = "🔬 Checking real-time stats (Task Manager)..."
-                    page.update()
-                    realtime_data = get_realtime_system_stats()
-                    
-                    # Step 2: Get recent logs
-                    status_text.value = "🔍 Correlating with recent event logs..."
-                    page.update()
-                    
-                    log_type = params.get('log_type', 'Application')
-                    keywords = params.get('search_keywords', [])
-                    event_type_filter = params.get('event_type_filter')
-                    
-                    # --- v21 DATETIME FIX ---
-                    start_datetime, end_datetime = None, None
-                    try:
-                        if params.get('start_date'):
-                            start_date = datetime.datetime.strptime(params['start_date'], '%Y-%m-%d').date()
-                            start_time = datetime.datetime.strptime(params.get('start_time', '00:00'), '%H:%M').time()
-                            start_datetime = datetime.datetime.combine(start_date, start_time)
-                        
-                        if params.get('end_date'):
-                            end_date = datetime.datetime.strptime(params['end_date'], '%Y-%m-%d').date()
-                            end_time = datetime.datetime.strptime(params.get('end_time', '23:59'), '%H:%M').time()
-                            end_datetime = datetime.datetime.combine(end_date, end_time)
-                    except Exception as e:
-                        print(f"Error parsing AI-generated dates: {e}")
-                        # Default to today for hybrid analysis if parsing fails
-                        start_datetime = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
-                        end_datetime = datetime.datetime.combine(datetime.date.today(), datetime.time.max)
-
-
-                    events_to_analyze = event_reader.read_events(
-                        log_type, max_records=100,
-                        start_datetime=start_datetime, end_datetime=end_datetime,
-                        hide_common=False, keywords=keywords, event_type_filter=event_type_filter
-                    )
-                    
-                    current_events.clear()
-                    current_events.extend(events_to_analyze)
-                    update_stats()
+                def set_status(text):
+                    status_text.value = text
+                    flush_ui()
 
-                    # Step 3: Synthesize both
-                    status_text.value = f"🧠 Synthesizing real-time and historical data..."
-                    page.update()
-                    
-                    response_text = ai_assistant.analyze_hybrid_results(
-                        analysis_request,
-                        realtime_data,
-                        events_to_analyze
-                    )
-                
-                else:
-                    raise Exception(f"Unknown AI action: {plan.get('action')}")
+                # --- Step 1: Get the AI's plan, Step 2: Execute it (MonitorEngine.execute_plan) ---
+                with cancellable(token):
+                    plan, response_text = engine.answer(history_copy, status=set_status, on_events=lambda events: update_stats())
 
                 # --- Final Step: Show response and update history ---
                 chat_list.controls.remove(status_bubble)
                 chat_list.controls.append(create_chat_bubble(response_text, False))
-                chat_history.append({"role": "assistant", "content": response_text})
+                engine.remember("assistant", response_text)
                 chat_input.disabled = False
-                page.update()
+                flush_ui()
 
+            except QueryCancelled:
+                # v46: stopped by the user - drop the half-done answer
+                if status_bubble in chat_list.controls:
+                    chat_list.controls.remove(status_bubble)
+                chat_list.controls.append(create_chat_bubble("⏹️ Stopped.", False))
+                engine.remember("assistant", "(stopped by the user)")
+                chat_input.disabled = False
+                flush_ui()
             except Exception as ex:
                 import traceback
                 traceback.print_exc()
@@ -1535,12 +6245,17 @@ def main(page: Page):
                 
                 error_message = f"An error occurred: {str(ex)}"
                 chat_list.controls.append(create_chat_bubble(error_message, False))
-                chat_history.append({"role": "assistant", "content": error_message})
+                engine.remember("assistant", error_message)
                 chat_input.disabled = False
-                page.update()
+                flush_ui()
+            finally:
+                stop_btn.visible = False
+                flush_ui()
+                TELEMETRY.end_query(query)
         
         chat_input.on_submit = send_message
         send_btn = IconButton(icon=Icons.SEND_ROUNDED, bgcolor=get_color('PRIMARY'), icon_color=get_color('WHITE'), on_click=send_message, width=40, height=40)
+        stop_btn = IconButton(icon=Icons.STOP_ROUNDED, icon_color=get_color('ERROR'), tooltip="Stop", on_click=lambda e: engine.cancel('chat'), visible=False, width=40, height=40)
         
         # --- Enhanced Welcome Message (v25) ---
         chat_list.controls.clear() 
@@ -1548,7 +6263,7 @@ def main(page: Page):
         
         
         
-        ai_tab = Container(content=Column([Container(content=chat_list, bgcolor=get_color('CARD'), padding=20, border_radius=12, border=border.all(1, get_color('BORDER')) , expand=True), Container(height=16), Row([chat_input, send_btn], spacing=10)], expand=True), padding=padding.symmetric(horizontal=40, vertical=24))
+        ai_tab = Container(content=Column([Container(content=chat_list, bgcolor=get_color('CARD'), padding=20, border_radius=12, border=border.all(1, get_color('BORDER')) , expand=True), Container(height=16), Row([chat_input, stop_btn, send_btn], spacing=10)], expand=True), padding=padding.symmetric(horizontal=40, vertical=24))
         
         #
         # ==============================================================================
@@ -1562,19 +6277,33 @@ def main(page: Page):
         cpu_txt = Text("0%", size=32, weight=FontWeight.BOLD, color=get_color('TEXT'))
         ram_txt = Text("0%", size=32, weight=FontWeight.BOLD, color=get_color('TEXT'))
         disk_txt = Text("0%", size=32, weight=FontWeight.BOLD, color=get_color('TEXT'))
+        # v42: activity, not just capacity
+        disk_io_bar = ProgressBar(value=0, color=get_color('ERROR'), height=8, border_radius=4)
+        net_bar = ProgressBar(value=0, color=get_color('ACCENT'), height=8, border_radius=4)
+        disk_io_txt = Text("–", size=24, weight=FontWeight.BOLD, color=get_color('TEXT'))
+        net_txt = Text("–", size=24, weight=FontWeight.BOLD, color=get_color('TEXT'))
+        top_io_list = Column([Text("Measuring...", size=12, color=get_color('TEXT_LIGHT'))], spacing=6)
         
         def update_monitor():
             while True:
                 try:
-                    cpu = psutil.cpu_percent(interval=1)
-                    ram = psutil.virtual_memory().percent
-                    disk = psutil.disk_usage('/').percent
+                    sample = engine.sample_metrics()
+                    cpu, ram, disk = sample['cpu'], sample['ram'], sample['disk']
                     cpu_bar.value = cpu / 100
                     ram_bar.value = ram / 100
                     disk_bar.value = disk / 100
                     cpu_txt.value = f"{cpu:.1f}%"
                     ram_txt.value = f"{ram:.1f}%"
                     disk_txt.value = f"{disk:.1f}%"
+                    if 'disk_queue' in sample:
+                        disk_io_bar.value = min(sample['disk_queue'] / 2, 1.0)  # a queue of 2+ outstanding requests = saturated
+                        disk_io_txt.value = f"R {sample['disk_read']:.1f} / W {sample['disk_write']:.1f} MB/s · queue {sample['disk_queue']:.2f}"
+                    if 'net_recv' in sample:
+                        net_bar.value = min((sample['net_util'] or 0) / 100, 1.0)
+                        net_txt.value = f"↓ {sample['net_recv']:.2f} / ↑ {sample['net_sent']:.2f} MB/s" + (f" · {sample['net_util']:.0f}% of link" if sample['net_util'] is not None else "")
+                    if 'top_io' in sample:
+                        top_io_list.controls = [Row([Text(row['name'], size=13, color=get_color('TEXT'), expand=True), Text(f"{row['mb_s']:.2f} MB/s", size=13, color=get_color('TEXT_LIGHT'))]) for row in sample['top_io']] \
+                            or [Text("No process is doing I/O right now.", size=12, color=get_color('TEXT_LIGHT'))]
                     page.update()
                     time.sleep(2)
                 except:
@@ -1585,14 +6314,205 @@ def main(page: Page):
         def create_monitor_card(icon, color, title, value_txt, progress_bar):
             return Container(content=Column([Row([Icon(icon, size=32, color=color), Container(width=16), Column([Text(title, size=14, color=get_color('TEXT_LIGHT')), value_txt], spacing=4, expand=True)]), Container(height=16), progress_bar]), bgcolor=get_color('CARD'), padding=28, border_radius=12, border=border.all(1, get_color('BORDER')))
         
-        monitor_tab = Container(content=Column([Text("System Performance", size=20, weight=FontWeight.BOLD, color=get_color('TEXT')), Container(height=24), create_monitor_card(Icons.MEMORY_OUTLINED, get_color('PRIMARY'), "CPU", cpu_txt, cpu_bar), Container(height=20), create_monitor_card(Icons.STORAGE_OUTLINED, get_color('SUCCESS'), "Memory", ram_txt, ram_bar), Container(height=20), create_monitor_card(Icons.SAVE_OUTLINED, get_color('WARNING'), "Disk", disk_txt, disk_bar)], scroll=ScrollMode.AUTO, expand=True), padding=padding.symmetric(horizontal=40, vertical=24))
+        monitor_tab = Container(content=Column([Text("System Performance", size=20, weight=FontWeight.BOLD, color=get_color('TEXT')), Container(height=24), create_monitor_card(Icons.MEMORY_OUTLINED, get_color('PRIMARY'), "CPU", cpu_txt, cpu_bar), Container(height=20), create_monitor_card(Icons.STORAGE_OUTLINED, get_color('SUCCESS'), "Memory", ram_txt, ram_bar), Container(height=20), create_monitor_card(Icons.SAVE_OUTLINED, get_color('WARNING'), "Disk", disk_txt, disk_bar), Container(height=20), create_monitor_card(Icons.SPEED_OUTLINED, get_color('ERROR'), "Disk Activity", disk_io_txt, disk_io_bar), Container(height=20), create_monitor_card(Icons.NETWORK_CHECK_OUTLINED, get_color('ACCENT'), "Network", net_txt, net_bar), Container(height=20), Container(content=Column([Text("Top I/O Processes", size=14, color=get_color('TEXT_LIGHT')), Container(height=8), top_io_list]), bgcolor=get_color('CARD'), padding=28, border_radius=12, border=border.all(1, get_color('BORDER')))], scroll=ScrollMode.AUTO, expand=True), padding=padding.symmetric(horizontal=40, vertical=24))
         
-        tabs = Tabs(selected_index=0, animation_duration=250, indicator_color=get_color('PRIMARY'), label_color=get_color('PRIMARY'), unselected_label_color=get_color('TEXT_LIGHT'), tabs=[Tab(text="Events", icon=Icons.LIST_ALT_OUTLINED, content=events_tab), Tab(text="AI Assistant", icon=Icons.SMART_TOY_OUTLINED, content=ai_tab), Tab(text="Monitor", icon=Icons.MONITOR_HEART_OUTLINED, content=monitor_tab)], expand=True)
+        #
+        # ==============================================================================
+        # ⬇️ START OF DIAGNOSTICS TAB (v27) ⬇️
+        # ==============================================================================
+        #
+        diag_stage_list = Column([], spacing=6)
+        diag_counter_text = Text("", size=12, color=get_color('TEXT_LIGHT'), selectable=True)
+        diag_prompt_list = Column([], spacing=6)
+        diag_query_list = Column([], spacing=12)
+        diag_profile_text = Text("", size=11, color=get_color('TEXT'), font_family="Consolas", selectable=True)
+        diag_startup_text = Text("", size=11, color=get_color('TEXT'), font_family="Consolas", selectable=True)
+
+        def diag_cell(value, width, bold=False):
+            return Text(value, size=12, width=width, color=get_color('TEXT'), weight=FontWeight.W_600 if bold else None)
+
+        def refresh_diagnostics(e=None):
+            snapshot = TELEMETRY.snapshot()
+            diag_stage_list.controls.clear()
+            diag_stage_list.controls.append(Row([diag_cell("Stage", 140, True), diag_cell("Count", 70, True), diag_cell("Mean", 90, True), diag_cell("p50", 90, True), diag_cell("p99", 90, True), diag_cell("Max", 90, True), diag_cell("Total", 100, True)]))
+            for st in snapshot['stages']:
+                diag_stage_list.controls.append(Row([diag_cell(st['stage'], 140), diag_cell(str(st['count']), 70), diag_cell(f"{st['mean_ms']:.1f} ms", 90), diag_cell(f"≤{st['p50_ms']:.0f} ms", 90), diag_cell(f"≤{st['p99_ms']:.0f} ms", 90), diag_cell(f"{st['max_ms']:.0f} ms", 90), diag_cell(f"{st['total_ms'] / 1000:.2f} s", 100)]))
+            if not snapshot['stages']:
+                diag_stage_list.controls.append(Text("No spans recorded yet. Load events or ask the assistant something.", size=12, color=get_color('TEXT_LIGHT')))
+            diag_counter_text.value = "   ".join(f"{name}: {value}" for name, value in sorted(snapshot['counters'].items()))
+
+            # v36: token usage per prompt template
+            diag_prompt_list.controls.clear()
+            diag_prompt_list.controls.append(Row([diag_cell("Template", 180, True), diag_cell("Calls", 70, True), diag_cell("Prompt tok", 110, True), diag_cell("Cached", 110, True), diag_cell("Completion tok", 120, True)]))
+            for row in snapshot['prompts']:
+                cached_pct = row['cached_tokens'] / row['prompt_tokens'] * 100 if row['prompt_tokens'] else 0.0
+                diag_prompt_list.controls.append(Row([diag_cell(row['template'], 180), diag_cell(str(row['calls']), 70), diag_cell(f"{row['prompt_tokens']:,}", 110), diag_cell(f"{row['cached_tokens']:,} ({cached_pct:.0f}%)", 110), diag_cell(f"{row['completion_tokens']:,}", 120)]))
+            if not snapshot['prompts']:
+                diag_prompt_list.controls.append(Text("No LLM calls yet.", size=12, color=get_color('TEXT_LIGHT')))
+
+            diag_query_list.controls.clear()
+            for q in TELEMETRY.recent_queries():
+                total = q['total_ms'] or 1.0
+                rows = [Row([Text(q['label'], size=13, weight=FontWeight.W_600, color=get_color('TEXT'), expand=True), Text(f"{q['started'].strftime('%I:%M:%S %p')} • {q['total_ms'] / 1000:.2f} s", size=12, color=get_color('TEXT_LIGHT'))])]
+                for stage, ms in sorted(q['stages'].items(), key=lambda item: item[1], reverse=True):
+                    rows.append(Row([Text(stage, size=12, width=140, color=get_color('TEXT_LIGHT')), Container(content=ProgressBar(value=min(ms / total, 1.0), color=get_color('PRIMARY'), height=6, border_radius=3), expand=True), Text(f"{ms:.0f} ms", size=12, width=90, color=get_color('TEXT'))]))
+                diag_query_list.controls.append(Container(content=Column(rows, spacing=4), bgcolor=get_color('BG'), padding=12, border_radius=8))
+            if not diag_query_list.controls:
+                diag_query_list.controls.append(Text("No queries yet.", size=12, color=get_color('TEXT_LIGHT')))
+
+            diag_profile_text.value = TELEMETRY.profile_report()
+            diag_startup_text.value = STARTUP.report()
+            page.update()
+
+        def toggle_profiler(e):
+            TELEMETRY.set_profiling(e.control.value)
+            if e.control.value:
+                TELEMETRY.reset_profile()
+            refresh_diagnostics()
+
+        profiler_switch = Switch(label="cProfile queries", value=TELEMETRY.profiling, on_change=toggle_profiler, active_color=get_color('PRIMARY'))
+        diag_refresh_btn = ElevatedButton("Refresh", icon=Icons.REFRESH_ROUNDED, on_click=refresh_diagnostics, bgcolor=get_color('PRIMARY'), color=get_color('WHITE'), height=40)
+
+        diagnostics_tab = Container(content=Column([
+            Row([Text("Diagnostics", size=20, weight=FontWeight.BOLD, color=get_color('TEXT'), expand=True), profiler_switch, diag_refresh_btn], spacing=16),
+            Container(height=16),
+            Container(content=Column([Text("Stage Latency (all time)", size=16, weight=FontWeight.W_600, color=get_color('TEXT')), Container(height=12), diag_stage_list, Container(height=8), diag_counter_text]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
+            Container(height=20),
+            Container(content=Column([Text("LLM Tokens by Prompt Template", size=16, weight=FontWeight.W_600, color=get_color('TEXT')), Container(height=12), diag_prompt_list]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
+            Container(height=20),
+            Container(content=Column([Text("Recent Queries", size=16, weight=FontWeight.W_600, color=get_color('TEXT')), Container(height=12), diag_query_list]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
+            Container(height=20),
+            Container(content=Column([Text("Profiler (cumulative)", size=16, weight=FontWeight.W_600, color=get_color('TEXT')), Container(height=12), diag_profile_text]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
+            Container(height=20),
+            Container(content=Column([Text("Startup", size=16, weight=FontWeight.W_600, color=get_color('TEXT')), Container(height=12), diag_startup_text]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
+        ], scroll=ScrollMode.AUTO, expand=True), padding=padding.symmetric(horizontal=40, vertical=24))
+        #
+        # ==============================================================================
+        # ⬆️ END OF DIAGNOSTICS TAB (v27) ⬆️
+        # ==============================================================================
+        #
+
+        #
+        # ==============================================================================
+        # ⬇️ START OF ALERTS TAB (v37) ⬇️
+        # ==============================================================================
+        #
+        rule_input = TextField(label="New watch rule", hint_text="id=6008   |   log=Application type=Error source=chrome count>20 within=5m   |   cpu>90 for=3m", expand=True, border_radius=8, filled=True, dense=True, bgcolor=get_color('BG'))
+        rule_list = Column([], spacing=6)
+        alert_list = Column([], spacing=8)
+
+        def refresh_alerts():
+            rule_list.controls.clear()
+            for rule in list(engine.rules.rules.values()):
+                rule_list.controls.append(Row([Icon(Icons.NOTIFICATIONS_ACTIVE_OUTLINED, size=18, color=get_color('PRIMARY')), Text(rule.name, size=13, color=get_color('TEXT'), expand=True), IconButton(icon=Icons.DELETE_OUTLINE, icon_size=18, icon_color=get_color('TEXT_LIGHT'), tooltip="Remove rule", on_click=lambda e, rule_id=rule.rule_id: remove_rule(rule_id))]))
+            if not rule_list.controls:
+                rule_list.controls.append(Text("No watch rules yet.", size=12, color=get_color('TEXT_LIGHT')))
+            alert_list.controls.clear()
+            for alert in list(engine.rules.alerts)[:50]:
+                alert_list.controls.append(Container(content=Column([Text(f"🔔 {alert['rule']}", size=13, weight=FontWeight.W_600, color=get_color('TEXT')), Text(f"{alert['time'].replace('T', ' ')} • {alert['message']}", size=12, color=get_color('TEXT_LIGHT'), selectable=True)], spacing=4), bgcolor=get_color('BG'), padding=12, border_radius=8))
+            if not alert_list.controls:
+                alert_list.controls.append(Text("No alerts yet.", size=12, color=get_color('TEXT_LIGHT')))
+            page.update()
+
+        def add_rule(e):
+            try:
+                engine.add_rule(rule_input.value.strip())
+                rule_input.value = ""
+            except Exception as ex:
+                page.snack_bar = SnackBar(content=Row([Icon(Icons.ERROR, color="#ffffff", size=20), Text(f"Error: {str(ex)}", color="#ffffff")], spacing=8), bgcolor=get_color('ERROR'))
+                page.snack_bar.open = True
+            refresh_alerts()
+
+        def remove_rule(rule_id):
+            engine.remove_rule(rule_id)
+            refresh_alerts()
+
+        def show_alert(alert):
+            # Called from the tail / monitor threads.
+            page.snack_bar = SnackBar(content=Row([Icon(Icons.NOTIFICATIONS_ACTIVE, color="#ffffff", size=20), Text(f"Alert: {alert['message'][:140]}", color="#ffffff")], spacing=8), bgcolor=get_color('WARNING'))
+            page.snack_bar.open = True
+            refresh_alerts()
+
+        engine.on_alert = show_alert
+        rule_input.on_submit = add_rule
+        add_rule_btn = ElevatedButton("Add Rule", icon=Icons.ADD_ALERT_OUTLINED, on_click=add_rule, bgcolor=get_color('PRIMARY'), color=get_color('WHITE'), height=40)
+
+        alerts_tab = Container(content=Column([
+            Text("Watch Rules", size=20, weight=FontWeight.BOLD, color=get_color('TEXT')),
+            Container(height=16),
+            Container(content=Column([Row([rule_input, add_rule_btn], spacing=10), Container(height=12), rule_list]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
+            Container(height=20),
+            Container(content=Column([Text("Recent Alerts", size=16, weight=FontWeight.W_600, color=get_color('TEXT')), Container(height=12), alert_list]), bgcolor=get_color('CARD'), padding=24, border_radius=12, border=border.all(1, get_color('BORDER'))),
+        ], scroll=ScrollMode.AUTO, expand=True), padding=padding.symmetric(horizontal=40, vertical=24))
+        # ==============================================================================
+        # ⬆️ END OF ALERTS TAB (v37) ⬆️
+        # ==============================================================================
+        #
+
+        def handle_tab_change(e):
+            if e.control.selected_index == 3:
+                refresh_diagnostics()
+            elif e.control.selected_index == 4:
+                refresh_alerts()
+
+        tabs = Tabs(selected_index=0, animation_duration=250, indicator_color=get_color('PRIMARY'), label_color=get_color('PRIMARY'), unselected_label_color=get_color('TEXT_LIGHT'), tabs=[Tab(text="Events", icon=Icons.LIST_ALT_OUTLINED, content=events_tab), Tab(text="AI Assistant", icon=Icons.SMART_TOY_OUTLINED, content=ai_tab), Tab(text="Monitor", icon=Icons.MONITOR_HEART_OUTLINED, content=monitor_tab), Tab(text="Diagnostics", icon=Icons.SPEED_OUTLINED, content=diagnostics_tab), Tab(text="Alerts", icon=Icons.NOTIFICATIONS_OUTLINED, content=alerts_tab)], on_change=handle_tab_change, expand=True)
         
         page.add(Column([header, stats_row, tabs], spacing=0, expand=True))
         page.bgcolor = get_color('BG')
     
-    build_ui()
+    with STARTUP.phase("build UI"):
+        page.clean()
+        build_ui()
+        page.update()
+    STARTUP.mark_interactive()
+
+    # v43: background work starts only once the dashboard is usable
+    engine.start_watch()
+    if engine.archive:
+        engine.start_archiver()
+    engine.start_digest()
+    engine.start_process_tracker()
+    engine.warm_up()
+
+STARTUP.record("import event.py", _IMPORT_STARTED, time.perf_counter())
 
 if __name__ == "__main__":
-    ft.app(target=main)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Event Monitor Pro")
+    parser.add_argument('--headless', action='store_true', help="run the engine and its local HTTP/JSON API without the GUI")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--insecure', action='store_true', help="allow --host to be a non-loopback address without EVENT_MONITOR_TOKEN")
+    parser.add_argument('--collect-interval', type=int, default=5, help="seconds between metric samples (0 disables collection)")
+    parser.add_argument('--hosts', default=os.environ.get("EVENT_MONITOR_HOSTS", ""), help="comma-separated hosts (Windows names or http:// engine URLs) for fleet queries")
+    parser.add_argument('--archive', default=os.environ.get("EVENT_MONITOR_ARCHIVE", ""), help="path of an .evarc archive to keep event history in")
+    parser.add_argument('--archive-interval', type=int, default=900, help="seconds between archive syncs")
+    parser.add_argument('--rules', default=os.environ.get("EVENT_MONITOR_RULES", DEFAULT_RULES_PATH), help="JSON file the watch rules are kept in")
+    parser.add_argument('--digest-interval', type=int, default=300, help="seconds between digest refreshes (0 disables digests)")
+    parser.add_argument('--process-interval', type=float, default=ProcessTracker.INTERVAL, help="seconds between process-list polls (0 disables the process tracker)")
+    parser.add_argument('--process-history', default=os.environ.get("EVENT_MONITOR_PROCESS_HISTORY", DEFAULT_PROCESS_HISTORY_PATH), help="JSON lines file process start/exit history is kept in")
+    parser.add_argument('--export', metavar='PATH', help="stream a log to PATH (.jsonl, .csv or .parquet, optionally .gz) and exit")
+    parser.add_argument('--export-log', default='System', help="log(s) to export, comma-separated or \"All Logs\"")
+    parser.add_argument('--export-max', type=int, default=10**9, help="most events to export (default: the whole log)")
+    args = parser.parse_args()
+
+    if args.export:
+        log_types = [t.strip() for t in args.export_log.split(",") if t.strip()]
+        summary = MonitorEngine(os.environ.get("OPENAI_API_KEY", "")).export_events(
+            args.export, log_type=log_types if len(log_types) > 1 else log_types[0], max_records=args.export_max)
+        print(f"📦 Exported {summary['events']:,} events ({summary['explained']:,} explained) to {summary['path']} "
+              f"- {summary['bytes'] / (1024 * 1024):.1f} MB in {summary['seconds']:.1f} s")
+    elif args.headless:
+        # OPENAI_API_KEY, EVENT_MONITOR_TOKEN (this API) and EVENT_MONITOR_HOST_TOKEN (sent to fleet
+        # engines) come from the environment in headless mode.
+        token = os.environ.get("EVENT_MONITOR_TOKEN") or None
+        error = _unauthenticated_bind_error(args.host, token, args.insecure)
+        if error:
+            parser.error(error)
+        run_headless(os.environ.get("OPENAI_API_KEY", ""), args.host, args.port, args.collect_interval, token,
+                     hosts=[h.strip() for h in args.hosts.split(",") if h.strip()], archive_path=args.archive or None, archive_interval=args.archive_interval,
+                     rules_path=args.rules or None, digest_interval=args.digest_interval,
+                     process_interval=args.process_interval, process_history_path=args.process_history or None,
+                     host_token=os.environ.get("EVENT_MONITOR_HOST_TOKEN") or None, insecure=args.insecure)
+    else:
+        _import_flet().app(target=main)
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Shared test setup: the synthetic win32 event logs from bench.py stand in for
+win32evtlog / win32evtlogutil / pywintypes, so event.py imports and runs on
+any platform without Windows, an OpenAI key or the GUI.
+"""
+import datetime
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import bench  # noqa: E402
+
+NOW = datetime.datetime.now().replace(microsecond=0)
+LOGS = bench.SyntheticEventLogs({log_type: bench.generate_corpus(log_type, 2000, span_hours=24, end_time=NOW)
+                                 for log_type in ('System', 'Application', 'Security')})
+LOGS.install()
+
+import event  # noqa: E402
+
+
+def make_record(record_number, when, event_id=7036, source='Service Control Manager', message='The {0} service entered the {1} state.',
+                inserts=('Print Spooler', 'running'), event_type=bench.EVENTLOG_INFORMATION_TYPE, computer='DESKTOP-TEST'):
+    """One synthetic win32 record; `when` is a datetime."""
+    ts = bench.PyTime(when.year, when.month, when.day, when.hour, when.minute, when.second)
+    return bench.SyntheticRecord(record_number, ts, event_id, event_type, source, computer, list(inserts), message)
+
+
+@pytest.fixture
+def logs():
+    """The installed synthetic logs. Tests may replace `logs.corpora[...]`; the originals are restored afterwards."""
+    saved = dict(LOGS.corpora)
+    yield LOGS
+    LOGS.corpora.clear()
+    LOGS.corpora.update(saved)
+
+
+@pytest.fixture
+def api():
+    """A headless engine's HTTP handler on 127.0.0.1 with token 'secret'; yields a request helper."""
+    engine = event.MonitorEngine('sk-test')
+    handler = type('TestEngineHandler', (event._EngineRequestHandler,), {'engine': engine, 'token': 'secret'})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def call(path, body=None, token='secret'):
+        request = urllib.request.Request(base + path, data=json.dumps(body).encode('utf-8') if body is not None else None)
+        if token:
+            request.add_header('Authorization', f"Bearer {token}")
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    call.engine = engine
+    yield call
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from conftest import event
+
+
+def test_requests_without_the_token_are_rejected(api):
+    assert api('/health', token=None)[0] == 401
+    assert api('/health', token='wrong')[0] == 401
+    assert api('/rules', {'rule': 'id=6008'}, token=None)[0] == 401
+    assert not api.engine.rules.rules
+    status, body = api('/health')
+    assert status == 200 and json.loads(body)['status'] == 'ok'
+
+
+def test_events_stats_and_facets(api):
+    status, body = api('/events?log_type=System&max_records=25&types=Error,Warning')
+    events = json.loads(body)['events']
+    assert status == 200 and 0 < len(events) <= 25
+    assert {evt['event_type'] for evt in events} <= {'Error', 'Warning'}
+    stats = json.loads(api('/stats')[1])
+    assert stats['total'] == len(events) == stats['errors'] + stats['warnings']
+    facets = json.loads(api('/facets?type=Error')[1])
+    assert all(evt['event_type'] == 'Error' for evt in facets['events'])
+    assert sum(n for _, n in facets['facets']['type']) == len(events)
+
+
+def test_rules_round_trip_and_errors(api):
+    status, body = api('/rules', {'rule': 'source=chrome count>2 within=1m'})
+    assert status == 200
+    rule_id = json.loads(body)['rule']['id']
+    assert [rule['id'] for rule in json.loads(api('/rules')[1])['rules']] == [rule_id]
+    assert api('/rules', {'rule': 'bogus=1'})[0] == 400
+    assert api('/rules', {})[0] == 400
+    assert json.loads(api('/rules/delete', {'id': rule_id})[1]) == {'removed': True}
+    assert api('/nope')[0] == 404 and api('/nope', {})[0] == 404
+    assert api('/ask', {})[0] == 400
+
+
+def test_public_bind_needs_a_token():
+    assert event._unauthenticated_bind_error('127.0.0.1', None) is None
+    assert event._unauthenticated_bind_error('localhost', None) is None
+    assert event._unauthenticated_bind_error('::1', None) is None
+    assert 'EVENT_MONITOR_TOKEN' in event._unauthenticated_bind_error('0.0.0.0', None)
+    assert event._unauthenticated_bind_error('0.0.0.0', 'secret') is None
+    assert event._unauthenticated_bind_error('0.0.0.0', None, insecure=True) is None
+    with pytest.raises(ValueError):
+        event.run_headless('sk-test', host='0.0.0.0', port=0)
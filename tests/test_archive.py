@@ -0,0 +1,147 @@
+import datetime
+import os
+import threading
+
+import pytest
+
+from conftest import NOW, event, make_record
+
+
+def _synced_archive(tmp_path, log_types=('System', 'Application')):
+    archive = event.EventArchive(str(tmp_path / 'history.evarc'))
+    reader = event.EventLogReader()
+    for log_type in log_types:
+        archive.sync_from_log(reader, log_type)
+    return archive
+
+
+def _row(evt):
+    return (evt['record_number'], evt['source'], evt['event_id'], evt['event_type'], int(evt.timestamp),
+            evt['computer'], evt['message'], evt['log_type'])
+
+
+def test_round_trip_keeps_every_field(tmp_path):
+    reader = event.EventLogReader()
+    archive = event.EventArchive(str(tmp_path / 'history.evarc'))
+    live = reader.read_events('System', max_records=10**9)
+    assert archive.append(live, 'System') == len(live)
+
+    reopened = event.EventArchive(archive.path)
+    assert sorted(map(_row, reopened.scan())) == sorted(map(_row, live))
+
+
+def test_scan_is_newest_first_across_logs(tmp_path):
+    archive = _synced_archive(tmp_path)
+    times = [evt.timestamp for evt in archive.scan()]
+    assert times == sorted(times, reverse=True)
+
+    newest = archive.read_events(max_records=200)
+    assert {evt['log_type'] for evt in newest} == {'System', 'Application'}
+    assert newest[0].timestamp == max(times)
+
+
+def test_scan_filters_match_read_events(tmp_path):
+    archive = _synced_archive(tmp_path)
+    start = NOW - datetime.timedelta(hours=6)
+    found = list(archive.scan(start_datetime=start, event_ids=[6008, 41], log_types=['System']))
+    live = [evt for evt in event.EventLogReader().read_events('System', max_records=10**9, start_datetime=start)
+            if evt['event_id'] in (6008, 41) and evt.timestamp >= int(start.timestamp())]
+    assert sorted(evt['record_number'] for evt in found) == sorted(evt['record_number'] for evt in live)
+
+    by_keyword = list(archive.scan(keywords=['print spooler'], log_types=['System']))
+    assert by_keyword and all('print spooler' in evt['message'].lower() for evt in by_keyword)
+    by_source = list(archive.scan(sources=['control manager']))
+    assert by_source and {evt['source'] for evt in by_source} == {'Service Control Manager'}
+
+
+def test_resync_does_not_duplicate(tmp_path, logs):
+    base = NOW - datetime.timedelta(hours=1)
+    logs.corpora['System'] = [make_record(n, base + datetime.timedelta(minutes=n)) for n in range(1, 11)]
+    archive = _synced_archive(tmp_path, ('System',))
+    assert archive.info()['events'] == 10
+    assert archive.sync_from_log(event.EventLogReader(), 'System') == 0
+
+    logs.corpora['System'] = logs.corpora['System'] + [make_record(11, base + datetime.timedelta(minutes=11))]
+    assert archive.sync_from_log(event.EventLogReader(), 'System') == 1
+    assert archive.info()['events'] == 11
+
+
+def test_concurrent_appends_and_scans_keep_the_file_valid(tmp_path):
+    archive = event.EventArchive(str(tmp_path / 'history.evarc'))
+    base = NOW - datetime.timedelta(days=1)
+    batches = [[event.EventRecord('Writer', 1, 'Information', (base + datetime.timedelta(seconds=w * 1000 + i)).timestamp(),
+                                  'DESKTOP-TEST', f"writer {w} row {i}", 'System', w * 1000 + i + 1)
+                for i in range(300)] for w in range(8)]
+    archive.append(batches[0])
+    errors, scanned = [], []
+
+    def write(batch):
+        try:
+            archive.append(batch)
+        except Exception as exc:
+            errors.append(exc)
+
+    def read():
+        try:
+            scan = archive.scan()
+            scanned.append(sum(1 for _ in scan))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write, args=(batch,)) for batch in batches[1:]]
+    threads += [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert all(n % 300 == 0 and n >= 300 for n in scanned)
+    reopened = event.EventArchive(archive.path)
+    assert reopened.info()['events'] == 2400
+    assert len(list(reopened.scan())) == 2400
+
+
+def test_sync_survives_a_cleared_log(tmp_path, logs):
+    base = NOW - datetime.timedelta(hours=2)
+    logs.corpora['System'] = [make_record(n, base + datetime.timedelta(minutes=n)) for n in range(1, 11)]
+    archive = _synced_archive(tmp_path, ('System',))
+    assert archive.watermarks['System'] == 10
+
+    # Cleared: RecordNumber restarts at 1 for newer events.
+    cleared_at = base + datetime.timedelta(minutes=30)
+    logs.corpora['System'] = [make_record(n, cleared_at + datetime.timedelta(minutes=n)) for n in range(1, 4)]
+    assert archive.sync_from_log(event.EventLogReader(), 'System') == 3
+    assert archive.watermarks['System'] == 3
+    assert archive.sync_from_log(event.EventLogReader(), 'System') == 0
+
+    logs.corpora['System'].append(make_record(4, cleared_at + datetime.timedelta(minutes=4)))
+    assert archive.sync_from_log(event.EventLogReader(), 'System') == 1
+    assert event.EventArchive(archive.path).info()['events'] == 14
+
+
+def test_interrupted_append_leaves_a_readable_archive(tmp_path, monkeypatch):
+    archive = _synced_archive(tmp_path, ('System',))
+    before = sorted(map(_row, archive.scan()))
+    base = NOW + datetime.timedelta(minutes=1)
+    extra = [event.EventRecord('Test', 1, 'Error', (base + datetime.timedelta(seconds=i)).timestamp(), 'PC', f'late {i}', 'System', 10**6 + i)
+             for i in range(10)]
+
+    original = event.EventArchive._footer_bytes
+
+    def crash_on_the_new_footer(self, data_end=None):
+        if data_end is None:
+            raise OSError('disk full')
+        return original(self, data_end)
+
+    monkeypatch.setattr(event.EventArchive, '_footer_bytes', crash_on_the_new_footer)
+    with pytest.raises(OSError):
+        archive.append(extra, 'System')
+    monkeypatch.setattr(event.EventArchive, '_footer_bytes', original)
+
+    reopened = event.EventArchive(archive.path)
+    assert sorted(map(_row, reopened.scan())) == before
+    assert sorted(map(_row, archive.scan())) == before
+    assert archive.append(extra, 'System') == 10
+    assert len(list(event.EventArchive(archive.path).scan())) == len(before) + 10
+    assert not os.path.exists(archive.backup_path)
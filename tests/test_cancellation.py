@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from conftest import event
+
+
+def test_checkpoints_see_the_thread_local_token():
+    token = event.CancelToken()
+    event.check_cancelled()  # no token: never cancelled
+    with event.cancellable(token):
+        event.check_cancelled()
+        token.cancel()
+        with pytest.raises(event.QueryCancelled):
+            event.check_cancelled()
+    event.check_cancelled()
+    assert event.current_cancel_token() is None
+
+
+def test_linked_token_is_cancelled_only_when_all_are():
+    a, b = event.CancelToken(), event.CancelToken()
+    shared = event.CancelToken([a, b])
+    a.cancel()
+    assert not shared.cancelled
+    b.cancel()
+    assert shared.cancelled
+
+
+def test_cancelling_a_scan_stops_it_at_the_next_read_batch():
+    token = event.CancelToken()
+    token.cancel()
+    reader = event.EventLogReader()
+    with event.cancellable(token), pytest.raises(event.QueryCancelled):
+        reader.read_events('System', max_records=10**9)
+
+
+def _run_concurrently(flight, key, fn, tokens):
+    results, errors = [None] * len(tokens), [None] * len(tokens)
+
+    def call(i):
+        try:
+            with event.cancellable(tokens[i]):
+                results[i] = flight.do(key, fn)
+        except BaseException as exc:
+            errors[i] = exc
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(tokens))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    return threads, results, errors
+
+
+def test_single_flight_shares_one_execution():
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+
+    flight = event.SingleFlight('test_shared')
+    before = event.TELEMETRY.counters['test_shared_deduplicated']
+    threads, results, errors = _run_concurrently(flight, 'key', work, [event.CancelToken() for _ in range(4)])
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1] and results == ['answer'] * 4 and errors == [None] * 4
+    assert event.TELEMETRY.counters['test_shared_deduplicated'] - before == 3
+    assert flight.do('key', lambda: 'fresh') == 'fresh'  # finished flights are not cached
+
+
+def test_single_flight_raises_the_error_to_every_caller():
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise ValueError('boom')
+
+    flight = event.SingleFlight('test')
+    threads, results, errors = _run_concurrently(flight, 'key', work, [event.CancelToken() for _ in range(3)])
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(err, ValueError) for err in errors)
+
+
+def test_wrap_keys_calls_by_arguments():
+    calls = []
+    flight = event.SingleFlight('test')
+
+    @flight.wrap
+    def lookup(event_id, log_type='System'):
+        calls.append((event_id, log_type))
+        return event_id
+
+    assert lookup.__name__ == 'lookup'
+    assert lookup(41, log_type='System') == 41
+    assert lookup(6008) == 6008
+    assert calls == [(41, 'System'), (6008, 'System')]
+
+
+def test_single_flight_keeps_running_until_every_caller_cancels():
+    release, stopped = threading.Event(), threading.Event()
+
+    def work():
+        while not release.wait(0.01):
+            try:
+                event.check_cancelled()
+            except event.QueryCancelled:
+                stopped.set()
+                raise
+        return 'done'
+
+    tokens = [event.CancelToken(), event.CancelToken()]
+    flight = event.SingleFlight('test')
+    threads, results, errors = _run_concurrently(flight, 'key', work, tokens)
+    tokens[1].cancel()
+    threads[1].join(2)
+    assert isinstance(errors[1], event.QueryCancelled) and not stopped.is_set()
+    tokens[0].cancel()
+    threads[0].join(2)
+    assert stopped.is_set() and isinstance(errors[0], event.QueryCancelled)
@@ -0,0 +1,47 @@
+import datetime
+
+from conftest import NOW, event, make_record
+
+
+def _records(first, count, start):
+    return [make_record(n, start + datetime.timedelta(seconds=10 * (n - first))) for n in range(first, first + count)]
+
+
+def test_refresh_counts_the_whole_gap_since_the_watermark(logs):
+    start = NOW - datetime.timedelta(hours=2)
+    logs.corpora['System'] = _records(1, 40, start)
+    engine = event.MonitorEngine('sk-test')
+    assert engine.refresh_digest(('System',), backfill_records=25) == 25
+    assert engine.digest.watermarks['System'] == 40
+
+    # 75 new records, more than one refresh chunk: none of them may be skipped.
+    logs.corpora['System'] = logs.corpora['System'] + _records(41, 75, start + datetime.timedelta(minutes=30))
+    assert engine.refresh_digest(('System',), backfill_records=25) == 75
+    assert engine.digest.watermarks['System'] == 115
+    assert engine.refresh_digest(('System',), backfill_records=25) == 0
+    summary = engine.digest.summarize(start - datetime.timedelta(hours=1), NOW)
+    assert summary['total'] == 100
+
+
+def test_capped_backfill_only_claims_what_it_read(logs):
+    start = NOW - datetime.timedelta(hours=10)
+    logs.corpora['System'] = [make_record(n, start + datetime.timedelta(minutes=5 * n)) for n in range(1, 101)]
+    engine = event.MonitorEngine('sk-test')
+    engine.refresh_digest(('System',), backfill_records=30)
+    oldest_read = start + datetime.timedelta(minutes=5 * 71)
+    assert engine.digest.covered_since['System'] == oldest_read.timestamp()
+    assert not engine.digest.covers(start, log_types=('System',))
+    assert engine.digest.covers(oldest_read, log_types=('System',))
+
+
+def test_digest_buckets_crashes_and_matches_intents():
+    digest = event.EventDigest()
+    when = NOW - datetime.timedelta(hours=1)
+    crash = event.EventRecord('EventLog', 6008, 'Error', when.timestamp(), 'DESKTOP-TEST', 'unexpected shutdown', 'System', 1)
+    app_error = event.EventRecord('Application Error', 1000, 'Error', when.timestamp(), 'DESKTOP-TEST', 'chrome.exe', 'Application', 1)
+    assert digest.add_events([crash, app_error]) == 2
+    assert digest.add_events([crash]) == 0  # already seen
+    summary = digest.summarize(when - datetime.timedelta(minutes=1), NOW)
+    assert summary['total'] == 2 and len(summary['crashes']) == 2
+    assert event.EventDigest.match_intent("what happened last night?") == ('last_night', 'overview')
+    assert event.EventDigest.match_intent("did my pc crash yesterday") == ('yesterday', 'crashes')
@@ -0,0 +1,95 @@
+import csv
+import gzip
+import io
+import json
+import os
+
+import pytest
+
+from conftest import LOGS, event
+
+
+def _known(evt):
+    return event.KNOWLEDGE_BASE.explain(evt['event_id'], evt['source'], evt['message']) is not None
+
+
+def test_jsonl_export_has_every_event_and_known_explanations(tmp_path):
+    engine = event.MonitorEngine('sk-test')
+    path = str(tmp_path / 'system.jsonl')
+    summary = engine.export_events(path, log_type='System', max_records=10**9)
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert summary['events'] == len(rows) == len(LOGS.corpora['System'])
+    assert summary['format'] == 'jsonl' and summary['bytes'] == os.path.getsize(path)
+    assert not os.path.exists(path + '.part')
+    times = [row['time_generated'] for row in rows[:2]]
+    assert set(rows[0]) >= set(event.EventRecord.FIELDS) and times
+    explained = [row for row in rows if 'explanation' in row]
+    assert summary['explained'] == len(explained) > 0
+    assert all(_known(row) == ('explanation' in row) for row in rows)
+    assert set(explained[0]['explanation']) == set(event.EventKnowledgeBase.FIELDS)
+
+
+def test_export_without_explanations(tmp_path):
+    engine = event.MonitorEngine('sk-test')
+    path = str(tmp_path / 'app.jsonl')
+    summary = engine.export_events(path, explanations=False, log_type='Application', max_records=50)
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert summary['events'] == len(rows) == 50 and summary['explained'] == 0
+    assert not any('explanation' in row for row in rows)
+
+
+def test_gzip_csv_export_round_trips(tmp_path):
+    engine = event.MonitorEngine('sk-test')
+    path = str(tmp_path / 'all.csv.gz')
+    summary = engine.export_events(path, log_type=['System', 'Application'], max_records=300)
+    assert summary['compression'] == 'gzip' and summary['format'] == 'csv'
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert tuple(rows[0]) == event.EventExporter.COLUMNS
+    assert len(rows) - 1 == summary['events'] == 300
+    assert {row[event.EventExporter.COLUMNS.index('log_type')] for row in rows[1:]} == {'System', 'Application'}
+    title = event.EventExporter.COLUMNS.index('explanation_title')
+    assert sum(1 for row in rows[1:] if row[title]) == summary['explained']
+
+
+def test_failed_export_removes_the_partial_file(tmp_path):
+    def events():
+        yield from event.EventLogReader().iter_events('System', 10)
+        raise OSError('log went away')
+
+    path = str(tmp_path / 'broken.jsonl')
+    with pytest.raises(OSError):
+        event.EventExporter('jsonl').export(events(), path)
+    assert os.listdir(tmp_path) == []
+
+
+def test_write_streams_into_any_binary_file_and_infers_formats():
+    out = io.BytesIO()
+    exporter = event.EventExporter('jsonl')
+    assert exporter.write(event.EventLogReader().iter_events('System', 5), out, 'gzip') == 5
+    assert len(gzip.decompress(out.getvalue()).decode('utf-8').splitlines()) == 5
+    assert event.EventExporter.infer('x.ndjson.gz') == ('jsonl', 'gzip')
+    assert event.EventExporter.infer('x.CSV') == ('csv', None)
+    assert event.EventExporter.infer('x.pq') == ('parquet', None)
+    with pytest.raises(ValueError):
+        event.EventExporter('xml')
+
+
+def test_http_export_streams_the_same_rows(api):
+    status, body = api('/export?log_type=System&max_records=40&format=csv&gzip=1&explanations=0')
+    rows = list(csv.reader(io.StringIO(gzip.decompress(body).decode('utf-8'))))
+    assert status == 200 and len(rows) == 41 and not any(rows[1][len(event.EventRecord.FIELDS):])
+    status, body = api('/export?log_type=System&max_records=40')
+    lines = body.decode('utf-8').splitlines()
+    assert len(lines) == 40 and any('explanation' in json.loads(line) for line in lines)
+    assert api('/export?format=parquet')[0] == 400
+
+
+@pytest.mark.skipif(event._lazy_import('pyarrow') is not None, reason='checks the message shown without pyarrow')
+def test_parquet_without_pyarrow_fails_cleanly(tmp_path):
+    path = str(tmp_path / 'system.parquet')
+    with pytest.raises(Exception, match='pyarrow'):
+        event.EventExporter('parquet').export(event.EventLogReader().iter_events('System', 10), path)
+    assert os.listdir(tmp_path) == []
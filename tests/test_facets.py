@@ -0,0 +1,50 @@
+import datetime
+
+from conftest import NOW, event
+
+
+def _events(n):
+    """n events, newest first (display order), cycling types and sources."""
+    types = ('Error', 'Warning', 'Information')
+    sources = ('EventLog', 'Service Control Manager')
+    return [event.EventRecord(sources[i % 2], 6000 + i % 4, types[i % 3], (NOW - datetime.timedelta(minutes=i)).timestamp(),
+                              'DESKTOP-TEST', f"event {i}", 'System', n - i) for i in range(n)]
+
+
+def _brute(events, selection):
+    keys = event.EventFacets.FACETS
+    return [evt for evt in events if all(not values or keys[facet](evt) in values for facet, values in selection.items())]
+
+
+def test_selection_matches_a_brute_force_filter_in_display_order():
+    events = _events(50)
+    facets = event.EventFacets()
+    facets.reset(events)
+    for selection in ({}, {'type': {'Error'}}, {'type': {'Error', 'Warning'}, 'source': {'EventLog'}}, {'id': {6001}, 'type': {'Information'}}):
+        assert facets.select(selection) == _brute(events, selection)
+    assert facets.select({'type': {'Error'}}, limit=3) == _brute(events, {'type': {'Error'}})[:3]
+
+
+def test_counts_of_a_facet_ignore_its_own_selection():
+    events = _events(30)
+    facets = event.EventFacets()
+    facets.reset(events)
+    counts = facets.facet_counts({'type': {'Error'}, 'source': {'EventLog'}})
+    assert dict(counts['type']) == {t: sum(1 for e in _brute(events, {'source': {'EventLog'}}) if e['event_type'] == t)
+                                    for t in ('Error', 'Warning', 'Information')}
+    errors = _brute(events, {'type': {'Error'}})
+    assert dict(counts['source']) == {s: sum(1 for e in errors if e['source'] == s) for s in ('EventLog', 'Service Control Manager')}
+
+
+def test_incremental_add_and_discard_match_a_rebuild():
+    events = _events(40)
+    facets = event.EventFacets()
+    facets.reset(events[10:])
+    facets.add(events[:10])  # newer events from the live tail
+    facets.discard(events[-5:])  # trimmed off the end
+    kept = events[:-5]
+    assert facets.select() == kept
+    assert facets.select({'type': {'Warning'}}) == _brute(kept, {'type': {'Warning'}})
+    rebuilt = event.EventFacets()
+    rebuilt.reset(kept)
+    assert {f: dict(c) for f, c in facets.facet_counts(top=100).items()} == {f: dict(c) for f, c in rebuilt.facet_counts(top=100).items()}
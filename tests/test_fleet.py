@@ -0,0 +1,54 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from conftest import event
+
+
+@pytest.fixture
+def engine_urls():
+    """Two stand-in headless engines on 127.0.0.1, different ports."""
+    servers = []
+    for _ in range(2):
+        engine = event.MonitorEngine('sk-test')
+        handler = type('TestEngineHandler', (event._EngineRequestHandler,), {'engine': engine, 'token': None})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    yield [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_engines_on_one_host_stay_distinct(engine_urls):
+    sources = [event.make_host_source(url) for url in engine_urls]
+    assert [source.name for source in sources] == [url[len('http://'):] for url in engine_urls]
+
+    fleet = event.FleetQuery(sources, max_workers=2, timeout=30)
+    merged = fleet.read_events(max_records=100, log_type='System')
+    assert set(fleet.last_status) == {source.name for source in sources}
+    assert all(status['status'] == 'ok' for status in fleet.last_status.values())
+    assert {evt['host'] for evt in merged} == {source.name for source in sources}
+    times = [evt.timestamp for evt in merged]
+    assert len(merged) == 100 and times == sorted(times, reverse=True)
+
+
+class _SlowSource:
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+
+    def system_stats(self):
+        time.sleep(self.delay)
+        return f"{self.name} ok"
+
+
+def test_each_host_gets_its_own_timeout():
+    # One worker: the second host starts only after the first finishes, so a
+    # deadline counted from queueing would time it out.
+    fleet = event.FleetQuery([_SlowSource('127.0.0.1:8765', 0.3), _SlowSource('127.0.0.1:8766', 0.3)], max_workers=1, timeout=0.5)
+    assert fleet.system_stats() == {'127.0.0.1:8765': '127.0.0.1:8765 ok', '127.0.0.1:8766': '127.0.0.1:8766 ok'}
@@ -0,0 +1,70 @@
+import re
+
+import pytest
+
+from conftest import event
+
+CASES = [
+    (6005, 'EventLog', "The Event log service was started.", ['Event Log Service Started']),
+    (6006, 'EventLog', "The Event log service was stopped.", ['Event Log Service Stopped']),
+    (6008, 'EventLog', "The previous system shutdown at 2:14:07 AM on \u200e11/\u200e6/\u200e2025 was unexpected.", ['2:14:07 AM on 11/6/2025']),
+    (1074, 'User32', "The process C:\\Windows\\system32\\winlogon.exe (DESKTOP-TEST) has initiated the restart of computer DESKTOP-TEST "
+                     "on behalf of user DESKTOP-TEST\\alice for the following reason: No title for this reason could be found",
+     ['winlogon.exe', 'restart of DESKTOP-TEST', 'DESKTOP-TEST\\alice']),
+    (41, 'Microsoft-Windows-Kernel-Power', "The system has rebooted without cleanly shutting down first. BugcheckCode 0",
+     ['bug check code is 0', 'power loss']),
+    (7036, 'Service Control Manager', "The Print Spooler service entered the stopped state.", ['Print Spooler', 'stopped state']),
+    (7040, 'Service Control Manager', "The start type of the Background Intelligent Transfer Service service was changed from demand start to auto start.",
+     ['from demand start to auto start']),
+    (1000, 'Application Error', "Faulting application name: chrome.exe, version: 120.0.6099.130\nFaulting module name: ntdll.dll, version: 10.0\n"
+                                "Exception code: 0xc0000005", ['chrome.exe', 'ntdll.dll', '0xc0000005']),
+    (1002, 'Application Hang', "The program notepad.exe version 10.0.19041.1 stopped interacting with Windows and was closed.",
+     ['notepad.exe', '10.0.19041.1']),
+    (4624, 'Microsoft-Windows-Security-Auditing', "An account was successfully logged on.\nLogon Type:\t\t10\nNew Logon:\n\tAccount Name:\t\talice\n",
+     ['alice', 'remote desktop']),
+    (4625, 'Microsoft-Windows-Security-Auditing', "An account failed to log on.\nLogon Type:\t\t3\nAccount For Which Logon Failed:\n\tAccount Name:\t\tadmin\n"
+                                                  "Failure Reason:\t\tUnknown user name or bad password.", ['admin', 'Unknown user name or bad password', 'network']),
+    (19, 'Microsoft-Windows-WindowsUpdateClient', "Installation Successful: Windows successfully installed the following update: KB5031356",
+     ['KB5031356']),
+    (20, 'Microsoft-Windows-WindowsUpdateClient', "Installation Failure: Windows failed to install the following update with error 0x80070643: KB5034441",
+     ['KB5034441', '0x80070643']),
+]
+
+
+def test_every_entry_has_a_case():
+    assert sorted(event_id for _, event_id in event.KNOWLEDGE_BASE.entries) == sorted(case[0] for case in CASES)
+
+
+@pytest.mark.parametrize('event_id, source, message, expected', CASES, ids=[str(case[0]) for case in CASES])
+def test_lookup_fills_every_field_from_the_message(event_id, source, message, expected):
+    explanation = event.KNOWLEDGE_BASE.explain(event_id, source, message)
+    assert set(explanation) == set(event.EventKnowledgeBase.FIELDS)
+    text = '\n'.join(explanation.values())
+    assert '{' not in text and '}' not in text
+    for fragment in expected:
+        assert fragment in text
+    assert explanation['severity'] in ('info', 'warning', 'error')
+    assert not re.search(r"(^|[.!?] )[a-z]", explanation['detail'])  # sentences start with a capital
+
+
+@pytest.mark.parametrize('event_id, source', [(case[0], case[1]) for case in CASES], ids=[str(case[0]) for case in CASES])
+def test_unmatched_messages_fall_back_to_defaults(event_id, source):
+    explanation = event.KNOWLEDGE_BASE.explain(event_id, source.upper(), "")
+    assert explanation is not None and '{' not in '\n'.join(explanation.values())
+
+
+def test_kernel_power_only_claims_power_loss_for_bugcheck_zero():
+    explain = lambda message: event.KNOWLEDGE_BASE.explain(41, 'Microsoft-Windows-Kernel-Power', message)['detail']
+    assert 'power loss' in explain("BugcheckCode 0")
+    assert 'blue screen' in explain("BugcheckCode 209") and 'points to a power loss' not in explain("BugcheckCode 209")
+    assert 'points to a power loss' not in explain("The system has rebooted without cleanly shutting down first.")
+
+
+def test_unknown_events_go_to_the_llm():
+    assert event.KNOWLEDGE_BASE.explain(7036, 'Some Other Provider', "The X service entered the running state.") is None
+    assert event.KNOWLEDGE_BASE.explain(9999, 'EventLog', "") is None
+    explainer = event.AIExplainer('sk-test')
+    evt = {'event_id': 7036, 'event_type': 'Information', 'source': 'Service Control Manager',
+           'message': "The Print Spooler service entered the running state."}
+    assert explainer.explain_event(**evt)['title'] == "🔄 Service State Changed: Print Spooler"
+    assert explainer.cached_explanation(evt)['title'] == "🔄 Service State Changed: Print Spooler"
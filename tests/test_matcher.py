@@ -0,0 +1,57 @@
+import datetime
+
+from conftest import event, NOW, make_record
+
+
+def test_find_returns_the_first_pattern_in_order_ignoring_case():
+    matcher = event.PatternMatcher(['Kernel', 'kernel-power', 'DCOM', 'DCOM'])
+    assert matcher.patterns == ('kernel', 'kernel-power', 'dcom')
+    assert matcher.find('Microsoft-Windows-KERNEL-Power') == 'kernel'
+    assert matcher.find('Disk') is None
+    assert matcher.find('dcom') == 'dcom'
+    assert not event.PatternMatcher([])
+    assert event.PatternMatcher([''])  # an empty pattern occurs in every text
+    assert event.PatternMatcher(['']).find('anything') == ''
+
+
+def test_find_cached_agrees_with_find_and_bounds_the_memo():
+    matcher = event.PatternMatcher(['chrome', 'svchost'])
+    texts = [f'proc-{i}.exe' for i in range(matcher.MEMO_SIZE + 10)] + ['Chrome.exe', 'svcHost.exe']
+    for text in texts + texts:
+        assert matcher.find_cached(text) == matcher.find(text)
+    assert len(matcher._memo) <= matcher.MEMO_SIZE
+
+
+def test_keyword_filter_matches_ids_exactly_and_text_by_substring():
+    keywords = event.KeywordFilter(['41', 'spooler', 'Kernel'])
+    assert keywords.matches(41, 'Disk', 'unrelated')
+    assert not keywords.matches(4100, 'Disk', 'unrelated')
+    assert keywords.matches(7036, 'Service Control Manager', 'The Print SPOOLER service stopped.')
+    assert keywords.matches(1, 'Microsoft-Windows-Kernel-Power', '')
+    assert not keywords.matches(7036, 'Service Control Manager', 'The Audio service stopped.')
+    assert not event.KeywordFilter([])
+
+
+def test_read_events_filters_match_brute_force(logs):
+    base = NOW - datetime.timedelta(hours=1)
+    logs.corpora['System'] = [
+        make_record(1, base, event_id=41, source='Microsoft-Windows-Kernel-Power', message='The system rebooted.', inserts=()),
+        make_record(2, base + datetime.timedelta(minutes=1)),
+        make_record(3, base + datetime.timedelta(minutes=2), inserts=('Windows Update', 'stopped')),
+        make_record(4, base + datetime.timedelta(minutes=3), event_id=1000, source='Application Error',
+                    message='Faulting application chrome.exe', inserts=()),
+        make_record(5, base + datetime.timedelta(minutes=4), event_id=10016, source='DCOM', message='Permission denied.', inserts=()),
+    ]
+    reader = event.EventLogReader()
+    everything = reader.read_events('System', max_records=100)
+    assert len(everything) == 5
+
+    visible = reader.read_events('System', max_records=100, hide_common=True)
+    assert sorted(evt['record_number'] for evt in visible) == [4]
+
+    keywords = ['41', 'spooler', 'CHROME']
+    found = reader.read_events('System', max_records=100, keywords=keywords)
+    expected = [evt for evt in everything
+                if str(evt['event_id']) in keywords
+                or any(k.lower() in evt['source'].lower() or k.lower() in evt['message'].lower() for k in keywords)]
+    assert sorted(evt['record_number'] for evt in found) == sorted(evt['record_number'] for evt in expected) == [1, 2, 4]
@@ -0,0 +1,52 @@
+import re
+
+from conftest import event
+
+
+def _history(n, size=40):
+    return [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': f"message {i} " + 'x' * size} for i in range(n)]
+
+
+def test_short_history_is_verbatim():
+    history = _history(4)
+    rendered = event.ConversationMemory().render(history)
+    assert 'summarized' not in rendered
+    assert rendered.splitlines() == [f"{'user' if i % 2 == 0 else 'assistant'}: {m['content']}" for i, m in enumerate(history)]
+
+
+def test_long_history_stays_within_budget_and_keeps_the_newest():
+    memory = event.ConversationMemory()
+    history = _history(500, size=200)
+    rendered = memory.render(history)
+    assert event._estimate_tokens(rendered) <= memory.token_budget
+    assert 'older messages omitted' in rendered
+    assert rendered.rstrip().endswith(history[-1]['content'])
+    summary = [line for line in rendered.splitlines() if line.startswith('- ')]
+    numbers = [int(re.search(r'message (\d+)', line).group(1)) for line in summary]
+    assert numbers == sorted(numbers) and numbers[-1] == 500 - memory.recent_messages - 1
+
+
+def test_oversized_recent_messages_move_to_the_summary():
+    memory = event.ConversationMemory()
+    history = _history(6, size=1500)
+    rendered = memory.render(history)
+    assert event._estimate_tokens(rendered) <= memory.token_budget
+    assert '(Most recent messages)' in rendered
+    assert rendered.rstrip().endswith(event.ConversationMemory.clip(history[-1]['content']).splitlines()[-1])
+
+
+def test_clip_keeps_head_and_tail_and_is_idempotent():
+    text = 'HEAD ' + 'y' * 10000 + ' TAIL'
+    clipped = event.ConversationMemory.clip(text)
+    assert clipped.startswith('HEAD') and clipped.endswith('TAIL') and 'characters omitted' in clipped
+    assert len(clipped) <= event.ConversationMemory.MAX_MESSAGE_TOKENS * 4
+    assert event.ConversationMemory.clip(clipped) == clipped
+    assert event.ConversationMemory.clip('short') == 'short'
+
+
+def test_summarize_uses_the_first_meaningful_line_without_markdown():
+    msg = {'role': 'assistant', 'content': '---\n## **Top 3** `crashes`\n- detail'}
+    assert event.ConversationMemory.summarize(msg) == '- assistant: Top 3 crashes'
+    long_msg = {'role': 'user', 'content': 'word ' * 100}
+    line = event.ConversationMemory.summarize(long_msg)
+    assert line.endswith('...') and len(line) <= len('- user: ') + event.ConversationMemory.SUMMARY_LINE_CHARS + 3
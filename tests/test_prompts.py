@@ -0,0 +1,39 @@
+import datetime
+import string
+
+from conftest import event
+
+
+def test_plan_dates_accept_today_and_yesterday_tokens():
+    today = datetime.date.today()
+    start, end = event._parse_plan_datetimes({'start_date': 'YESTERDAY', 'start_time': '20:00',
+                                              'end_date': 'today', 'end_time': '06:00'})
+    assert start == datetime.datetime.combine(today - datetime.timedelta(days=1), datetime.time(20, 0))
+    assert end == datetime.datetime.combine(today, datetime.time(6, 0))
+
+
+def test_plan_dates_parse_real_dates_and_default_times():
+    start, end = event._parse_plan_datetimes({'start_date': '2025-11-05', 'end_date': '2025-11-06'})
+    assert start == datetime.datetime(2025, 11, 5, 0, 0)
+    assert end == datetime.datetime(2025, 11, 6, 23, 59)
+    assert event._parse_plan_datetimes({}) == (None, None)
+
+
+def test_prompt_static_part_is_identical_across_calls():
+    first = event.PLANNER_PROMPT.messages(**_volatile_fields(event.PLANNER_PROMPT, '2031-01-02'))
+    second = event.PLANNER_PROMPT.messages(**_volatile_fields(event.PLANNER_PROMPT, '2031-01-03'))
+    assert first[0] == second[0]
+    assert first[1] != second[1]
+    assert '2031-01-03' in second[1]['content'] and '2031-01-03' not in second[0]['content']
+
+
+def test_registered_prompts_are_keyed_by_name_and_version():
+    assert event.PROMPTS['planner'] is event.PLANNER_PROMPT
+    assert event.PLANNER_PROMPT.key == f"planner@v{event.PLANNER_PROMPT.version}"
+    for template in event.PROMPTS.values():
+        template.messages(**_volatile_fields(template, '2031-01-02'))
+
+
+def _volatile_fields(template, day):
+    names = {name for _, name, _, _ in string.Formatter().parse(template.volatile) if name}
+    return {name: day if name in ('today', 'yesterday', 'current_time') else f"<{name}>" for name in names}
@@ -0,0 +1,69 @@
+import datetime
+
+from conftest import NOW, event, make_record
+
+BASE = NOW - datetime.timedelta(hours=2)
+
+
+def _at(minutes):
+    return BASE + datetime.timedelta(minutes=minutes)
+
+
+def _numbers(events):
+    return [evt['record_number'] for evt in events]
+
+
+def test_out_of_order_records_inside_the_tolerance_do_not_stop_the_scan(logs):
+    # Oldest record first, as on disk; read backwards: 5, 4, 3, 2, 1.
+    logs.corpora['System'] = [
+        make_record(1, _at(5)),    # behind the stop point: never reached
+        make_record(2, _at(-20)),  # past start - tolerance: ends the scan
+        make_record(3, _at(1)),
+        make_record(4, _at(-2)),   # written late: outside the window, inside the tolerance
+        make_record(5, _at(2)),
+    ]
+    reader = event.EventLogReader()
+    assert _numbers(reader.read_events('System', 100, start_datetime=BASE)) == [5, 3]
+    stats = reader.last_scan_stats
+    assert stats['stop_reason'] == 'start_boundary' and stats['past_boundary_read'] == 2 and stats['total_read'] == 4
+
+    strict = event.EventLogReader(out_of_order_tolerance=datetime.timedelta(0))
+    assert _numbers(strict.read_events('System', 100, start_datetime=BASE)) == [5]
+
+
+def test_end_datetime_and_max_records_bound_the_window(logs):
+    logs.corpora['System'] = [make_record(n, _at(n)) for n in range(1, 31)]
+    reader = event.EventLogReader()
+    found = reader.read_events('System', 100, start_datetime=_at(10), end_datetime=_at(20))
+    assert _numbers(found) == list(range(20, 9, -1))
+    assert _numbers(reader.read_events('System', 3, start_datetime=_at(10))) == [30, 29, 28]
+    assert reader.last_scan_stats['stop_reason'] == 'max_records'
+
+
+def test_multi_log_scan_merges_newest_first_and_caps_the_merged_result(logs):
+    logs.corpora['System'] = [make_record(n, _at(3 * n), computer='S') for n in range(1, 21)]
+    logs.corpora['Application'] = [make_record(n, _at(3 * n + 1), computer='A') for n in range(1, 21)]
+    logs.corpora['Security'] = [make_record(n, _at(3 * n + 2), computer='X') for n in range(1, 21)]
+    reader = event.EventLogReader()
+    merged = reader.read_events_multi(('System', 'Application', 'Security'), max_records=10)
+    assert [(evt['log_type'], evt['record_number']) for evt in merged[:4]] == [
+        ('Security', 20), ('Application', 20), ('System', 20), ('Security', 19)]
+    times = [evt.timestamp for evt in merged]
+    assert len(merged) == 10 and times == sorted(times, reverse=True)
+    stats = reader.last_scan_stats
+    assert stats['stop_reason'] == 'merged' and set(stats['per_log']) == {'System', 'Application', 'Security'}
+
+    everything = sorted((evt for log_type in ('System', 'Application', 'Security')
+                         for evt in event.EventLogReader().read_events(log_type, 100)), key=lambda evt: evt.timestamp, reverse=True)
+    assert [(evt['log_type'], evt['record_number']) for evt in merged] == [(evt['log_type'], evt['record_number']) for evt in everything[:10]]
+    streamed = list(reader.iter_events_multi(('System', 'Application', 'Security'), max_records=10))
+    assert [(evt['log_type'], evt['record_number']) for evt in streamed] == [(evt['log_type'], evt['record_number']) for evt in merged]
+
+
+def test_multi_log_scan_skips_a_log_it_cannot_open(logs):
+    logs.corpora['System'] = [make_record(n, _at(n)) for n in range(1, 6)]
+    reader = event.EventLogReader()
+    merged = reader.read_events_multi(('System', 'NoSuchLog'), max_records=100)
+    assert _numbers(merged) == [5, 4, 3, 2, 1]
+    assert 'NoSuchLog' in reader.last_scan_stats['errors']
+    assert _numbers(reader.iter_events_multi(('NoSuchLog', 'System'), max_records=2)) == [5, 4]
@@ -0,0 +1,60 @@
+import datetime
+import json
+import sys
+
+import pytest
+
+from conftest import event, NOW
+
+
+def _record(**extra):
+    return event.EventRecord('Disk', 7, 'Error', NOW.timestamp(), 'DESKTOP-TEST', 'Bad block on device.', 'System', 42, **extra)
+
+
+def test_dict_style_access():
+    evt = _record()
+    assert evt['source'] == 'Disk' and evt.get('event_id') == 7 and evt.get('nope', 'x') == 'x'
+    assert evt['time_generated'] == NOW.strftime(event.EventRecord.TIME_FORMAT)
+    assert 'host' not in evt and evt.get('host') is None
+    assert list(evt) == list(event.EventRecord.FIELDS) and len(evt) == len(event.EventRecord.FIELDS)
+    with pytest.raises(KeyError):
+        evt['host']
+    with pytest.raises(KeyError):
+        evt['bogus'] = 1
+
+    evt['host'] = 'server-1'
+    assert 'host' in evt and evt['host'] == 'server-1' and list(evt)[-1] == 'host'
+
+
+def test_round_trips_through_dict_and_json():
+    evt = _record(host='server-1')
+    assert event.EventRecord.from_dict(evt.to_dict()) == evt
+    assert evt == dict(evt)
+    loaded = json.loads(json.dumps(evt, default=event._json_default))
+    assert loaded == evt.to_dict()
+    with pytest.raises(TypeError):
+        hash(evt)
+
+
+def test_strings_are_shared_between_records():
+    a = event.EventRecord(''.join(['Di', 'sk']), 7, 'Error', 0.0, 'PC', ''.join(['same ', 'text']))
+    b = event.EventRecord(''.join(['D', 'isk']), 7, 'Error', 0.0, 'PC', ''.join(['same', ' text']))
+    assert a.source is b.source and a.message is b.message
+    assert not hasattr(a, '__dict__')
+
+
+def test_reader_yields_records_newest_first():
+    events = event.EventLogReader().read_events('System', max_records=50)
+    assert events and all(isinstance(evt, event.EventRecord) for evt in events)
+    times = [evt.timestamp for evt in events]
+    assert times == sorted(times, reverse=True)
+    assert datetime.datetime.fromtimestamp(times[0]) <= NOW + datetime.timedelta(seconds=1)
+
+
+def test_messages_are_shared_but_not_interned():
+    text = ''.join(['a message seen ', 'only once ', str(id(object()))])
+    evt = event.EventRecord('Disk', 7, 'Error', 0.0, 'PC', text)
+    assert sys.intern(''.join([text[:5], text[5:]])) is not evt.message
+    for i in range(event.EventRecord.SHARED_MESSAGES + 10):
+        event.EventRecord('Disk', 7, 'Error', 0.0, 'PC', f'message {i}')
+    assert len(event.EventRecord._messages) <= event.EventRecord.SHARED_MESSAGES
@@ -0,0 +1,105 @@
+import datetime
+
+from conftest import NOW, event
+
+
+def _event(event_id, source, message, seconds, log_type='Application', event_type='Error'):
+    when = NOW - datetime.timedelta(hours=1) + datetime.timedelta(seconds=seconds)
+    return event.EventRecord(source, event_id, event_type, when.timestamp(), 'DESKTOP-TEST', message, log_type, event_id + seconds)
+
+
+def _chrome_crash(seconds):
+    return _event(1000, 'Application Error', 'Faulting application name: chrome.exe, version: 120.0.6099.130', seconds)
+
+
+def _engine(*rules):
+    engine = event.RuleEngine()
+    for text in rules:
+        engine.add(event.WatchRule.parse(text))
+    return engine
+
+
+def test_id_rule_fires_on_every_match():
+    engine = _engine('id=6008')
+    shutdown = _event(6008, 'EventLog', 'The previous system shutdown was unexpected.', 0, log_type='System')
+    assert len(engine.process_events([shutdown])) == 1
+    assert len(engine.process_events([_event(6005, 'EventLog', 'started', 1, log_type='System')])) == 0
+    assert len(engine.process_events([shutdown])) == 1
+
+
+def test_documented_windowed_source_rule_fires_on_chrome_crashes():
+    engine = _engine('log=Application type=Error source=chrome count>20 within=5m')
+    crashes = [_chrome_crash(i * 10) for i in range(21)]  # 21 crashes in 200 s
+    fired = engine.process_events(crashes[:20])
+    assert fired == []
+    fired = engine.process_events(crashes[20:])
+    assert len(fired) == 1 and len(fired[0]['events']) == 5
+
+
+def test_windowed_rule_ignores_hits_spread_past_the_window():
+    engine = _engine('source=chrome count>2 within=1m')
+    assert engine.process_events([_chrome_crash(i * 45) for i in range(3)]) == []
+    assert len(engine.process_events([_chrome_crash(200), _chrome_crash(201), _chrome_crash(202)])) == 1
+
+
+def test_source_rule_matches_source_case_insensitively_and_skips_other_events():
+    engine = _engine('source=Service count=1')
+    assert len(engine.process_events([_event(7036, 'Service Control Manager', 'The Print Spooler service entered the running state.', 0, 'System', 'Information')])) == 1
+    assert engine.process_events([_event(1000, 'Application Error', 'Faulting application name: notepad.exe', 1)]) == []
+
+
+def test_metric_rule_fires_once_after_its_duration():
+    engine = _engine('cpu>90 for=3m')
+    assert engine.process_sample({'cpu': 95.0}, now=0) == []
+    assert engine.process_sample({'cpu': 96.0}, now=120) == []
+    assert len(engine.process_sample({'cpu': 97.0}, now=181)) == 1
+    assert engine.process_sample({'cpu': 97.0}, now=240) == []
+    assert engine.process_sample({'cpu': 10.0}, now=300) == []
+    assert engine.process_sample({'cpu': 95.0}, now=310) == []
+
+
+def test_rules_survive_save_and_load(tmp_path):
+    engine = _engine('id=6008', 'source=chrome count>2 within=1m', 'cpu>90 for=3m')
+    path = str(tmp_path / 'rules.json')
+    engine.save(path)
+    restored = event.RuleEngine()
+    restored.load(path)
+    assert sorted(rule.name for rule in restored.rules.values()) == sorted(rule.name for rule in engine.rules.values())
+    assert restored.remove(2) and len(restored) == 2
+
+
+def test_rules_with_id_and_source_need_both():
+    engine = _engine('id=1000 source=chrome', 'id=1002 source=chrome')
+    fired = engine.process_events([_chrome_crash(0)])
+    assert [alert['rule_id'] for alert in fired] == [1]
+    engine.remove(1)
+    assert engine.process_events([_chrome_crash(1)]) == []
+    assert len(engine.process_events([_event(1002, 'Application Hang', 'chrome.exe stopped responding', 2)])) == 1
+
+
+def test_rule_named_in_source_and_message_counts_once():
+    engine = _engine('source=chrome count>1 within=1m')
+    assert engine.process_events([_event(1, 'Chrome', 'chrome restarted', 0)]) == []
+
+
+def test_per_event_work_does_not_grow_with_the_number_of_rules(monkeypatch):
+    checked = []
+    original = event.WatchRule.matches
+
+    def counting(rule, evt):
+        checked.append(rule.rule_id)
+        return original(rule, evt)
+
+    monkeypatch.setattr(event.WatchRule, 'matches', counting)
+    events = [_chrome_crash(i) for i in range(50)]
+    work = []
+    for extra in (10, 1000):
+        engine = _engine('source=chrome', 'id=1000')
+        for i in range(extra):
+            engine.add(event.WatchRule(event_id=50000 + i))
+            engine.add(event.WatchRule(source=f'nomatch{i}'))
+            engine.add(event.WatchRule(event_id=50000 + i, source='chrome'))
+        checked.clear()
+        assert len(engine.process_events(events)) == 100
+        work.append(len(checked))
+    assert work[0] == work[1] == 100
@@ -0,0 +1,72 @@
+import threading
+
+from conftest import event
+
+
+def _events(*types):
+    return [event.EventRecord('Test', 100 + i, event_type, 1700000000.0 + i, 'DESKTOP-TEST', f"event {i}", 'System', i)
+            for i, event_type in enumerate(types)]
+
+
+def test_visible_first_then_errors_warnings_and_the_rest():
+    order = []
+    scheduler = event.ExplanationScheduler(lambda evt: order.append(evt['record_number']) or {}, workers=1)
+    events = _events('Information', 'Information', 'Error', 'Warning', 'Information', 'Audit Failure')
+    scheduler.submit(events, lambda idx, evt, explanation: None, visible=[4]).wait()
+    assert order == [4, 2, 3, 5, 0, 1]
+
+
+def test_prioritize_jumps_the_queue_by_batch_index():
+    gate, started, order = threading.Event(), threading.Event(), []
+
+    def explain(evt):
+        started.set()
+        gate.wait(5)
+        order.append(evt['record_number'])
+        return {}
+
+    scheduler = event.ExplanationScheduler(explain, workers=1)
+    batch = scheduler.submit(_events(*['Information'] * 6), lambda idx, evt, explanation: None)
+    started.wait(5)
+    scheduler.prioritize([5, 4])
+    gate.set()
+    batch.wait()
+    assert order[:3] == [0, 4, 5]  # within one request, list order
+
+
+def test_a_new_batch_supersedes_the_pending_one():
+    gate = threading.Event()
+    scheduler = event.ExplanationScheduler(lambda evt: gate.wait(5) and {}, workers=1)
+    first = scheduler.submit(_events(*['Information'] * 4), lambda idx, evt, explanation: None)
+    results = []
+    second = scheduler.submit(_events('Error'), lambda idx, evt, explanation: results.append(idx))
+    gate.set()
+    second.wait()
+    assert first.cancelled and not second.cancelled and results == [0]
+
+
+def test_live_events_join_the_running_batch_ahead_of_the_queue():
+    gate, started, order, results = threading.Event(), threading.Event(), [], []
+
+    def explain(evt):
+        started.set()
+        gate.wait(5)
+        order.append(evt['message'])
+        return {}
+
+    def on_result(idx, evt, explanation):
+        results.append((idx, evt['message']))
+
+    scheduler = event.ExplanationScheduler(explain, workers=1)
+    batch = scheduler.submit(_events(*['Information'] * 4), on_result)
+    started.wait(5)
+    live = [event.EventRecord('Tail', 1, 'Information', 1700000100.0, 'DESKTOP-TEST', 'live', 'System', 99)]
+    joined, first = scheduler.extend(live, on_result)
+    gate.set()
+    batch.wait(5)
+    assert joined is batch and first == 4 and not batch.cancelled
+    assert order[:2] == ['event 0', 'live'] and (4, 'live') in results and len(results) == 5
+
+    later, first = scheduler.extend(live, on_result)
+    later.wait(5)
+    assert later is not batch and first == 0 and results[-1] == (0, 'live')
@@ -0,0 +1,56 @@
+import datetime
+
+from conftest import NOW, event
+
+
+def _event(record_number, source, event_id, message, hours_ago=1, event_type='Information', log_type='System', computer='DESKTOP-TEST', host=None):
+    when = NOW - datetime.timedelta(hours=hours_ago)
+    return event.EventRecord(source, event_id, event_type, when.timestamp(), computer, message, log_type, record_number, host)
+
+
+def _index():
+    index = event.EventSearchIndex()
+    index.add([
+        _event(1, 'Service Control Manager', 7036, 'The Windows Update service entered the running state.'),
+        _event(2, 'Service Control Manager', 7036, 'The Print Spooler service entered the stopped state.'),
+        _event(3, 'EventLog', 6008, 'The previous system shutdown at 2:14:03 AM was unexpected.', event_type='Error'),
+        _event(4, 'Microsoft-Windows-WindowsUpdateClient', 20, 'Installation Failure: Windows failed to install the following update.',
+               event_type='Error', hours_ago=30),
+        _event(1, 'Application Error', 1000, 'Faulting application name: chrome.exe', event_type='Error', log_type='Application'),
+    ], 'System')
+    return index
+
+
+def _ids(results):
+    return [evt['event_id'] for _, evt in results]
+
+
+def test_rarer_terms_rank_higher():
+    results = _index().search('update failure')
+    assert _ids(results)[0] == 20
+    assert set(_ids(results)) == {20, 7036}
+
+
+def test_phrases_prefixes_and_event_ids():
+    index = _index()
+    assert _ids(index.search('"print spooler"')) == [7036]
+    assert _ids(index.search('"spooler print"')) == []
+    assert _ids(index.search('unexpect*')) == [6008]
+    assert _ids(index.search('1000')) == [1000]
+
+
+def test_filters_apply_before_ranking():
+    index = _index()
+    assert _ids(index.search('update', start_datetime=NOW - datetime.timedelta(hours=2))) == [7036]
+    assert _ids(index.search('error chrome', log_types=['Application'])) == [1000]
+    assert 6008 in _ids(index.search('shutdown', event_type_filter=['Error']))
+    assert _ids(index.search('shutdown', event_type_filter=['Warning'])) == []
+
+
+def test_reindexing_skips_seen_records_but_keeps_other_hosts():
+    index = _index()
+    assert index.add([_event(3, 'EventLog', 6008, 'The previous system shutdown at 2:14:03 AM was unexpected.', event_type='Error')]) == 0
+    fleet = [_event(7, 'EventLog', 6008, 'unexpected shutdown', computer=f"PC-{n}", host=f"10.0.0.{n}:8765") for n in (1, 2)]
+    assert index.add(fleet) == 2
+    hosts = {evt['host'] for _, evt in index.search('unexpected shutdown') if evt.get('host')}
+    assert hosts == {'10.0.0.1:8765', '10.0.0.2:8765'}
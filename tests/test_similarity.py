@@ -0,0 +1,68 @@
+import math
+from collections import Counter
+
+import pytest
+
+from conftest import event
+
+pytestmark = pytest.mark.skipif(not event.EventSimilarityIndex.available(), reason='needs numpy and scipy')
+
+
+def _events():
+    return event.EventLogReader().read_events('Application', max_records=600)
+
+
+def _dense_scores(index, docs, query):
+    """Reference TF-IDF cosine computed with plain dicts."""
+    token_lists = [index._tokens(evt) for evt in docs]
+    df = Counter(t for tokens in token_lists for t in set(tokens))
+    idf = {t: math.log((1 + len(docs)) / (1 + n)) + 1 for t, n in df.items()}
+
+    def vector(tokens):
+        vec = {t: (1 + math.log(c)) * idf[t] for t, c in Counter(tokens).items() if t in idf}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    q = vector(index._tokens(query))
+    return [sum(q.get(t, 0.0) * v for t, v in vector(tokens).items()) for tokens in token_lists]
+
+
+def test_scores_match_a_dense_reference():
+    docs = _events()
+    index = event.EventSimilarityIndex()
+    assert index.add(docs) == len(docs)
+    query = docs[17]
+    result = index.similar(query, k=10, threshold=0.8)
+
+    reference = _dense_scores(index, docs, query)
+    reference[17] = -1.0
+    best = sorted(range(len(docs)), key=lambda i: reference[i], reverse=True)[:10]
+    got = [score for score, _ in result['matches']]
+    assert got == pytest.approx([reference[i] for i in best], abs=1e-4)
+    assert all(evt is not query for _, evt in result['matches'])
+    assert result['count'] == sum(score >= 0.8 for score in reference)
+    if result['count']:
+        assert result['first_seen'] <= result['last_seen']
+
+
+def test_adding_the_same_events_again_is_a_no_op():
+    docs = _events()
+    index = event.EventSimilarityIndex()
+    index.add(docs)
+    before = index.similar(docs[3], k=5)
+    assert index.add(docs) == 0 and len(index) == len(docs)
+    assert [s for s, _ in index.similar(docs[3], k=5)['matches']] == pytest.approx([s for s, _ in before['matches']])
+
+
+def test_unindexed_query_uses_known_terms_only():
+    docs = _events()
+    index = event.EventSimilarityIndex()
+    index.add(docs)
+    outsider = dict(docs[0], record_number=None)
+    outsider.pop('host', None)
+    result = index.similar(outsider, k=1)
+    assert result['matches'] and result['matches'][0][0] == pytest.approx(1.0, abs=1e-4)
+
+    unknown = {'message': '', 'event_id': -1, 'source': 'nothing-like-this'}
+    assert index.similar(unknown) == {'matches': [], 'count': 0, 'first_seen': None, 'last_seen': None}
+    assert event.EventSimilarityIndex().similar(docs[0])['matches'] == []
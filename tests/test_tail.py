@@ -0,0 +1,60 @@
+import datetime
+import queue
+
+from conftest import NOW, bench, event, make_record
+
+BASE = NOW - datetime.timedelta(minutes=30)
+
+
+def _write(logs, log_type, *records):
+    logs.corpora[log_type] = logs.corpora[log_type] + list(records)
+
+
+def _record(n, **fields):
+    return make_record(n, BASE + datetime.timedelta(seconds=n), **fields)
+
+
+def test_poll_delivers_only_new_records_through_the_filters(logs):
+    logs.corpora['System'] = [_record(n) for n in range(1, 11)]
+    delivered = []
+    tail = event.EventTail('System', delivered.append, hide_common=False, keywords=['disk'], event_type_filter=['Error', 'Warning'])
+    tail.last_record = tail._newest_record()
+    assert tail.poll() == [] and delivered == []
+
+    _write(logs, 'System',
+           _record(11, event_id=7, source='disk', message='Bad block on {0}.', inserts=('Harddisk0',), event_type=bench.EVENTLOG_ERROR_TYPE),
+           _record(12, event_id=7, source='disk', message='Bad block on {0}.', inserts=('Harddisk1',), event_type=bench.EVENTLOG_INFORMATION_TYPE),
+           _record(13),
+           _record(14, event_id=153, source='disk', message='IO retried on {0}.', inserts=('Harddisk0',), event_type=bench.EVENTLOG_WARNING_TYPE))
+    events = tail.poll()
+    assert [evt['record_number'] for evt in events] == [14, 11] and delivered == [events]
+    assert tail.last_record == 14 and tail.poll() == []
+
+
+def test_hide_common_and_log_clear(logs):
+    logs.corpora['System'] = [_record(n) for n in range(1, 6)]
+    tail = event.EventTail('System', hide_common=True)
+    tail.last_record = tail._newest_record()
+    _write(logs, 'System', _record(6), _record(7, event_id=41, source='Microsoft-Windows-Kernel-Power', message='Rebooted.', inserts=()),
+           _record(8, event_id=1, source='Disk', message='Disk event.', inserts=()))
+    assert [evt['record_number'] for evt in tail.poll()] == [8]
+
+    logs.corpora['System'] = [_record(1, event_id=1, source='Disk', message='After clear.', inserts=())]
+    assert [evt['message'] for evt in tail.poll()] == ['After clear.'] and tail.last_record == 1
+
+
+def test_engine_tail_runs_in_the_background_and_caps_current_events(logs, monkeypatch):
+    monkeypatch.setattr(event.EventTail, 'POLL_INTERVAL', 0.02)
+    logs.corpora['Application'] = [_record(n) for n in range(1, 4)]
+    engine = event.MonitorEngine('sk-test')
+    engine.load_events('Application', 3)
+    arrived = queue.Queue()
+    engine.start_tail('Application', on_events=arrived.put, max_events=4)
+    try:
+        _write(logs, 'Application', _record(4), _record(5))
+        batch = arrived.get(timeout=5)
+        assert [evt['record_number'] for evt in batch] == [5, 4]
+        assert [evt['record_number'] for evt in engine.current_events] == [5, 4, 3, 2]
+        assert engine.stats()['total'] == 4
+    finally:
+        engine.stop_tail()
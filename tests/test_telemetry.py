@@ -0,0 +1,71 @@
+import threading
+import time
+
+from conftest import event
+
+
+def test_spans_feed_stage_histograms_and_percentiles():
+    telemetry = event.Telemetry()
+    for ms in range(1, 101):
+        telemetry.record('read', float(ms))
+    with telemetry.span('plan'):
+        time.sleep(0.002)
+    rows = {row['stage']: row for row in telemetry.snapshot()['stages']}
+    read = rows['read']
+    assert read['count'] == 100 and read['total_ms'] == 5050 and read['mean_ms'] == 50.5
+    assert read['p50_ms'] == 50 and read['p99_ms'] == 100 and read['max_ms'] == 100
+    assert rows['plan']['count'] == 1 and rows['plan']['p50_ms'] == rows['plan']['max_ms'] >= 2
+
+
+def test_percentile_is_capped_by_the_slowest_span():
+    telemetry = event.Telemetry()
+    telemetry.record('llm', 3.0)
+    telemetry.record('llm', 700.0)
+    row = telemetry.snapshot()['stages'][0]
+    assert row['p50_ms'] == 5 and row['p99_ms'] == 700.0
+
+
+def test_queries_collect_their_own_and_attached_spans():
+    telemetry = event.Telemetry()
+    with telemetry.query('Load System events') as query:
+        telemetry.record('read', 10.0)
+
+        def worker():
+            with telemetry.attach(query):
+                telemetry.record('explain', 5.0)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    telemetry.record('read', 99.0)  # outside any query
+    recent = telemetry.recent_queries()
+    assert [q['label'] for q in recent] == ['Load System events']
+    assert recent[0]['stages'] == {'read': 10.0, 'explain': 5.0}
+
+
+def test_overlapping_queries_share_one_profiler():
+    telemetry = event.Telemetry()
+    telemetry.set_profiling(True)
+    inside, release, errors = threading.Event(), threading.Event(), []
+
+    def first():
+        try:
+            with telemetry.query('first'):
+                inside.set()
+                release.wait(5)
+                sum(range(1000))
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    inside.wait(5)
+    with telemetry.query('second') as second:
+        with telemetry.query('nested') as nested:
+            assert second['_profiler'] is None and nested['_profiler'] is None  # one active profiler on 3.12+
+    release.set()
+    thread.join()
+    assert errors == []
+    assert 'function calls' in telemetry.profile_report()
+    with telemetry.query('third') as third:
+        assert third['_profiler'] is not None  # the profiler is free again